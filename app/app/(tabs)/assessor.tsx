@@ -32,6 +32,40 @@ export default function AssessorScreen() {
 
     try {
       const token = await AsyncStorage.getItem('token');
+
+      // Na web o fetch expõe o corpo como stream: mostra a resposta enquanto é gerada
+      if (Platform.OS === 'web' && typeof ReadableStream !== 'undefined') {
+        const aiId = (Date.now() + 1).toString();
+        const response = await fetch(`${API_URL}/ai/chat/stream`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
+          body: JSON.stringify({ message: userMessage.text }),
+        });
+        if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+        setMessages((prev) => [...prev, { id: aiId, text: '', isUser: false }]);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const events = buffer.split('\n\n');
+          buffer = events.pop() || '';
+          for (const event of events) {
+            const dataLine = event.split('\n').find((line) => line.startsWith('data: '));
+            if (!dataLine) continue;
+            const data = JSON.parse(dataLine.slice(6));
+            const text = data.delta ?? (event.startsWith('event: error') ? data.detail : '');
+            if (!text) continue;
+            setIsLoading(false);
+            setMessages((prev) => prev.map((m) => (m.id === aiId ? { ...m, text: m.text + text } : m)));
+          }
+        }
+        return;
+      }
+
       const response = await fetch(`${API_URL}/ai/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
@@ -0,0 +1,144 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Optional
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+
+from app.ai.providers import load_provider
+from app.ai.usage import usage_meter, usage_tokens, response_text
+from app.config.settings import (
+    LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_RETRY_BASE_SECONDS, AI_USER_DAILY_TOKEN_QUOTA
+)
+
+load_dotenv()
+
+# Erros transitórios do Gemini que valem uma nova tentativa
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMBusy(LLMError):
+    """Todas as vagas de concorrência ocupadas - falha rápida em vez de enfileirar"""
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class LLMQuotaExceeded(LLMError):
+    """Usuário passou da cota diária de tokens (AI_USER_DAILY_TOKEN_QUOTA)"""
+
+
+class LLMClient:
+    """Chamadas assíncronas ao modelo (ver app.ai.providers) sem bloquear o event loop.
+
+    Limita quantas chamadas rodam ao mesmo tempo (semáforo global), aplica
+    timeout por chamada e repete erros transitórios com backoff + jitter.
+    Cada chamada é medida (tokens, latência) por feature e usuário em
+    app.ai.usage, e usuários acima da cota diária são barrados antes de chamar.
+    """
+
+    def __init__(self, model, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.model = model
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _acquire(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), LLM_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise LLMBusy("Muitas conversas ao mesmo tempo")
+
+    async def _check_quota(self, user_id: Optional[int]):
+        if user_id is None or not AI_USER_DAILY_TOKEN_QUOTA:
+            return
+        if await usage_meter.tokens_today(user_id) >= AI_USER_DAILY_TOKEN_QUOTA:
+            raise LLMQuotaExceeded("Limite diário de uso da assistente atingido")
+
+    def _record(self, feature: str, user_id: Optional[int], contents, system_instruction: Optional[str],
+                response, text: str, inicio: float):
+        tokens_prompt, tokens_resposta = usage_tokens(response, contents, text, system_instruction or "")
+        usage_meter.record(
+            user_id, feature, self.model.model_name, tokens_prompt, tokens_resposta,
+            (time.perf_counter() - inicio) * 1000
+        )
+
+    async def _call(self, factory):
+        """Executa a chamada com timeout e novas tentativas para erros transitórios"""
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                return await asyncio.wait_for(factory(), LLM_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise LLMTimeout(f"Sem resposta do modelo em {LLM_TIMEOUT_SECONDS:.0f}s")
+            except RETRYABLE_ERRORS as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise LLMError(str(e))
+                await asyncio.sleep(LLM_RETRY_BASE_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    async def generate(self, contents, system_instruction: Optional[str] = None, feature: str = "outro",
+                       user_id: Optional[int] = None, **kwargs):
+        await self._check_quota(user_id)
+        await self._acquire()
+        try:
+            inicio = time.perf_counter()
+            response = await self._call(lambda: self.model.generate_content_async(
+                contents, system_instruction=system_instruction, **kwargs
+            ))
+            self._record(feature, user_id, contents, system_instruction, response, response_text(response), inicio)
+            return response
+        finally:
+            self._semaphore.release()
+
+    async def stream_chunks(self, contents, system_instruction: Optional[str] = None, feature: str = "outro",
+                            user_id: Optional[int] = None, **kwargs) -> AsyncIterator:
+        """Gera os pedaços brutos da resposta conforme o modelo produz.
+
+        A vaga do semáforo fica presa até o fim do stream. Se o consumidor
+        parar de iterar (cliente desconectou), o stream do Gemini é cancelado
+        para não pagarmos por tokens que ninguém vai ler.
+        """
+        await self._check_quota(user_id)
+        await self._acquire()
+        response = None
+        ultimo, texto = None, []
+        inicio = time.perf_counter()
+        try:
+            response = await self._call(lambda: self.model.generate_content_async(
+                contents, stream=True, system_instruction=system_instruction, **kwargs
+            ))
+            async for chunk in response:
+                ultimo = chunk
+                texto.append(response_text(chunk))
+                yield chunk
+        finally:
+            if response is not None:
+                # Streams interrompidos também contam: os tokens já foram gerados
+                self._record(feature, user_id, contents, system_instruction, ultimo, "".join(texto), inicio)
+            # Cancela a chamada gRPC se o stream não foi consumido até o fim
+            iterator = getattr(response, "_iterator", None)
+            if iterator is not None and hasattr(iterator, "cancel"):
+                iterator.cancel()
+            self._semaphore.release()
+
+    async def stream(self, contents, **kwargs) -> AsyncIterator[str]:
+        """Só o texto de stream_chunks"""
+        chunks = self.stream_chunks(contents, **kwargs)
+        try:
+            async for chunk in chunks:
+                if chunk.parts:
+                    yield chunk.text
+        finally:
+            await chunks.aclose()
+
+
+# Gemini em produção; LLM_PROVIDER=fake para testes de carga sem a API
+llm = LLMClient(load_provider())
@@ -0,0 +1,126 @@
+from datetime import date
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from app.models.transaction_db import TransactionDB
+from app.models.conta_fixa_db import ContaFixaDB
+from app.utils.cache import TTLCache
+from app.utils.data_version import get_data_version
+from app.config.settings import AI_CONTEXT_CACHE_MAXSIZE, AI_CONTEXT_CACHE_TTL_SECONDS
+
+# (user_id, versão dos dados) -> texto do contexto. O TTL cobre a virada do
+# dia/mês, que muda "este mês" e "próximas contas" sem nenhuma escrita.
+context_cache = TTLCache(maxsize=AI_CONTEXT_CACHE_MAXSIZE, ttl=AI_CONTEXT_CACHE_TTL_SECONDS)
+
+SIMBOLOS_MOEDA = {"BRL": "R$", "USD": "US$", "EUR": "€"}
+
+
+def fmt_valor(valor: float, moeda: str = "BRL") -> str:
+    return f"{SIMBOLOS_MOEDA.get(moeda, moeda)} {valor:.2f}"
+
+
+def inicio_mes(dia: date, meses_atras: int = 0) -> date:
+    total = dia.year * 12 + dia.month - 1 - meses_atras
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def get_user_financial_context(db: Session, user_id: int) -> str:
+    """Busca o contexto financeiro do usuário para a IA (memoizado por versão dos dados)"""
+    key = (user_id, get_data_version(user_id))
+    context = context_cache.get(key)
+    if context is None:
+        context = build_financial_context(db, user_id)
+        context_cache.set(key, context)
+    return context
+
+
+def build_financial_context(db: Session, user_id: int) -> str:
+    """Monta o contexto a partir de agregados SQL sobre todo o histórico"""
+    hoje = date.today()
+    mes_atual = inicio_mes(hoje)
+    mes_anterior = inicio_mes(hoje, 1)
+
+    totais = db.query(
+        TransactionDB.moeda,
+        TransactionDB.tipo,
+        func.sum(TransactionDB.valor),
+        func.count(TransactionDB.id)
+    ).filter(
+        TransactionDB.user_id == user_id
+    ).group_by(TransactionDB.moeda, TransactionDB.tipo).all()
+
+    if not totais:
+        context = "O usuário ainda não possui transações registradas.\n"
+    else:
+        por_moeda = {}
+        for moeda, tipo, total, _ in totais:
+            por_moeda.setdefault(moeda, {"receita": 0.0, "despesa": 0.0})[tipo] = total or 0.0
+
+        context = "\nResumo financeiro do usuário (todo o histórico):\n"
+        for moeda, valores in sorted(por_moeda.items()):
+            saldo = valores["receita"] - valores["despesa"]
+            context += (
+                f"- {moeda}: receitas {fmt_valor(valores['receita'], moeda)}, "
+                f"despesas {fmt_valor(valores['despesa'], moeda)}, "
+                f"saldo {fmt_valor(saldo, moeda)}\n"
+            )
+
+        este_mes = func.sum(case((TransactionDB.data >= mes_atual, TransactionDB.valor), else_=0))
+        mes_passado = func.sum(case((TransactionDB.data < mes_atual, TransactionDB.valor), else_=0))
+        categorias = db.query(
+            TransactionDB.categoria,
+            TransactionDB.moeda,
+            este_mes,
+            mes_passado
+        ).filter(
+            TransactionDB.user_id == user_id,
+            TransactionDB.tipo == "despesa",
+            TransactionDB.data >= mes_anterior,
+            TransactionDB.data < inicio_mes(hoje, -1)
+        ).group_by(
+            TransactionDB.categoria, TransactionDB.moeda
+        ).order_by(este_mes.desc()).limit(8).all()
+
+        if categorias:
+            context += "\nDespesas por categoria (este mês x mês passado):\n"
+            for categoria, moeda, atual, anterior in categorias:
+                linha = f"- {categoria}: {fmt_valor(atual, moeda)} x {fmt_valor(anterior, moeda)}"
+                if anterior:
+                    linha += f" ({(atual - anterior) / anterior * 100:+.0f}%)"
+                context += linha + "\n"
+
+        ultimas = db.query(
+            TransactionDB.data,
+            TransactionDB.tipo,
+            TransactionDB.valor,
+            TransactionDB.moeda,
+            TransactionDB.categoria,
+            TransactionDB.descricao
+        ).filter(
+            TransactionDB.user_id == user_id
+        ).order_by(TransactionDB.data.desc()).limit(10).all()
+
+        context += "\nÚltimas transações:\n"
+        for t in ultimas:
+            sinal = "+" if t.tipo == "receita" else "-"
+            context += f"- {t.data}: {sinal}{fmt_valor(t.valor, t.moeda)} ({t.categoria}) - {t.descricao or 'Sem descrição'}\n"
+
+    contas = db.query(
+        ContaFixaDB.nome,
+        ContaFixaDB.valor,
+        ContaFixaDB.moeda,
+        ContaFixaDB.dia_vencimento
+    ).filter(
+        ContaFixaDB.user_id == user_id,
+        ContaFixaDB.ano_referencia == hoje.year,
+        ContaFixaDB.mes_referencia == hoje.month,
+        ContaFixaDB.pago == False,
+        ContaFixaDB.dia_vencimento >= hoje.day
+    ).order_by(ContaFixaDB.dia_vencimento).limit(10).all()
+
+    if contas:
+        context += "\nPróximas contas fixas a vencer (não pagas):\n"
+        for c in contas:
+            context += f"- Dia {c.dia_vencimento}: {c.nome} - {fmt_valor(c.valor, c.moeda)}\n"
+
+    return context
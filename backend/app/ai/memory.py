@@ -0,0 +1,182 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.models.conversa_db import ConversaMensagemDB, ConversaResumoDB
+from app.ai.client import llm
+from app.ai.tokens import count_tokens
+from app.config.settings import AI_MEMORY_WINDOW, AI_MEMORY_KEEP_RECENT, AI_MEMORY_TOKEN_BUDGET
+
+SUMMARY_PROMPT = """Atualize o resumo da conversa entre o usuário e a Nex (assistente financeira).
+Mantenha fatos úteis para as próximas respostas: objetivos, preocupações, decisões e preferências do usuário.
+Escreva em português, em no máximo 150 palavras, sem saudações.
+
+Resumo atual:
+{resumo}
+
+Novas mensagens:
+{mensagens}
+
+Novo resumo:"""
+
+
+@dataclass
+class Conversa:
+    resumo: str = ""
+    historico: List[dict] = field(default_factory=list)  # Formato de "contents" do Gemini
+
+
+def load_conversation(db: Session, user_id: int) -> Conversa:
+    """Resumo + mensagens recentes que cabem no orçamento de tokens"""
+    resumo = db.query(ConversaResumoDB).filter(ConversaResumoDB.user_id == user_id).first()
+    ate_id = resumo.ate_mensagem_id if resumo else 0
+
+    mensagens = db.query(ConversaMensagemDB).filter(
+        ConversaMensagemDB.user_id == user_id,
+        ConversaMensagemDB.id > ate_id
+    ).order_by(ConversaMensagemDB.id.desc()).limit(AI_MEMORY_WINDOW).all()
+
+    # Das mais novas para as mais antigas, enquanto couber no orçamento
+    budget = AI_MEMORY_TOKEN_BUDGET - count_tokens(resumo.resumo if resumo else "")
+    historico = []
+    for m in mensagens:
+        budget -= m.tokens
+        if budget < 0:
+            break
+        historico.append({"role": m.papel, "parts": [m.conteudo]})
+    historico.reverse()
+
+    # O Gemini exige que o histórico comece com uma mensagem do usuário
+    while historico and historico[0]["role"] != "user":
+        historico.pop(0)
+
+    return Conversa(resumo=resumo.resumo if resumo else "", historico=historico)
+
+
+def save_turn(db: Session, user_id: int, pergunta: str, resposta: str) -> int:
+    """Grava a pergunta e a resposta; retorna quantas mensagens ainda não foram resumidas"""
+    db.add_all([
+        ConversaMensagemDB(user_id=user_id, papel="user", conteudo=pergunta, tokens=count_tokens(pergunta)),
+        ConversaMensagemDB(user_id=user_id, papel="model", conteudo=resposta, tokens=count_tokens(resposta)),
+    ])
+    db.commit()
+
+    resumo = db.query(ConversaResumoDB).filter(ConversaResumoDB.user_id == user_id).first()
+    return db.query(ConversaMensagemDB).filter(
+        ConversaMensagemDB.user_id == user_id,
+        ConversaMensagemDB.id > (resumo.ate_mensagem_id if resumo else 0)
+    ).count()
+
+
+@dataclass
+class JanelaResumo:
+    resumo: str  # Resumo atual
+    ate_id: int  # Última mensagem já resumida (para a gravação condicional)
+    novo_ate_id: int
+    mensagens: str
+
+
+def load_summary_window(user_id: int) -> Optional[JanelaResumo]:
+    """Mensagens antigas ainda não resumidas (todas menos as AI_MEMORY_KEEP_RECENT mais recentes)"""
+    db = SessionLocal()
+    try:
+        resumo = db.query(ConversaResumoDB).filter(ConversaResumoDB.user_id == user_id).first()
+        ate_id = resumo.ate_mensagem_id if resumo else 0
+        mensagens = db.query(ConversaMensagemDB).filter(
+            ConversaMensagemDB.user_id == user_id,
+            ConversaMensagemDB.id > ate_id
+        ).order_by(ConversaMensagemDB.id).all()
+
+        antigas = mensagens[:-AI_MEMORY_KEEP_RECENT] if AI_MEMORY_KEEP_RECENT else mensagens
+        # Começar o trecho mantido sempre por uma pergunta do usuário
+        if antigas and antigas[-1].papel == "user":
+            antigas = antigas[:-1]
+        if not antigas:
+            return None
+
+        return JanelaResumo(
+            resumo=resumo.resumo if resumo else "",
+            ate_id=ate_id,
+            novo_ate_id=antigas[-1].id,
+            mensagens="\n".join(f"{'Usuário' if m.papel == 'user' else 'Nex'}: {m.conteudo}" for m in antigas)
+        )
+    finally:
+        db.close()
+
+
+def save_summary(user_id: int, janela: JanelaResumo, texto: str) -> bool:
+    """Grava o novo resumo só se ninguém resumiu a mesma janela antes (outra réplica, por exemplo).
+
+    UPDATE condicional em ate_mensagem_id; no primeiro resumo do usuário, o
+    INSERT que perder a corrida cai na chave primária. Retorna se gravou.
+    """
+    db = SessionLocal()
+    try:
+        gravou = db.query(ConversaResumoDB).filter(
+            ConversaResumoDB.user_id == user_id,
+            ConversaResumoDB.ate_mensagem_id == janela.ate_id
+        ).update(
+            {ConversaResumoDB.resumo: texto, ConversaResumoDB.ate_mensagem_id: janela.novo_ate_id},
+            synchronize_session=False
+        ) == 1
+        if not gravou and not janela.ate_id:
+            db.add(ConversaResumoDB(user_id=user_id, resumo=texto, ate_mensagem_id=janela.novo_ate_id))
+            try:
+                db.flush()
+                gravou = True
+            except IntegrityError:
+                db.rollback()
+        if gravou:
+            db.commit()
+        return gravou
+    finally:
+        db.close()
+
+
+# Usuários com resumo em andamento neste processo (as tarefas rodam todas no mesmo event loop)
+_resumindo = set()
+
+
+async def summarize_old_turns(user_id: int) -> None:
+    """Incorpora as mensagens antigas ao resumo, mantendo só as mais recentes na íntegra.
+
+    Roda como tarefa em segundo plano depois da resposta; as consultas vão
+    para o threadpool. Dois turnos seguidos do mesmo usuário não resumem a
+    mesma janela: no processo, o segundo desiste; entre réplicas, só a
+    primeira gravação vale (ver save_summary).
+    """
+    if user_id in _resumindo:
+        return
+    _resumindo.add(user_id)
+    try:
+        janela = await run_in_threadpool(load_summary_window, user_id)
+        if janela is None:
+            return
+        response = await llm.generate(SUMMARY_PROMPT.format(
+            resumo=janela.resumo or "(vazio)",
+            mensagens=janela.mensagens
+        ), feature="resumo_conversa", user_id=user_id)
+        if not await run_in_threadpool(save_summary, user_id, janela, response.text.strip()):
+            print(f"Resumo da conversa do usuário {user_id} descartado: janela já resumida")
+    except Exception as e:
+        print(f"Erro ao resumir conversa do usuário {user_id}: {e}")
+    finally:
+        _resumindo.discard(user_id)
+
+
+def _save_turn_new_session(user_id: int, pergunta: str, resposta: str) -> int:
+    db = SessionLocal()
+    try:
+        return save_turn(db, user_id, pergunta, resposta)
+    finally:
+        db.close()
+
+
+async def remember_turn(user_id: int, pergunta: str, resposta: str) -> None:
+    """Tarefa pós-resposta: grava o turno e resume o histórico quando passa da janela"""
+    pendentes = await run_in_threadpool(_save_turn_new_session, user_id, pergunta, resposta)
+    if pendentes > AI_MEMORY_WINDOW:
+        await summarize_old_turns(user_id)
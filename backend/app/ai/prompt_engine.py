@@ -0,0 +1,71 @@
+"""Montagem de prompts: instrução fixa + seções dinâmicas dentro de um orçamento de tokens.
+
+Este arquivo existe, idêntico, em backend/app/ai/ e em whatsapp/webhook/: o
+webhook é um serviço com build próprio e não importa o backend. Altere os
+dois juntos; backend/tests/test_prompt_engine.py falha se eles divergirem.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import List
+
+# Contagem local aproximada de tokens (~4 caracteres por token em português),
+# suficiente para orçamentos de prompt sem chamar a API de contagem.
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+@dataclass
+class Section:
+    """Trecho dinâmico do prompt. Prioridade menor entra primeiro quando falta orçamento"""
+    titulo: str
+    texto: str
+    prioridade: int
+
+
+def trim_to_tokens(texto: str, max_tokens: int) -> str:
+    """Corta em linhas inteiras até caber no orçamento; a primeira linha que não cabe entra cortada"""
+    linhas, total = [], 0
+    for linha in texto.splitlines():
+        custo = count_tokens(linha + "\n")
+        if total + custo > max_tokens:
+            # Cabe em (restante - 1) * CHARS_PER_TOKEN - 1 caracteres, contando o "\n"
+            caracteres = (max_tokens - total - 1) * CHARS_PER_TOKEN - 1
+            if caracteres > 0:
+                linhas.append(linha[:caracteres])
+            break
+        linhas.append(linha)
+        total += custo
+    return "\n".join(linhas)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Instrução fixa (enviada como system instruction, igual em toda chamada) +
+    seções dinâmicas montadas por prioridade dentro de um orçamento de tokens.
+    """
+    nome: str
+    system_instruction: str
+    orcamento_tokens: int
+
+    @property
+    def version(self) -> str:
+        """Muda quando o texto fixo muda (entra na chave do cache de respostas)"""
+        return hashlib.sha256(f"{self.nome}|{self.system_instruction}".encode("utf-8")).hexdigest()[:12]
+
+    def render(self, secoes: List[Section]) -> str:
+        restante = self.orcamento_tokens
+        blocos = {}
+        for i, secao in sorted(enumerate(secoes), key=lambda item: item[1].prioridade):
+            if not secao.texto.strip():
+                continue
+            bloco = trim_to_tokens(f"## {secao.titulo}:\n{secao.texto.strip()}", restante)
+            # Só o título não ajuda; seções menores ainda podem caber
+            if "\n" not in bloco:
+                continue
+            blocos[i] = bloco
+            restante -= count_tokens(bloco)
+        # Ordem original das seções, para o início do prompt variar pouco
+        return "\n\n".join(blocos[i] for i in sorted(blocos))
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import random
+import re
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from google.generativeai import protos
+
+from app.utils.loader import load_object
+from app.config.settings import (
+    LLM_PROVIDER, LLM_MODEL, LLM_FAKE_LATENCY_MS, LLM_FAKE_JITTER_MS, LLM_FAKE_RULES
+)
+
+
+class LLMProvider(ABC):
+    """Modelo usado pelo LLMClient. Segue a interface do GenerativeModel do Gemini:
+    respostas com .text e .candidates[0].content.parts, e em stream um
+    iterável assíncrono de pedaços com .parts.
+    """
+    model_name = "desconhecido"  # Registrado nas métricas de uso
+
+    @abstractmethod
+    async def generate_content_async(self, contents, stream: bool = False, system_instruction: str = None, **kwargs):
+        """Resposta completa, ou iterável assíncrono de pedaços se stream=True"""
+
+
+class GeminiProvider(LLMProvider):
+    def __init__(self, model_name: str = LLM_MODEL):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.genai = genai
+        self.model_name = model_name
+        # Um GenerativeModel por system instruction (são poucas: uma por PromptTemplate)
+        self._models = {None: genai.GenerativeModel(model_name)}
+
+    def _model_for(self, system_instruction: str = None):
+        model = self._models.get(system_instruction)
+        if model is None:
+            model = self._models[system_instruction] = self.genai.GenerativeModel(
+                self.model_name, system_instruction=system_instruction
+            )
+        return model
+
+    async def generate_content_async(self, contents, stream: bool = False, system_instruction: str = None, **kwargs):
+        return await self._model_for(system_instruction).generate_content_async(contents, stream=stream, **kwargs)
+
+
+class FakeResponse:
+    """Resposta só com texto, no mesmo formato das respostas do Gemini"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = [protos.Part(text=text)]
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(role="model", parts=self.parts))]
+
+
+class FakeStream:
+    def __init__(self, text: str, delay: float):
+        self.text = text
+        self.delay = delay
+
+    async def __aiter__(self):
+        # Pedaços de algumas palavras, como o Gemini faz
+        palavras = re.findall(r"\S+\s*", self.text) or [""]
+        for i in range(0, len(palavras), 4):
+            await asyncio.sleep(self.delay)
+            yield FakeResponse("".join(palavras[i:i + 4]))
+
+
+def last_user_text(contents) -> str:
+    """Texto da última mensagem, aceitando os formatos de "contents" do Gemini"""
+    if isinstance(contents, str):
+        return contents
+    ultimo = contents[-1] if contents else ""
+    if isinstance(ultimo, dict):
+        return " ".join(p for p in ultimo.get("parts", []) if isinstance(p, str))
+    return ultimo if isinstance(ultimo, str) else ""
+
+
+class FakeProvider(LLMProvider):
+    """Modelo local e determinístico para testes de carga e desenvolvimento offline.
+
+    Espera LLM_FAKE_LATENCY_MS (+ jitter) e responde pela primeira regra cujo
+    padrão (regex) aparece na última mensagem. As regras vêm de um JSON
+    opcional: [{"pattern": "saldo", "response": "..."}]. Sem regra, ecoa a
+    pergunta. Nunca chama ferramentas.
+    """
+    model_name = "fake"
+
+    def __init__(self, latency_ms: float = LLM_FAKE_LATENCY_MS, jitter_ms: float = LLM_FAKE_JITTER_MS,
+                 rules_path: str = LLM_FAKE_RULES):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rules = []
+        if rules_path:
+            with open(rules_path, encoding="utf-8") as f:
+                self.rules = [(re.compile(r["pattern"], re.IGNORECASE), r["response"]) for r in json.load(f)]
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def reply(self, contents) -> str:
+        texto = last_user_text(contents)
+        for pattern, response in self.rules:
+            if pattern.search(texto):
+                return response
+        pergunta = texto.rsplit("Usuário:", 1)[-1].strip()
+        return f"Resposta simulada para: {pergunta[:200]}"
+
+    async def generate_content_async(self, contents, stream: bool = False, system_instruction: str = None, **kwargs):
+        text = self.reply(contents)
+        if stream:
+            # A latência total se divide entre o primeiro pedaço e os seguintes
+            return FakeStream(text, self._delay() / 2)
+        await asyncio.sleep(self._delay())
+        return FakeResponse(text)
+
+
+PROVIDERS = {"gemini": GeminiProvider, "fake": FakeProvider}
+
+
+def load_provider(name: str = LLM_PROVIDER) -> LLMProvider:
+    """"gemini", "fake" ou "modulo:Classe" de um LLMProvider próprio"""
+    cls = PROVIDERS.get(name) or load_object(name)
+    return cls()
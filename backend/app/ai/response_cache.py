@@ -0,0 +1,102 @@
+import hashlib
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Optional
+
+from app.utils.cache import TTLCache
+from app.utils.loader import load_object
+from app.utils.data_version import get_data_version
+from app.config.settings import (
+    AI_RESPONSE_CACHE_TTL_SECONDS, AI_RESPONSE_CACHE_MAXSIZE, AI_RESPONSE_CACHE_BACKEND
+)
+
+
+class ResponseCacheBackend(ABC):
+    """Cache compartilhado opcional (segundo nível), ex.: Redis entre réplicas.
+
+    A invalidação continua por réplica: a versão dos dados na chave só muda
+    com escritas feitas neste processo. Uma escrita feita em outra réplica
+    não invalida o que já está aqui; a resposta antiga vale até o TTL
+    (AI_RESPONSE_CACHE_TTL_SECONDS).
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: float) -> None:
+        ...
+
+
+def normalize_message(message: str) -> str:
+    """Minúsculas, sem acentos, pontuação nem espaços repetidos"""
+    text = unicodedata.normalize("NFKD", message.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+# Respostas curtas ou que apontam para a conversa ("sim", "e em março?",
+# "explica isso") dependem do histórico; essas nunca passam pelo cache
+MIN_PALAVRAS_CACHE = 3
+INICIOS_DE_CONTINUACAO = {"sim", "nao", "ok", "e", "entao", "mas", "tambem", "pode", "certo", "beleza", "claro"}
+REFERENCIAS_A_CONVERSA = {
+    "isso", "isto", "esse", "essa", "esses", "essas", "disso", "desse", "dessa", "nisso", "nesse", "nessa",
+    "aquilo", "aquele", "aquela", "dele", "dela", "deles", "delas", "anterior", "acima",
+}
+
+
+def is_self_contained(message: str) -> bool:
+    """Se a pergunta se entende sozinha, sem o histórico (e a resposta pode vir do cache)"""
+    palavras = normalize_message(message).split()
+    return (
+        len(palavras) >= MIN_PALAVRAS_CACHE
+        and palavras[0] not in INICIOS_DE_CONTINUACAO
+        and not REFERENCIAS_A_CONVERSA.intersection(palavras)
+    )
+
+
+class ResponseCache:
+    """Respostas do assistente por (usuário, dia, versão dos dados, mensagem, versão do prompt).
+
+    A versão dos dados na chave faz o cache se invalidar sozinho quando o
+    usuário registra, edita ou apaga transações (neste processo; ver
+    ResponseCacheBackend). O dia entra porque o prompt traz a data de hoje.
+    A conversa não entra: o histórico muda a cada turno e nenhuma chave se
+    repetiria. Por isso só perguntas que se entendem sozinhas usam o cache
+    (is_self_contained).
+    """
+
+    def __init__(self, shared: Optional[ResponseCacheBackend] = None):
+        self.local = TTLCache(maxsize=AI_RESPONSE_CACHE_MAXSIZE, ttl=AI_RESPONSE_CACHE_TTL_SECONDS)
+        self.shared = shared
+
+    def key(self, user_id: int, message: str, prompt_version: str) -> Optional[str]:
+        """Chave da pergunta, ou None se ela depende da conversa (não usar o cache)"""
+        if not is_self_contained(message):
+            return None
+        raw = f"{user_id}|{date.today().isoformat()}|{get_data_version(user_id)}|{normalize_message(message)}|{prompt_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key: Optional[str], value: str) -> None:
+        if key is None:
+            return
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, AI_RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(load_object(AI_RESPONSE_CACHE_BACKEND)() if AI_RESPONSE_CACHE_BACKEND else None)
@@ -0,0 +1,290 @@
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.models.transaction_db import TransactionDB
+from app.utils.cache import TTLCache
+from app.ai.context import fmt_valor, inicio_mes
+from app.ai.response_cache import normalize_message
+from app.config.settings import AI_RETRIEVAL_MAX_USERS, AI_RETRIEVAL_TOP_K, AI_RETRIEVAL_TTL_SECONDS
+
+# Parâmetros padrão do BM25
+K1 = 1.5
+B = 0.75
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+# Palavras da pergunta que não ajudam a achar transações (já sem acento)
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas",
+    "com", "por", "pra", "para", "pro", "e", "ou", "que", "quanto", "quanta", "quantos", "quantas",
+    "qual", "quais", "quando", "como", "onde", "meu", "minha", "meus", "minhas", "eu", "me", "mim",
+    "voce", "gastei", "gasto", "gastos", "gastando", "paguei", "pago", "pagamento", "recebi", "ganhei",
+    "total", "valor", "tive", "fiz", "foi", "foram", "ta", "to", "tem", "teve", "ja", "ate", "desde",
+    "mes", "ano", "semana", "passado", "passada", "este", "esse", "esta", "essa", "hoje", "ontem",
+    "dinheiro", "reais", "r", "sobre", "mais", "menos", "todo", "toda", "todos", "todas",
+} | set(MESES)
+
+
+# Plurais mais comuns, do sufixo mais longo para o mais curto (já sem acento)
+PLURAIS = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ns", "m"), ("res", "r"))
+
+# Termos com pelo menos esse tamanho também casam com os termos do índice que começam com eles
+MIN_PREFIXO = 4
+
+
+def stem(token: str) -> str:
+    """Radical leve: tira o plural ("restaurantes" -> "restaurante", "cartoes" -> "cartao", "ubers" -> "uber")"""
+    if len(token) <= 4:
+        return token
+    for sufixo, troca in PLURAIS:
+        if token.endswith(sufixo):
+            return token[:-len(sufixo)] + troca
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        stem(t) for t in normalize_message(text or "").split()
+        if t not in STOPWORDS and len(t) > 1 and not re.fullmatch(r"20\d{2}", t)
+    ]
+
+
+def parse_date_range(pergunta: str, hoje: date) -> Optional[Tuple[date, date]]:
+    """Período citado na pergunta, como intervalo [inicio, fim)"""
+    texto = normalize_message(pergunta)
+    ano_match = re.search(r"\b(20\d{2})\b", texto)
+    ano = int(ano_match.group(1)) if ano_match else None
+
+    for nome, mes in MESES.items():
+        if re.search(rf"\b{nome}\b", texto):
+            if ano is None:
+                # Mês sem ano: a ocorrência mais recente que não está no futuro
+                ano = hoje.year if mes <= hoje.month else hoje.year - 1
+            inicio = date(ano, mes, 1)
+            return inicio, inicio_mes(inicio, -1)
+
+    if re.search(r"\b(este|esse) mes\b", texto):
+        return inicio_mes(hoje), inicio_mes(hoje, -1)
+    if "mes passado" in texto:
+        return inicio_mes(hoje, 1), inicio_mes(hoje)
+    if "ano passado" in texto:
+        return date(hoje.year - 1, 1, 1), date(hoje.year, 1, 1)
+    if re.search(r"\b(este|esse) ano\b", texto):
+        return date(hoje.year, 1, 1), date(hoje.year + 1, 1, 1)
+    if re.search(r"\bontem\b", texto):
+        return hoje - timedelta(days=1), hoje
+    if re.search(r"\bhoje\b", texto):
+        return hoje, hoje + timedelta(days=1)
+    if ano is not None:
+        return date(ano, 1, 1), date(ano + 1, 1, 1)
+    return None
+
+
+@dataclass
+class Doc:
+    id: int
+    data: date
+    tipo: str
+    valor: float
+    moeda: str
+    categoria: str
+    descricao: Optional[str]
+    termos: Counter
+    tamanho: int
+
+    @classmethod
+    def from_row(cls, row) -> "Doc":
+        termos = Counter(tokenize(f"{row.descricao or ''} {row.categoria}"))
+        return cls(
+            id=row.id, data=row.data, tipo=row.tipo, valor=row.valor, moeda=row.moeda,
+            categoria=row.categoria, descricao=row.descricao,
+            termos=termos, tamanho=sum(termos.values())
+        )
+
+
+class UserIndex:
+    """Índice invertido (BM25) das transações de um usuário"""
+
+    def __init__(self):
+        self.docs: Dict[int, Doc] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.total_tamanho = 0
+
+    def add(self, doc: Doc) -> None:
+        self.remove(doc.id)
+        self.docs[doc.id] = doc
+        self.total_tamanho += doc.tamanho
+        for termo in doc.termos:
+            self.postings.setdefault(termo, set()).add(doc.id)
+
+    def remove(self, doc_id: int) -> None:
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_tamanho -= doc.tamanho
+        for termo in doc.termos:
+            ids = self.postings.get(termo)
+            if ids:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[termo]
+
+    def expand(self, termo: str) -> List[str]:
+        """Termos do índice que casam com o da pergunta: ele mesmo e os que começam com ele ("farm" -> "farmacia")"""
+        if len(termo) < MIN_PREFIXO:
+            return [termo] if termo in self.postings else []
+        return [t for t in self.postings if t.startswith(termo)]
+
+    def search(self, termos: List[str], periodo: Optional[Tuple[date, date]]) -> List[Tuple[float, Doc]]:
+        """Todas as transações que casam com algum termo (e com o período), por relevância"""
+        n = len(self.docs)
+        media = self.total_tamanho / n if n else 0
+        scores: Dict[int, float] = {}
+        for termo in set(termos):
+            variantes = self.expand(termo)
+            ids = set().union(*(self.postings[t] for t in variantes))
+            if not ids:
+                continue
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id in ids:
+                doc = self.docs[doc_id]
+                if periodo and not (periodo[0] <= doc.data < periodo[1]):
+                    continue
+                tf = sum(doc.termos[t] for t in variantes)
+                norm = K1 * (1 - B + B * doc.tamanho / media) if media else K1
+                scores[doc_id] = scores.get(doc_id, 0) + idf * tf * (K1 + 1) / (tf + norm)
+        return sorted(
+            ((score, self.docs[doc_id]) for doc_id, score in scores.items()),
+            key=lambda item: (item[0], item[1].data),
+            reverse=True
+        )
+
+    def in_period(self, periodo: Tuple[date, date]) -> List[Doc]:
+        return sorted(
+            (d for d in self.docs.values() if periodo[0] <= d.data < periodo[1]),
+            key=lambda d: d.data,
+            reverse=True
+        )
+
+
+class RetrievalIndex:
+    """Índices por usuário, construídos sob demanda e atualizados a cada escrita.
+
+    Só os usuários usados recentemente ficam em memória (LRU); os demais são
+    reconstruídos com uma consulta na próxima pergunta. O TTL limita o quanto um
+    índice pode ficar defasado de escritas feitas por outras réplicas.
+    """
+
+    def __init__(self):
+        self._indexes = TTLCache(maxsize=AI_RETRIEVAL_MAX_USERS, ttl=AI_RETRIEVAL_TTL_SECONDS)
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> UserIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is not None:
+            return index
+
+        rows = db.query(
+            TransactionDB.id, TransactionDB.data, TransactionDB.tipo, TransactionDB.valor,
+            TransactionDB.moeda, TransactionDB.categoria, TransactionDB.descricao
+        ).filter(TransactionDB.user_id == user_id).all()
+        index = UserIndex()
+        for row in rows:
+            index.add(Doc.from_row(row))
+        with self._lock:
+            self._indexes.set(user_id, index)
+        return index
+
+    def search(self, db: Session, user_id: int, termos: List[str], periodo: Optional[Tuple[date, date]]) -> List[Doc]:
+        """Transações que casam com os termos (no período); sem termos, todas as do período.
+
+        Se a pergunta cita algo ("academia") e nada casa, a resposta é vazia:
+        voltar para o período inteiro mostraria transações que não têm relação.
+        Plurais e prefixos casam (ver `tokenize` e `UserIndex.expand`).
+        """
+        index = self.get(db, user_id)
+        with self._lock:
+            if termos:
+                return [doc for _, doc in index.search(termos, periodo)]
+            return index.in_period(periodo) if periodo else []
+
+    def upsert(self, transaction: TransactionDB) -> None:
+        """Chamado após criar/editar uma transação (só atualiza índices já carregados)"""
+        with self._lock:
+            index = self._indexes.get(transaction.user_id)
+            if index is not None:
+                index.add(Doc.from_row(transaction))
+
+    def remove(self, user_id: int, transaction_id: int) -> None:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.remove(transaction_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """Para escritas em lote: o índice é reconstruído na próxima pergunta"""
+        self._indexes.delete(user_id)
+
+
+retrieval_index = RetrievalIndex()
+
+
+def period_totals_context(docs: List[Doc], periodo_texto: str) -> str:
+    """Totais do período por tipo e categoria, sem listar transações"""
+    totais: Dict[Tuple[str, str, str], List[float]] = {}
+    for doc in docs:
+        total = totais.setdefault((doc.tipo, doc.categoria, doc.moeda), [0.0, 0])
+        total[0] += doc.valor
+        total[1] += 1
+
+    context = f"\nTotais do período{periodo_texto} por categoria:\n"
+    for (tipo, categoria, moeda), (valor, quantidade) in sorted(totais.items()):
+        context += f"- {categoria} ({tipo}): {fmt_valor(valor, moeda)} em {quantidade} transações\n"
+    return context
+
+
+def relevant_transactions_context(db: Session, user_id: int, pergunta: str, k: int = AI_RETRIEVAL_TOP_K) -> str:
+    """Top-k transações relevantes para a pergunta + totais de tudo que casou.
+
+    Se os termos não casam com nada, vale o período: os totais por categoria
+    deixam o modelo responder com os dados, em vez de afirmar que não houve
+    gasto só porque a palavra da pergunta não aparece nas descrições.
+    """
+    termos = tokenize(pergunta)
+    periodo = parse_date_range(pergunta, date.today())
+    if not termos and not periodo:
+        return ""
+
+    encontrados = retrieval_index.search(db, user_id, termos, periodo)
+    periodo_texto = f" (de {periodo[0]} até {periodo[1] - timedelta(days=1)})" if periodo else ""
+    if not encontrados:
+        if not periodo:
+            return ""
+        do_periodo = retrieval_index.search(db, user_id, [], periodo)
+        return period_totals_context(do_periodo, periodo_texto) if do_periodo else ""
+
+    totais: Dict[Tuple[str, str], List[float]] = {}
+    for doc in encontrados:
+        total = totais.setdefault((doc.tipo, doc.moeda), [0.0, 0])
+        total[0] += doc.valor
+        total[1] += 1
+
+    context = f"\nTransações relevantes para a pergunta{periodo_texto}:\n"
+    for (tipo, moeda), (valor, quantidade) in sorted(totais.items()):
+        context += f"- Total de {tipo}s: {fmt_valor(valor, moeda)} em {quantidade} transações\n"
+    for doc in encontrados[:k]:
+        sinal = "+" if doc.tipo == "receita" else "-"
+        context += f"- {doc.data}: {sinal}{fmt_valor(doc.valor, doc.moeda)} ({doc.categoria}) - {doc.descricao or 'Sem descrição'}\n"
+    return context
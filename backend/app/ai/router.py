@@ -1,20 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from datetime import date, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
 
 from app.config.database import get_db
 from app.models.user import User
-from app.models.transaction_db import TransactionDB
 from app.auth.router import get_current_user
-
-load_dotenv()
-
-# Configurar Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash')
+from app.auth.internal import require_internal_key
+from app.models.user_db import UserDB
+from app.utils.phone import normalize_phone
+from app.ai.context import get_user_financial_context
+from app.ai.client import llm, LLMBusy, LLMTimeout, LLMQuotaExceeded
+from app.ai.memory import load_conversation, remember_turn
+from app.ai.response_cache import response_cache
+from app.ai.suggestions import get_user_suggestions
+from app.ai.retrieval import relevant_transactions_context
+from app.ai.tools import chat_with_tools, stream_with_tools
+from app.ai.usage import usage_meter, Uso
+from app.ai.prompts import CHAT_PROMPT
+from app.ai.prompt_engine import Section
+from app.config.settings import AI_CHAT_MODE, AI_USER_DAILY_TOKEN_QUOTA
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
@@ -24,118 +35,215 @@ class ChatMessage(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
-def get_user_financial_context(db: Session, user_id: int) -> str:
-    """Busca o contexto financeiro do usuário para a IA"""
-    transactions = db.query(TransactionDB).filter(
-        TransactionDB.user_id == user_id
-    ).order_by(TransactionDB.data.desc()).limit(50).all()
-    
-    if not transactions:
-        return "O usuário ainda não possui transações registradas."
-    
-    receitas = sum(t.valor for t in transactions if t.tipo == "receita")
-    despesas = sum(t.valor for t in transactions if t.tipo == "despesa")
-    saldo = receitas - despesas
-    
-    # Agrupar por categoria
-    categorias_despesas = {}
-    for t in transactions:
-        if t.tipo == "despesa":
-            if t.categoria not in categorias_despesas:
-                categorias_despesas[t.categoria] = 0
-            categorias_despesas[t.categoria] += t.valor
-    
-    context = f"""
-Resumo financeiro do usuário:
-- Total de receitas: R$ {receitas:.2f}
-- Total de despesas: R$ {despesas:.2f}
-- Saldo atual: R$ {saldo:.2f}
-
-Despesas por categoria:
-"""
-    for cat, valor in sorted(categorias_despesas.items(), key=lambda x: x[1], reverse=True):
-        context += f"- {cat}: R$ {valor:.2f}\n"
-    
-    context += f"\nÚltimas transações:\n"
-    for t in transactions[:10]:
-        tipo = "+" if t.tipo == "receita" else "-"
-        context += f"- {t.data}: {tipo}R$ {t.valor:.2f} ({t.categoria}) - {t.descricao or 'Sem descrição'}\n"
-    
-    return context
+class UsageEvent(BaseModel):
+    telefone: Optional[str] = None
+    feature: str
+    modelo: str
+    tokens_prompt: int
+    tokens_resposta: int
+    latencia_ms: float
+
+def llm_http_exception(e: Exception) -> HTTPException:
+    if isinstance(e, LLMBusy):
+        return HTTPException(status_code=503, detail="A assistente está ocupada agora, tente de novo em instantes", headers={"Retry-After": "2"})
+    if isinstance(e, LLMQuotaExceeded):
+        return HTTPException(status_code=429, detail="Você atingiu o limite diário de conversas com a assistente. Volte amanhã!")
+    if isinstance(e, LLMTimeout):
+        return HTTPException(status_code=504, detail="A assistente demorou demais para responder, tente novamente")
+    return HTTPException(status_code=500, detail=f"Erro ao processar mensagem: {str(e)}")
+
+async def build_contents(db: Session, user_id: int, message: str) -> list:
+    """Histórico recente da conversa + dados do usuário e a nova mensagem.
+
+    A persona vai à parte, como system instruction (CHAT_PROMPT); aqui só
+    entram as seções dinâmicas, cortadas pelo orçamento de tokens.
+    """
+    secoes = [Section("Hoje", date.today().isoformat(), 0)]
+    if AI_CHAT_MODE != "tools":
+        financial_context = await run_in_threadpool(get_user_financial_context, db, user_id)
+        # Transações ligadas à pergunta (ex.: "Uber em março") valem mais que o resumo geral
+        relevantes = await run_in_threadpool(relevant_transactions_context, db, user_id, message)
+        secoes += [
+            Section("Transações relacionadas à pergunta", relevantes, 1),
+            Section("Dados financeiros do usuário", financial_context, 2),
+        ]
+    conversa = await run_in_threadpool(load_conversation, db, user_id)
+    secoes.append(Section("Resumo da conversa até aqui", conversa.resumo, 3))
+    return conversa.historico + [{"role": "user", "parts": [f"{CHAT_PROMPT.render(secoes)}\n\nUsuário: {message}"]}]
+
+def sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     message: ChatMessage,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    # Mesma pergunta com os mesmos dados: responde do cache, sem chamar o LLM
+    # (a chave é None para mensagens que dependem da conversa, como "sim")
+    cache_key = response_cache.key(current_user.id, message.message, CHAT_PROMPT.version)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        background_tasks.add_task(remember_turn, current_user.id, message.message, cached)
+        return ChatResponse(response=cached)
+
     try:
-        # Buscar contexto financeiro
-        financial_context = get_user_financial_context(db, current_user.id)
-        
-        # Prompt do sistema
-        system_prompt = f"""Você é a Nex, a assistente virtual do Nexfy - mas você é muito mais que uma IA. Você é como uma amiga de confiança que entende de finanças e está sempre por perto pra ajudar.
-
-## Sua personalidade:
-- Você é acolhedora, empática e genuinamente interessada no bem-estar do usuário
-- Fala de forma casual e natural, como uma amiga próxima
-- Usa emojis com moderação para transmitir calor humano 😊
-- Comemora as conquistas do usuário, mesmo as pequenas
-- É encorajadora quando o usuário está passando por dificuldades
-- Tem senso de humor leve quando apropriado
-- NUNCA julga os gastos - cada pessoa tem suas prioridades
-- Chama o usuário de "você" de forma carinhosa
-
-## O que você pode fazer:
-- Conversar sobre QUALQUER assunto (não só finanças!)
-- Dar conselhos financeiros personalizados
-- Analisar gastos e identificar padrões
-- Sugerir formas de economizar sem ser chata
-- Ouvir desabafos e dar apoio emocional
-- Recomendar filmes, dar opiniões, bater papo casual
-- Comemorar conquistas e motivar em momentos difíceis
-
-## Dados financeiros do usuário:
-{financial_context}
-
-## Como responder:
-1. Se a pessoa quer conversar: seja calorosa e natural
-2. Se é sobre finanças: analise os dados e dê insights úteis de forma amigável
-3. Se a pessoa está preocupada: mostre empatia PRIMEIRO, depois ajude
-4. Seja específica quando usar os dados (cite valores, categorias)
-5. Dê dicas práticas e alcançáveis, nunca genéricas
-6. Se não tiver dados suficientes, pergunte de forma gentil
-
-## Exemplos de tom:
-- Em vez de "Você gastou muito em alimentação", diga "Notei que a alimentação tá pesando um pouco no orçamento... quer que a gente pense em algumas ideias juntos?"
-- Em vez de "Seu saldo é X", diga "Você tá com R$ X disponível! Tá indo bem, hein? 💪"
-- Em vez de "Não tenho essa informação", diga "Hmm, ainda não tenho essa info aqui... me conta mais?"
-
-Responda sempre em português brasileiro, de forma natural e humanizada.
-"""
+        # Contexto financeiro + memória da conversa (consultas síncronas fora do event loop)
+        contents = await build_contents(db, current_user.id, message.message)
         
         # Gerar resposta
-        chat = model.start_chat(history=[])
-        response = chat.send_message(f"{system_prompt}\n\nUsuário: {message.message}")
+        if AI_CHAT_MODE == "tools":
+            text = await chat_with_tools(db, current_user.id, contents, CHAT_PROMPT.system_instruction, feature="chat")
+        else:
+            text = (await llm.generate(
+                contents, system_instruction=CHAT_PROMPT.system_instruction, feature="chat", user_id=current_user.id
+            )).text
         
-        return ChatResponse(response=response.text)
+        response_cache.set(cache_key, text)
+        background_tasks.add_task(remember_turn, current_user.id, message.message, text)
+        return ChatResponse(response=text)
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao processar mensagem: {str(e)}")
+        raise llm_http_exception(e)
+
+@router.post("/chat/stream")
+async def chat_stream(
+    message: ChatMessage,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Mesma conversa do /chat, mas envia o texto via Server-Sent Events conforme é gerado"""
+    cache_key = response_cache.key(current_user.id, message.message, CHAT_PROMPT.version)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        async def cached_events():
+            yield sse_event({"delta": cached})
+            yield sse_event({}, event="done")
+
+        return StreamingResponse(
+            cached_events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+            background=BackgroundTask(remember_turn, current_user.id, message.message, cached)
+        )
+
+    contents = await build_contents(db, current_user.id, message.message)
+    if AI_CHAT_MODE == "tools":
+        chunks = stream_with_tools(db, current_user.id, contents, CHAT_PROMPT.system_instruction, feature="chat_stream")
+    else:
+        chunks = llm.stream(
+            contents, system_instruction=CHAT_PROMPT.system_instruction, feature="chat_stream", user_id=current_user.id
+        )
+    resposta = []
+    completo = asyncio.Event()
+
+    # Busca o primeiro pedaço antes de responder, para devolver 503/504 com status HTTP correto
+    try:
+        first = await anext(chunks, "")
+    except Exception as e:
+        raise llm_http_exception(e)
+
+    async def events():
+        try:
+            if first:
+                resposta.append(first)
+                yield sse_event({"delta": first})
+            async for text in chunks:
+                if await request.is_disconnected():
+                    return
+                resposta.append(text)
+                yield sse_event({"delta": text})
+            completo.set()
+            yield sse_event({}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": f"Erro ao processar mensagem: {str(e)}"}, event="error")
+        finally:
+            await chunks.aclose()
+
+    async def after_stream():
+        # Só entra na memória a resposta que o usuário recebeu por inteiro
+        if completo.is_set():
+            response_cache.set(cache_key, "".join(resposta))
+            await remember_turn(current_user.id, message.message, "".join(resposta))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(after_stream)
+    )
 
 @router.get("/suggestions")
-async def get_suggestions(
+def get_suggestions(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Retorna sugestões de perguntas pré-calculadas a partir dos dados do usuário"""
+    return {"suggestions": get_user_suggestions(db, current_user.id)}
+
+def _sum_usage(totais: dict, agrupar) -> dict:
+    grupos = {}
+    for chave, uso in totais.items():
+        grupos.setdefault(agrupar(chave), Uso()).add(uso)
+    return {str(k): v.as_dict() for k, v in sorted(grupos.items(), key=lambda item: -(item[1].tokens_prompt + item[1].tokens_resposta))}
+
+@router.get("/usage")
+def get_usage(
+    dias: int = 30,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Retorna sugestões de perguntas baseadas no perfil do usuário"""
+    """Uso da assistente pelo usuário: por feature no período e tokens de hoje x cota"""
+    hoje = date.today()
+    totais = usage_meter.totals(db, current_user.id, hoje - timedelta(days=dias - 1))
+    usados_hoje = sum(u.tokens_prompt + u.tokens_resposta for (_, _, _, dia), u in totais.items() if dia == hoje)
     return {
-        "suggestions": [
-            "Como tá minha situação financeira?",
-            "Me ajuda a economizar esse mês",
-            "Onde tô gastando mais?",
-            "Tô pensando em investir, por onde começo?",
-            "Como faço pra juntar uma reserva de emergência?",
-            "Me dá umas dicas pra controlar melhor meu dinheiro"
-        ]
+        "por_feature": _sum_usage(totais, lambda chave: chave[1]),
+        "tokens_hoje": usados_hoje,
+        "cota_diaria": AI_USER_DAILY_TOKEN_QUOTA or None
     }
+
+@router.get("/usage/summary", dependencies=[Depends(require_internal_key)])
+def get_usage_summary(dias: int = 7, limite: int = 20, db: Session = Depends(get_db)):
+    """Uso de todos os usuários (interno): por feature, por modelo e os usuários que mais consomem"""
+    totais = usage_meter.totals(db, desde=date.today() - timedelta(days=dias - 1))
+    por_usuario = _sum_usage(totais, lambda chave: chave[0])
+    return {
+        "por_feature": _sum_usage(totais, lambda chave: chave[1]),
+        "por_modelo": _sum_usage(totais, lambda chave: chave[2]),
+        "por_dia": _sum_usage(totais, lambda chave: chave[3]),
+        "top_usuarios": dict(list(por_usuario.items())[:limite])
+    }
+
+@router.post("/usage/report", dependencies=[Depends(require_internal_key)])
+def report_usage(events: List[UsageEvent], db: Session = Depends(get_db)):
+    """Lote de medições enviado pelo webhook do WhatsApp.
+
+    Retorna os telefones que já passaram da cota diária, para o webhook
+    parar de chamar o modelo para eles.
+    """
+    telefones = {e.telefone: normalize_phone(e.telefone) for e in events if e.telefone}
+    usuarios = dict(db.query(UserDB.telefone_e164, UserDB.id).filter(
+        UserDB.telefone_e164.in_([t for t in telefones.values() if t])
+    ).all()) if telefones else {}
+
+    por_usuario = {}
+    for e in events:
+        user_id = usuarios.get(telefones.get(e.telefone))
+        usage_meter.record(user_id, e.feature, e.modelo, e.tokens_prompt, e.tokens_resposta, e.latencia_ms)
+        if user_id is not None:
+            por_usuario.setdefault(user_id, []).append(e.telefone)
+
+    bloqueados = []
+    if AI_USER_DAILY_TOKEN_QUOTA:
+        hoje = date.today()
+        totais = usage_meter.totals(db, desde=hoje)
+        for user_id, tels in por_usuario.items():
+            usados = sum(u.tokens_prompt + u.tokens_resposta for (uid, _, _, _), u in totais.items() if uid == user_id)
+            if usados >= AI_USER_DAILY_TOKEN_QUOTA:
+                bloqueados.extend(set(tels))
+    return {"registrados": len(events), "bloqueados": bloqueados}
@@ -0,0 +1,133 @@
+import json
+from datetime import date, timedelta
+from typing import Dict, List
+from sqlalchemy import func, case, or_, and_
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.models.transaction_db import TransactionDB
+from app.models.conta_fixa_db import ContaFixaDB
+from app.models.meta_db import MetaDB
+from app.models.sugestao_db import SugestaoDB
+from app.ai.context import fmt_valor, inicio_mes
+
+MAX_SUGESTOES = 6
+
+SUGESTOES_PADRAO = [
+    "Como tá minha situação financeira?",
+    "Me ajuda a economizar esse mês",
+    "Onde tô gastando mais?",
+    "Tô pensando em investir, por onde começo?",
+    "Como faço pra juntar uma reserva de emergência?",
+    "Me dá umas dicas pra controlar melhor meu dinheiro"
+]
+
+# Aumento mínimo (e gasto mínimo no mês passado) para sugerir uma categoria
+AUMENTO_MINIMO = 0.2
+GASTO_MINIMO_ANTERIOR = 50
+
+
+def _categorias_em_alta(db: Session, hoje: date) -> Dict[int, List[str]]:
+    """Gasto do mês até hoje x mesmo período do mês passado, por usuário e categoria"""
+    mes_atual = inicio_mes(hoje)
+    mes_anterior = inicio_mes(hoje, 1)
+    # Mesmo dia do mês passado (limitado ao último dia daquele mês)
+    corte_anterior = min(mes_anterior + timedelta(days=hoje.day), mes_atual)
+
+    atual = func.sum(case((TransactionDB.data >= mes_atual, TransactionDB.valor), else_=0))
+    anterior = func.sum(case((TransactionDB.data < corte_anterior, TransactionDB.valor), else_=0))
+    rows = db.query(
+        TransactionDB.user_id, TransactionDB.categoria, TransactionDB.moeda, atual, anterior
+    ).filter(
+        TransactionDB.tipo == "despesa",
+        or_(
+            and_(TransactionDB.data >= mes_anterior, TransactionDB.data < corte_anterior),
+            and_(TransactionDB.data >= mes_atual, TransactionDB.data <= hoje)
+        )
+    ).group_by(TransactionDB.user_id, TransactionDB.categoria, TransactionDB.moeda).all()
+
+    melhores = {}
+    for user_id, categoria, moeda, valor_atual, valor_anterior in rows:
+        if not valor_anterior or valor_anterior < GASTO_MINIMO_ANTERIOR:
+            continue
+        aumento = (valor_atual - valor_anterior) / valor_anterior
+        if aumento >= AUMENTO_MINIMO and aumento > melhores.get(user_id, (0, ""))[0]:
+            melhores[user_id] = (aumento, f"Seus gastos com {categoria} subiram {aumento * 100:.0f}%. O que eu posso fazer pra ajudar?")
+    return {user_id: [texto] for user_id, (_, texto) in melhores.items()}
+
+
+def _contas_vencendo(db: Session, hoje: date) -> Dict[int, List[str]]:
+    """Contas fixas não pagas que vencem hoje ou amanhã"""
+    amanha = hoje + timedelta(days=1)
+    rows = db.query(
+        ContaFixaDB.user_id, ContaFixaDB.nome, ContaFixaDB.ano_referencia,
+        ContaFixaDB.mes_referencia, ContaFixaDB.dia_vencimento
+    ).filter(
+        ContaFixaDB.pago == False,
+        or_(*[
+            and_(
+                ContaFixaDB.ano_referencia == dia.year,
+                ContaFixaDB.mes_referencia == dia.month,
+                ContaFixaDB.dia_vencimento == dia.day
+            ) for dia in (hoje, amanha)
+        ])
+    ).order_by(ContaFixaDB.dia_vencimento).all()
+
+    sugestoes = {}
+    for user_id, nome, ano, mes, dia in rows:
+        quando = "hoje" if (ano, mes, dia) == (hoje.year, hoje.month, hoje.day) else "amanhã"
+        sugestoes.setdefault(user_id, []).append(f"Sua conta de {nome} vence {quando}. Tô com dinheiro pra pagar?")
+    return sugestoes
+
+
+def _metas_proximas(db: Session) -> Dict[int, List[str]]:
+    """A meta ainda não atingida mais perto de ser concluída, por usuário"""
+    falta = MetaDB.valor_alvo - MetaDB.valor_atual
+    rows = db.query(
+        MetaDB.user_id, MetaDB.nome, MetaDB.moeda, falta
+    ).filter(falta > 0).order_by(MetaDB.user_id, falta).all()
+
+    sugestoes = {}
+    for user_id, nome, moeda, valor in rows:
+        if user_id not in sugestoes:
+            sugestoes[user_id] = [f"Faltam {fmt_valor(valor, moeda)} para a meta {nome}. Como chego lá mais rápido?"]
+    return sugestoes
+
+
+def compute_all_suggestions(db: Session) -> int:
+    """Recalcula as sugestões de todos os usuários a partir de agregados em lote"""
+    hoje = date.today()
+    por_usuario: Dict[int, List[str]] = {}
+    for parcial in (_contas_vencendo(db, hoje), _categorias_em_alta(db, hoje), _metas_proximas(db)):
+        for user_id, textos in parcial.items():
+            por_usuario.setdefault(user_id, []).extend(textos)
+
+    db.query(SugestaoDB).delete()
+    db.bulk_insert_mappings(SugestaoDB, [
+        {
+            "user_id": user_id,
+            "sugestoes": json.dumps(
+                (textos + [s for s in SUGESTOES_PADRAO if s not in textos])[:MAX_SUGESTOES],
+                ensure_ascii=False
+            )
+        }
+        for user_id, textos in por_usuario.items()
+    ])
+    db.commit()
+    return len(por_usuario)
+
+
+def refresh_all_suggestions() -> None:
+    """Job periódico (ver app.main)"""
+    db = SessionLocal()
+    try:
+        total = compute_all_suggestions(db)
+        print(f"Sugestões recalculadas para {total} usuários")
+    finally:
+        db.close()
+
+
+def get_user_suggestions(db: Session, user_id: int) -> List[str]:
+    """Leitura única por chave; usuários sem dados recebem as sugestões padrão"""
+    row = db.get(SugestaoDB, user_id)
+    return json.loads(row.sugestoes) if row else SUGESTOES_PADRAO
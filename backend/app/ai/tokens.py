@@ -0,0 +1,3 @@
+# A contagem fica junto da montagem de prompts (app.ai.prompt_engine), que o webhook
+# usa igual; reexportada aqui para o resto do backend.
+from app.ai.prompt_engine import CHARS_PER_TOKEN, count_tokens  # noqa: F401
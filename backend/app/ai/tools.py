@@ -0,0 +1,238 @@
+import json
+from datetime import date, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from google.generativeai import protos
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.transaction_db import TransactionDB
+from app.models.conta_fixa_db import ContaFixaDB
+from app.models.meta_db import MetaDB
+from app.models.investimento_db import InvestimentoDB
+from app.ai.client import llm
+from app.ai.retrieval import retrieval_index, tokenize
+from app.config.settings import AI_TOOLS_MAX_STEPS
+
+# Ferramentas que o modelo pode chamar. Cada uma é uma consulta fixa,
+# sempre filtrada pelo usuário logado: o modelo só escolhe os parâmetros.
+LIMITE_TRANSACOES = 50
+
+
+def _parse_data(valor: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(valor) if valor else None
+
+
+def totais_por_periodo(db: Session, user_id: int, inicio: str, fim: str,
+                       categoria: str = None, tipo: str = None) -> List[dict]:
+    query = db.query(
+        TransactionDB.tipo, TransactionDB.categoria, TransactionDB.moeda,
+        func.sum(TransactionDB.valor), func.count(TransactionDB.id)
+    ).filter(
+        TransactionDB.user_id == user_id,
+        TransactionDB.data >= _parse_data(inicio),
+        TransactionDB.data <= _parse_data(fim)
+    )
+    if categoria:
+        query = query.filter(func.lower(TransactionDB.categoria) == categoria.lower())
+    if tipo:
+        query = query.filter(TransactionDB.tipo == tipo)
+    rows = query.group_by(TransactionDB.tipo, TransactionDB.categoria, TransactionDB.moeda).all()
+    return [
+        {"tipo": t, "categoria": c, "moeda": m, "total": round(total or 0, 2), "quantidade": n}
+        for t, c, m, total, n in rows
+    ]
+
+
+def listar_transacoes(db: Session, user_id: int, inicio: str = None, fim: str = None,
+                      categoria: str = None, tipo: str = None, texto: str = None,
+                      limite: int = 20) -> List[dict]:
+    limite = max(1, min(int(limite), LIMITE_TRANSACOES))
+    inicio_data, fim_data = _parse_data(inicio), _parse_data(fim)
+
+    termos = tokenize(texto)
+    if termos:
+        # Busca por palavras usa o mesmo índice BM25 do contexto (sem acento, plurais e
+        # prefixos casam). Se nenhum termo casa, a lista fica vazia: nunca devolve
+        # outras transações no lugar
+        periodo = (inicio_data or date.min, (fim_data or date.max - timedelta(days=1)) + timedelta(days=1))
+        docs = retrieval_index.search(db, user_id, termos, periodo)
+        rows = [
+            d for d in docs
+            if (not categoria or d.categoria.lower() == categoria.lower()) and (not tipo or d.tipo == tipo)
+        ][:limite]
+    else:
+        query = db.query(
+            TransactionDB.data, TransactionDB.tipo, TransactionDB.valor,
+            TransactionDB.moeda, TransactionDB.categoria, TransactionDB.descricao
+        ).filter(TransactionDB.user_id == user_id)
+        if inicio_data:
+            query = query.filter(TransactionDB.data >= inicio_data)
+        if fim_data:
+            query = query.filter(TransactionDB.data <= fim_data)
+        if categoria:
+            query = query.filter(func.lower(TransactionDB.categoria) == categoria.lower())
+        if tipo:
+            query = query.filter(TransactionDB.tipo == tipo)
+        rows = query.order_by(TransactionDB.data.desc()).limit(limite).all()
+
+    return [
+        {"data": str(r.data), "tipo": r.tipo, "valor": r.valor, "moeda": r.moeda,
+         "categoria": r.categoria, "descricao": r.descricao}
+        for r in rows
+    ]
+
+
+def contas_a_vencer(db: Session, user_id: int, dias: int = 30) -> List[dict]:
+    hoje = date.today()
+    fim = hoje + timedelta(days=max(1, min(int(dias), 366)))
+    # Compara (ano, mês, dia) como um número AAAAMMDD
+    vencimento = ContaFixaDB.ano_referencia * 10000 + ContaFixaDB.mes_referencia * 100 + ContaFixaDB.dia_vencimento
+    rows = db.query(
+        ContaFixaDB.nome, ContaFixaDB.valor, ContaFixaDB.moeda, ContaFixaDB.categoria,
+        ContaFixaDB.ano_referencia, ContaFixaDB.mes_referencia, ContaFixaDB.dia_vencimento,
+        ContaFixaDB.parcela_atual, ContaFixaDB.parcela_total
+    ).filter(
+        ContaFixaDB.user_id == user_id,
+        ContaFixaDB.pago == False,
+        ContaFixaDB.ano_referencia.between(hoje.year, fim.year),
+        vencimento >= hoje.year * 10000 + hoje.month * 100 + hoje.day,
+        vencimento <= fim.year * 10000 + fim.month * 100 + fim.day
+    ).order_by(vencimento).all()
+    return [
+        {"nome": r.nome, "valor": r.valor, "moeda": r.moeda, "categoria": r.categoria,
+         "vencimento": f"{r.ano_referencia:04d}-{r.mes_referencia:02d}-{r.dia_vencimento:02d}",
+         "parcela": f"{r.parcela_atual}/{r.parcela_total}"}
+        for r in rows
+    ]
+
+
+def progresso_metas(db: Session, user_id: int) -> List[dict]:
+    rows = db.query(
+        MetaDB.nome, MetaDB.valor_alvo, MetaDB.valor_atual, MetaDB.moeda, MetaDB.data_limite
+    ).filter(MetaDB.user_id == user_id).all()
+    return [
+        {"nome": r.nome, "valor_alvo": r.valor_alvo, "valor_atual": r.valor_atual or 0, "moeda": r.moeda,
+         "progresso_percentual": round((r.valor_atual or 0) / r.valor_alvo * 100, 1) if r.valor_alvo else 0,
+         "data_limite": str(r.data_limite) if r.data_limite else None}
+        for r in rows
+    ]
+
+
+def resumo_investimentos(db: Session, user_id: int) -> List[dict]:
+    rows = db.query(
+        InvestimentoDB.tipo, InvestimentoDB.moeda,
+        func.sum(InvestimentoDB.valor_investido), func.sum(InvestimentoDB.valor_atual),
+        func.count(InvestimentoDB.id)
+    ).filter(InvestimentoDB.user_id == user_id).group_by(InvestimentoDB.tipo, InvestimentoDB.moeda).all()
+    return [
+        {"tipo": tipo, "moeda": moeda, "investido": round(investido, 2), "atual": round(atual, 2),
+         "rentabilidade_percentual": round((atual - investido) / investido * 100, 2) if investido else 0,
+         "quantidade": n}
+        for tipo, moeda, investido, atual, n in rows
+    ]
+
+
+_DATA = {"type": "string", "description": "Data no formato AAAA-MM-DD"}
+_TIPO = {"type": "string", "enum": ["receita", "despesa"]}
+
+TOOLS: Dict[str, Callable] = {
+    "totais_por_periodo": totais_por_periodo,
+    "listar_transacoes": listar_transacoes,
+    "contas_a_vencer": contas_a_vencer,
+    "progresso_metas": progresso_metas,
+    "resumo_investimentos": resumo_investimentos,
+}
+
+TOOL_DECLARATIONS = [{"function_declarations": [
+    {
+        "name": "totais_por_periodo",
+        "description": "Soma das transações do usuário entre duas datas, por tipo, categoria e moeda",
+        "parameters": {
+            "type": "object",
+            "properties": {"inicio": _DATA, "fim": _DATA, "categoria": {"type": "string"}, "tipo": _TIPO},
+            "required": ["inicio", "fim"],
+        },
+    },
+    {
+        "name": "listar_transacoes",
+        "description": "Lista transações do usuário (mais recentes ou mais relevantes para 'texto', ex.: 'uber'). "
+                       "Lista vazia com 'texto' só quer dizer que nenhuma descrição ou categoria tem essas "
+                       "palavras: antes de dizer que não houve gasto, consulte sem 'texto' ou totais_por_periodo",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "inicio": _DATA, "fim": _DATA, "categoria": {"type": "string"}, "tipo": _TIPO,
+                "texto": {"type": "string", "description": "Palavras da descrição ou categoria"},
+                "limite": {"type": "integer", "description": f"Máximo {LIMITE_TRANSACOES}"},
+            },
+        },
+    },
+    {
+        "name": "contas_a_vencer",
+        "description": "Contas fixas não pagas que vencem nos próximos dias",
+        "parameters": {"type": "object", "properties": {"dias": {"type": "integer"}}},
+    },
+    {
+        "name": "progresso_metas",
+        "description": "Metas de economia do usuário com valor alvo, valor atual e prazo",
+    },
+    {
+        "name": "resumo_investimentos",
+        "description": "Carteira de investimentos do usuário agrupada por tipo e moeda",
+    },
+]}]
+
+
+def run_tool(db: Session, user_id: int, name: str, args: dict) -> dict:
+    """Executa uma ferramenta da lista; erros voltam para o modelo como resultado"""
+    tool = TOOLS.get(name)
+    if tool is None:
+        return {"erro": f"Ferramenta desconhecida: {name}"}
+    try:
+        return {"resultado": tool(db, user_id, **args)}
+    except (TypeError, ValueError) as e:
+        return {"erro": f"Parâmetros inválidos: {e}"}
+
+
+async def _resolve_calls(db: Session, user_id: int, calls: list) -> dict:
+    """Executa as chamadas pedidas pelo modelo e monta a resposta no formato do Gemini"""
+    parts = []
+    for call in calls:
+        result = await run_in_threadpool(run_tool, db, user_id, call.name, dict(call.args))
+        # Ida e volta pelo JSON para converter tipos do protobuf (ex.: números como float)
+        parts.append(protos.Part(function_response=protos.FunctionResponse(
+            name=call.name, response=json.loads(json.dumps(result, default=str))
+        )))
+    return {"role": "user", "parts": parts}
+
+
+async def stream_with_tools(db: Session, user_id: int, contents: list, system_instruction: str = None,
+                            feature: str = "chat") -> AsyncIterator[str]:
+    """Conversa em que o modelo consulta os dados por ferramentas antes de responder.
+
+    Transmite o texto conforme é gerado; chamadas de ferramenta são executadas
+    e devolvidas ao modelo, até AI_TOOLS_MAX_STEPS rodadas (a última sem
+    ferramentas, para forçar uma resposta com o que já foi consultado).
+    """
+    contents = list(contents)
+    for step in range(AI_TOOLS_MAX_STEPS + 1):
+        tools = TOOL_DECLARATIONS if step < AI_TOOLS_MAX_STEPS else None
+        chamadas = []
+        async for chunk in llm.stream_chunks(
+            contents, tools=tools, system_instruction=system_instruction, feature=feature, user_id=user_id
+        ):
+            for part in chunk.parts:
+                if part.function_call.name:
+                    chamadas.append(part)
+                elif part.text:
+                    yield part.text
+        if not chamadas:
+            return
+        contents.append({"role": "model", "parts": chamadas})
+        contents.append(await _resolve_calls(db, user_id, [p.function_call for p in chamadas]))
+
+
+async def chat_with_tools(db: Session, user_id: int, contents: list, system_instruction: str = None,
+                          feature: str = "chat") -> str:
+    return "".join([text async for text in stream_with_tools(db, user_id, contents, system_instruction, feature)])
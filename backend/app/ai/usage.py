@@ -0,0 +1,169 @@
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.models.llm_uso_db import LLMUsoDB
+from app.ai.tokens import count_tokens
+
+
+@dataclass
+class Uso:
+    chamadas: int = 0
+    tokens_prompt: int = 0
+    tokens_resposta: int = 0
+    latencia_total_ms: float = 0.0
+    latencia_max_ms: float = 0.0
+
+    def add(self, outro: "Uso") -> None:
+        self.chamadas += outro.chamadas
+        self.tokens_prompt += outro.tokens_prompt
+        self.tokens_resposta += outro.tokens_resposta
+        self.latencia_total_ms += outro.latencia_total_ms
+        self.latencia_max_ms = max(self.latencia_max_ms, outro.latencia_max_ms)
+
+    def as_dict(self) -> dict:
+        return {
+            "chamadas": self.chamadas,
+            "tokens_prompt": self.tokens_prompt,
+            "tokens_resposta": self.tokens_resposta,
+            "tokens_total": self.tokens_prompt + self.tokens_resposta,
+            "latencia_media_ms": round(self.latencia_total_ms / self.chamadas, 1) if self.chamadas else 0,
+            "latencia_max_ms": round(self.latencia_max_ms, 1),
+        }
+
+
+# (user_id, feature, modelo, dia)
+Chave = Tuple[Optional[int], str, str, date]
+
+
+def contents_text(contents) -> str:
+    """Texto de um "contents" do Gemini, para estimar tokens quando o modelo não informa"""
+    if isinstance(contents, str):
+        return contents
+    partes = []
+    for item in contents or []:
+        if isinstance(item, str):
+            partes.append(item)
+        elif isinstance(item, dict):
+            partes.extend(p for p in item.get("parts", []) if isinstance(p, str))
+    return "\n".join(partes)
+
+
+def response_text(response) -> str:
+    """Texto da resposta sem erro quando ela só traz chamadas de ferramenta"""
+    return "".join(p.text for p in getattr(response, "parts", None) or [] if p.text)
+
+
+def usage_tokens(response, contents, text: str, system_instruction: str = "") -> Tuple[int, int]:
+    """(tokens do prompt, tokens da resposta): os do Gemini ou uma estimativa local"""
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None and metadata.prompt_token_count:
+        return metadata.prompt_token_count, metadata.candidates_token_count
+    return count_tokens(system_instruction) + count_tokens(contents_text(contents)), count_tokens(text)
+
+
+class UsageMeter:
+    """Agrega o uso do LLM em memória e grava em lotes na tabela llm_uso.
+
+    Também mantém os tokens do dia por usuário, para a cota diária sem
+    consultar o banco a cada chamada. Os contadores são por processo: com
+    várias réplicas, cada uma só conhece o próprio uso desde o último flush.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Chave, Uso] = {}
+        self._tokens_hoje: Dict[Tuple[int, date], int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_id: Optional[int], feature: str, modelo: str,
+               tokens_prompt: int, tokens_resposta: int, latencia_ms: float) -> None:
+        hoje = date.today()
+        uso = Uso(1, tokens_prompt, tokens_resposta, latencia_ms, latencia_ms)
+        with self._lock:
+            self._pending.setdefault((user_id, feature, modelo, hoje), Uso()).add(uso)
+            if user_id is not None and (user_id, hoje) in self._tokens_hoje:
+                self._tokens_hoje[(user_id, hoje)] += tokens_prompt + tokens_resposta
+
+    def flush(self) -> int:
+        """Grava o que foi agregado desde o último flush (job periódico, ver app.main)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # Descarta contadores de cota de dias anteriores
+            hoje = date.today()
+            self._tokens_hoje = {k: v for k, v in self._tokens_hoje.items() if k[1] == hoje}
+        if not pending:
+            return 0
+
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(LLMUsoDB, [
+                {"user_id": user_id, "feature": feature, "modelo": modelo, "dia": dia, **uso.__dict__}
+                for (user_id, feature, modelo, dia), uso in pending.items()
+            ])
+            db.commit()
+        except Exception:
+            # Devolve o lote para a próxima tentativa
+            with self._lock:
+                for chave, uso in pending.items():
+                    self._pending.setdefault(chave, Uso()).add(uso)
+            raise
+        finally:
+            db.close()
+        return len(pending)
+
+    def _load_tokens_today(self, user_id: int) -> int:
+        hoje = date.today()
+        db = SessionLocal()
+        try:
+            total = db.query(
+                func.coalesce(func.sum(LLMUsoDB.tokens_prompt + LLMUsoDB.tokens_resposta), 0)
+            ).filter(LLMUsoDB.user_id == user_id, LLMUsoDB.dia == hoje).scalar()
+        finally:
+            db.close()
+        with self._lock:
+            total += sum(
+                u.tokens_prompt + u.tokens_resposta
+                for (uid, _, _, dia), u in self._pending.items() if uid == user_id and dia == hoje
+            )
+            return self._tokens_hoje.setdefault((user_id, hoje), total)
+
+    async def tokens_today(self, user_id: int) -> int:
+        cached = self._tokens_hoje.get((user_id, date.today()))
+        if cached is not None:
+            return cached
+        return await run_in_threadpool(self._load_tokens_today, user_id)
+
+    def totals(self, db: Session, user_id: Optional[int] = None, desde: Optional[date] = None) -> Dict[Chave, Uso]:
+        """Uso gravado + pendente, por (usuário, feature, modelo, dia)"""
+        query = db.query(
+            LLMUsoDB.user_id, LLMUsoDB.feature, LLMUsoDB.modelo, LLMUsoDB.dia,
+            func.sum(LLMUsoDB.chamadas), func.sum(LLMUsoDB.tokens_prompt), func.sum(LLMUsoDB.tokens_resposta),
+            func.sum(LLMUsoDB.latencia_total_ms), func.max(LLMUsoDB.latencia_max_ms)
+        )
+        if user_id is not None:
+            query = query.filter(LLMUsoDB.user_id == user_id)
+        if desde is not None:
+            query = query.filter(LLMUsoDB.dia >= desde)
+        rows = query.group_by(LLMUsoDB.user_id, LLMUsoDB.feature, LLMUsoDB.modelo, LLMUsoDB.dia).all()
+
+        totais: Dict[Chave, Uso] = {}
+        for uid, feature, modelo, dia, *valores in rows:
+            totais[(uid, feature, modelo, dia)] = Uso(*valores)
+        with self._lock:
+            for chave, uso in self._pending.items():
+                if (user_id is None or chave[0] == user_id) and (desde is None or chave[3] >= desde):
+                    totais.setdefault(chave, Uso()).add(uso)
+        return totais
+
+
+usage_meter = UsageMeter()
+
+
+def flush_usage() -> None:
+    """Job periódico (ver app.main)"""
+    usage_meter.flush()
@@ -0,0 +1,11 @@
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, status
+
+from app.config.settings import INTERNAL_API_KEY
+
+
+def require_internal_key(x_internal_key: Optional[str] = Header(None)) -> None:
+    """Dependência dos endpoints chamados só por serviços nossos (ex.: webhook do WhatsApp)"""
+    if not INTERNAL_API_KEY or not x_internal_key or not hmac.compare_digest(x_internal_key, INTERNAL_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito")
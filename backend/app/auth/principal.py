@@ -0,0 +1,46 @@
+from typing import Optional
+from sqlalchemy import event
+from app.models.user import User
+from app.models.user_db import UserDB
+from app.utils.cache import TTLCache
+from app.config.database import SessionLocal
+from app.config.settings import PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAXSIZE
+
+# user_id -> User (id, email, name, telefone, provider). O cache é por processo:
+# escritas feitas por outra réplica só aparecem aqui depois do TTL
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAXSIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def get_cached_principal(user_id: int) -> Optional[User]:
+    return principal_cache.get(user_id)
+
+
+def cache_principal(db_user: UserDB) -> User:
+    """Converte o usuário do banco em principal e guarda no cache"""
+    principal = User.model_validate(db_user)
+    principal_cache.set(db_user.id, principal)
+    return principal
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Para escritas em users que não passam pelo flush do ORM (UPDATE direto)"""
+    principal_cache.delete(user_id)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_changed_principals(session, flush_context, instances):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, UserDB) and obj.id is not None:
+            session.info.setdefault("changed_principal_ids", set()).add(obj.id)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_changed_principals(session):
+    # Depois do commit: invalidar antes deixaria outra requisição recarregar a versão antiga
+    for user_id in session.info.pop("changed_principal_ids", ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changed_principals(session):
+    session.info.pop("changed_principal_ids", None)
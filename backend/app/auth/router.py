@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+import math
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.models.user import UserCreate, UserLogin, Token, User, PhoneUpdate, GoogleAuth, PhoneLogin
 from app.models.user_db import UserDB
-from app.auth.security import get_password_hash, verify_password, create_access_token, decode_token
+from app.auth.security import (
+    get_password_hash_async, verify_password_async, password_needs_rehash,
+    PasswordPoolBusy, create_access_token, decode_token
+)
+from app.auth.principal import get_cached_principal, cache_principal
+from app.auth.throttle import login_throttle, client_ip
 from app.config.database import get_db
+from app.utils.phone import normalize_phone
 from pydantic import ValidationError
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -13,7 +21,14 @@ security = HTTPBearer()
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> UserDB:
+) -> User:
+    """Usuário autenticado como `User` (pydantic: id, email, name, provider, telefone), não o UserDB.
+
+    Vem do cache de principais (app.auth.principal), então não está ligado à
+    sessão: para alterar o usuário, carregue o UserDB pelo id. Escritas em
+    users feitas por esta réplica invalidam o cache no commit; as de outras
+    réplicas aparecem em até PRINCIPAL_CACHE_TTL_SECONDS.
+    """
     token = credentials.credentials
     payload = decode_token(token)
     if payload is None:
@@ -21,74 +36,137 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado"
         )
-    email = payload.get("sub")
-    db_user = db.query(UserDB).filter(UserDB.email == email).first()
+    user_id = payload.get("uid")
+    if user_id is not None:
+        principal = get_cached_principal(user_id)
+        if principal is not None:
+            return principal
+        db_user = db.query(UserDB).filter(UserDB.id == user_id).first()
+    else:
+        # Tokens emitidos antes do claim "uid" só têm o email
+        db_user = db.query(UserDB).filter(UserDB.email == payload.get("sub")).first()
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário não encontrado"
         )
+    return cache_principal(db_user)
+
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente em instantes",
+        headers={"Retry-After": "1"}
+    )
+
+# Rotas async (o bcrypt vai para o pool de processos): o acesso ao banco vai
+# para o threadpool pelos helpers abaixo, nunca direto no event loop
+def find_user_by_email(db: Session, email: str):
+    return db.query(UserDB).filter(UserDB.email == email).first()
+
+def save_user(db: Session, db_user: UserDB) -> UserDB:
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
     return db_user
 
 @router.post("/register", response_model=User)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(UserDB).filter(UserDB.email == user.email).first()
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(find_user_by_email, db, user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email já cadastrado"
         )
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
     db_user = UserDB(
         email=user.email,
         name=user.name,
         hashed_password=hashed_password,
         provider="local"
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return await run_in_threadpool(save_user, db, db_user)
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(UserDB).filter(UserDB.email == user.email).first()
-    if not db_user:
+async def login(user: UserLogin, request: Request, db: Session = Depends(get_db)):
+    # Checagem barata antes de qualquer acesso ao banco ou bcrypt
+    ip = client_ip(request)
+    retry_after = login_throttle.check(ip, user.email)
+    if retry_after:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Email ou senha incorretos"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente em instantes",
+            headers={"Retry-After": str(math.ceil(retry_after))}
         )
-    if not verify_password(user.password, db_user.hashed_password):
+    db_user = await run_in_threadpool(find_user_by_email, db, user.email)
+    # Usuários Google não têm senha local
+    if not db_user or not db_user.hashed_password:
+        login_throttle.register_failure(user.email, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
         )
-    access_token = create_access_token(data={"sub": user.email})
+    try:
+        if not await verify_password_async(user.password, db_user.hashed_password):
+            login_throttle.register_failure(user.email, ip)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Email ou senha incorretos"
+            )
+        # Custo do bcrypt mudou: regera o hash com a senha que acabou de ser validada
+        if password_needs_rehash(db_user.hashed_password):
+            db_user.hashed_password = await get_password_hash_async(user.password)
+            db_user = await run_in_threadpool(save_user, db, db_user)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
+    login_throttle.register_success(user.email, ip)
+    access_token = create_access_token(data={"sub": db_user.email, "uid": db_user.id})
     return Token(access_token=access_token)
 
 @router.get("/me", response_model=User)
-def get_me(current_user: UserDB = Depends(get_current_user)):
+def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.put("/update-phone", response_model=User)
 def update_phone(
     phone_data: PhoneUpdate,
     db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
-    current_user.telefone = phone_data.telefone
+    telefone_e164 = normalize_phone(phone_data.telefone)
+    if telefone_e164 is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Telefone inválido"
+        )
+    existing_user = db.query(UserDB).filter(
+        UserDB.telefone_e164 == telefone_e164,
+        UserDB.id != current_user.id
+    ).first()
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Telefone já vinculado a outra conta"
+        )
+    db_user = db.query(UserDB).filter(UserDB.id == current_user.id).first()
+    db_user.telefone = phone_data.telefone
+    db_user.telefone_e164 = telefone_e164
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(db_user)
+    return db_user
 
 @router.post("/login-by-phone", response_model=Token)
 def login_by_phone(phone_data: PhoneLogin, db: Session = Depends(get_db)):
     """Login automático pelo número de telefone (para WhatsApp)"""
-    # Normalizar telefone (remover formatação)
-    telefone = phone_data.telefone.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+    telefone_e164 = normalize_phone(phone_data.telefone)
 
-    # Buscar usuário pelo telefone
-    db_user = db.query(UserDB).filter(UserDB.telefone == telefone).first()
+    # Busca pela coluna canônica (índice único)
+    db_user = None
+    if telefone_e164:
+        db_user = db.query(UserDB).filter(UserDB.telefone_e164 == telefone_e164).first()
 
     if not db_user:
         raise HTTPException(
@@ -96,7 +174,7 @@ def login_by_phone(phone_data: PhoneLogin, db: Session = Depends(get_db)):
             detail="Telefone não vinculado a nenhuma conta"
         )
 
-    access_token = create_access_token(data={"sub": db_user.email})
+    access_token = create_access_token(data={"sub": db_user.email, "uid": db_user.id})
     return Token(access_token=access_token)
 
 
@@ -127,5 +205,5 @@ def google_auth(auth_data: GoogleAuth, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(db_user)
 
-    access_token = create_access_token(data={"sub": db_user.email})
+    access_token = create_access_token(data={"sub": db_user.email, "uid": db_user.id})
     return Token(access_token=access_token)
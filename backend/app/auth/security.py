@@ -2,7 +2,19 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
-from app.config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.config.settings import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_MAXSIZE,
+    BCRYPT_ROUNDS, PASSWORD_POOL_WORKERS, PASSWORD_QUEUE_LIMIT
+)
+from app.utils.cache import TTLCache
+
+# sha256(token) -> payload verificado; cada entrada expira junto com o token
+token_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
@@ -13,9 +25,56 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(
         password.encode('utf-8'),
-        bcrypt.gensalt()
+        bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     ).decode('utf-8')
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True se o hash foi gerado com um custo diferente do BCRYPT_ROUNDS atual"""
+    try:
+        return int(hashed_password.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+class PasswordPoolBusy(Exception):
+    """Fila do pool de senhas cheia - a requisição deve falhar rápido (503)"""
+
+_password_pool: Optional[ProcessPoolExecutor] = None
+_password_pending = 0
+
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _password_pool
+
+async def _run_password_job(fn, *args):
+    global _password_pending
+    if _password_pending >= PASSWORD_QUEUE_LIMIT:
+        raise PasswordPoolBusy()
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_password_pool(), fn, *args)
+    finally:
+        _password_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fora do event loop e do threadpool das rotas"""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash fora do event loop e do threadpool das rotas"""
+    return await _run_password_job(get_password_hash, password)
+
+def shutdown_password_pool():
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(wait=False, cancel_futures=True)
+        _password_pool = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -27,8 +86,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 def decode_token(token: str) -> Optional[dict]:
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            return payload
+        token_cache.delete(key)
+        return None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(key, payload, ttl=exp - time.time())
+    return payload
@@ -0,0 +1,157 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+from fastapi import Request
+from app.utils.cache import TTLCache
+from app.utils.loader import load_object
+from app.config.settings import (
+    LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE,
+    LOGIN_RATE_EMAIL_BURST, LOGIN_RATE_EMAIL_PER_MINUTE,
+    LOGIN_BACKOFF_AFTER_FAILURES, LOGIN_BACKOFF_BASE_SECONDS, LOGIN_BACKOFF_MAX_SECONDS,
+    LOGIN_THROTTLE_BACKEND, TRUST_PROXY_HEADERS
+)
+
+# Estado de cada chave: buckets {"tokens", "updated"}; backoff {"failures", "blocked_until"}
+STATE_TTL_SECONDS = 3600
+
+
+class ThrottleBackend(ABC):
+    """Onde fica o estado do limitador.
+
+    A implementação padrão é em memória (por processo). Para valer entre
+    réplicas, implemente `update` sobre um armazenamento compartilhado
+    (ex.: Redis com transação/Lua) e aponte LOGIN_THROTTLE_BACKEND para ela.
+    """
+
+    @abstractmethod
+    def update(self, key: str, fn: Callable[[dict], dict], ttl: float) -> dict:
+        """Aplica `fn` ao estado atual da chave de forma atômica e devolve o novo estado"""
+
+
+class MemoryThrottleBackend(ThrottleBackend):
+    def __init__(self, maxsize: int = 100000):
+        self._states = TTLCache(maxsize=maxsize, ttl=STATE_TTL_SECONDS)
+        self._lock = threading.Lock()
+
+    def update(self, key: str, fn: Callable[[dict], dict], ttl: float) -> dict:
+        with self._lock:
+            state = fn(dict(self._states.get(key) or {}))
+            self._states.set(key, state, ttl=ttl)
+            return state
+
+
+def load_backend(path: str) -> ThrottleBackend:
+    if not path:
+        return MemoryThrottleBackend()
+    return load_object(path)()
+
+
+class LoginThrottle:
+    """Token bucket por IP e por email, com backoff progressivo após falhas.
+
+    O backoff vale para o par (email, IP): falhas vindas de outro IP não
+    travam o dono da conta, senão qualquer um poderia bloqueá-lo errando a
+    senha de propósito. Quem tenta de muitos IPs esbarra no bucket do email.
+
+    `check` é chamado antes de qualquer acesso ao banco ou bcrypt, então
+    um ataque de força bruta só custa uma consulta ao backend do limitador.
+    """
+
+    def __init__(self, backend: ThrottleBackend):
+        self.backend = backend
+
+    def _take(self, key: str, burst: int, per_minute: float, now: float, consume: bool = True) -> float:
+        """Consome uma ficha do bucket; devolve quantos segundos esperar (0 = liberado).
+
+        Com consume=False só consulta: nada é gasto, mesmo se liberado.
+        """
+        result = {"wait": 0.0}
+
+        def fn(state: dict) -> dict:
+            rate = per_minute / 60
+            tokens = min(burst, state.get("tokens", burst) + (now - state.get("updated", now)) * rate)
+            if tokens < 1:
+                result["wait"] = (1 - tokens) / rate
+            elif consume:
+                tokens -= 1
+            state.update(tokens=tokens, updated=now)
+            return state
+
+        self.backend.update(key, fn, STATE_TTL_SECONDS)
+        return result["wait"]
+
+    def _blocked(self, key: str, now: float) -> float:
+        """Segundos restantes do backoff da chave (0 = sem bloqueio)"""
+        state = self.backend.update(key, lambda state: state, STATE_TTL_SECONDS)
+        return max(0.0, state.get("blocked_until", 0) - now)
+
+    def _give_back(self, key: str, burst: int) -> None:
+        def fn(state: dict) -> dict:
+            state["tokens"] = min(burst, state.get("tokens", burst) + 1)
+            return state
+
+        self.backend.update(key, fn, STATE_TTL_SECONDS)
+
+    def check(self, ip: str, email: str) -> float:
+        """Segundos até a próxima tentativa permitida (0 = pode tentar).
+
+        Consulta os dois buckets antes de gastar: uma tentativa barrada pelo
+        email não consome a ficha do IP (e vice-versa), senão tentativas
+        contra uma conta bloqueada esgotariam o IP de quem divide a rede.
+        """
+        now = time.time()
+        ip_key, email_key = f"ip:{ip}", f"email:{email.lower()}"
+        wait = max(
+            self._blocked(backoff_key(email, ip), now),
+            self._take(ip_key, LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE, now, consume=False),
+            self._take(email_key, LOGIN_RATE_EMAIL_BURST, LOGIN_RATE_EMAIL_PER_MINUTE, now, consume=False)
+        )
+        if wait:
+            return wait
+        wait_ip = self._take(ip_key, LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE, now)
+        if wait_ip:
+            return wait_ip
+        wait_email = self._take(email_key, LOGIN_RATE_EMAIL_BURST, LOGIN_RATE_EMAIL_PER_MINUTE, now)
+        if wait_email:
+            # Outra requisição levou a última ficha do email entre a consulta e aqui
+            self._give_back(ip_key, LOGIN_RATE_IP_BURST)
+        return wait_email
+
+    def register_failure(self, email: str, ip: str) -> None:
+        """Backoff por (email, IP): não pune o IP inteiro (NAT compartilhado) nem o email de outros IPs"""
+        now = time.time()
+
+        def fn(state: dict) -> dict:
+            failures = state.get("failures", 0) + 1
+            state["failures"] = failures
+            if failures >= LOGIN_BACKOFF_AFTER_FAILURES:
+                delay = LOGIN_BACKOFF_BASE_SECONDS * 2 ** min(failures - LOGIN_BACKOFF_AFTER_FAILURES, 20)
+                state["blocked_until"] = now + min(delay, LOGIN_BACKOFF_MAX_SECONDS)
+            return state
+
+        self.backend.update(backoff_key(email, ip), fn, STATE_TTL_SECONDS)
+
+    def register_success(self, email: str, ip: str) -> None:
+        def fn(state: dict) -> dict:
+            state.pop("failures", None)
+            state.pop("blocked_until", None)
+            return state
+
+        self.backend.update(backoff_key(email, ip), fn, STATE_TTL_SECONDS)
+
+
+def backoff_key(email: str, ip: str) -> str:
+    return f"backoff:{email.lower()}|{ip}"
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # Última entrada é a adicionada pelo proxy confiável
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+login_throttle = LoginThrottle(load_backend(LOGIN_THROTTLE_BACKEND))
@@ -0,0 +1,63 @@
+from datetime import date
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.models.conta_fixa_db import ContaFixaDB
+from app.models.transaction_db import TransactionDB
+from app.utils.bulk import insert_ignore
+from app.utils.data_version import mark_user_data_changed
+
+
+def marcar_pagas(db: Session, user_id: int, pago: bool, ids: Optional[List[int]] = None,
+                 mes: Optional[int] = None, ano: Optional[int] = None,
+                 gerar_transacoes: bool = False) -> Tuple[List[int], int]:
+    """Marca as contas como pagas (ou não) em um único UPDATE.
+
+    Só mudam as contas que estavam no outro estado, então repetir não gera
+    despesas em dobro. Com gerar_transacoes, as que passaram a pagas viram
+    despesas de hoje, em um INSERT de várias linhas na mesma transação,
+    ligadas à conta (transactions.conta_fixa_id, única). Desmarcar apaga a
+    despesa gerada, então pagar, desmarcar e pagar de novo deixa uma só.
+    Devolve os ids alterados e quantas despesas foram criadas ou apagadas.
+    Não faz commit.
+    """
+    stmt = update(ContaFixaDB).where(
+        ContaFixaDB.user_id == user_id,
+        ContaFixaDB.pago.is_not(pago)
+    )
+    if ids is not None:
+        stmt = stmt.where(ContaFixaDB.id.in_(ids))
+    else:
+        stmt = stmt.where(ContaFixaDB.mes_referencia == mes, ContaFixaDB.ano_referencia == ano)
+    alteradas = db.execute(
+        stmt.values(pago=pago).returning(
+            ContaFixaDB.id, ContaFixaDB.nome, ContaFixaDB.valor, ContaFixaDB.categoria, ContaFixaDB.moeda
+        ),
+        execution_options={"synchronize_session": False}
+    ).all()
+    if not alteradas:
+        return [], 0
+    mark_user_data_changed(db, user_id)
+    conta_ids = [conta.id for conta in alteradas]
+
+    transacoes = 0
+    if not pago:
+        transacoes = db.execute(
+            delete(TransactionDB).where(
+                TransactionDB.user_id == user_id,
+                TransactionDB.conta_fixa_id.in_(conta_ids)
+            ),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+    elif gerar_transacoes:
+        hoje = date.today()
+        transacoes = db.execute(insert_ignore(db, TransactionDB).values([
+            {
+                "user_id": user_id, "tipo": "despesa", "valor": conta.valor,
+                "categoria": conta.categoria or "Geral", "descricao": conta.nome,
+                "data": hoje, "moeda": conta.moeda or "BRL", "conta_fixa_id": conta.id,
+            }
+            for conta in alteradas
+        ]).on_conflict_do_nothing()).rowcount
+    return conta_ids, transacoes
@@ -0,0 +1,96 @@
+import uuid
+from typing import Tuple
+from sqlalchemy import and_, case, exists, func, literal, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.conta_fixa import ContaFixaCreate
+from app.models.conta_fixa_db import ContaFixaDB
+from app.utils.bulk import insert_ignore
+from app.utils.data_version import mark_user_data_changed
+
+
+def somar_meses(mes: int, ano: int, n: int) -> Tuple[int, int]:
+    indice = ano * 12 + (mes - 1) + n
+    return indice % 12 + 1, indice // 12
+
+
+# Namespace dos serie_id derivados do header Idempotency-Key
+SERIE_NAMESPACE = uuid.UUID("3f0c7a52-8f4e-4c1e-9a53-6f1f2b0d9e41")
+
+
+def serie_id_for_key(user_id: int, idempotency_key: str) -> str:
+    """serie_id estável para a mesma chave de idempotência do mesmo usuário"""
+    return uuid.uuid5(SERIE_NAMESPACE, f"{user_id}:{idempotency_key}").hex
+
+
+def criar_parcelas(db: Session, user_id: int, conta: ContaFixaCreate) -> str:
+    """Cria a conta e, se parcelada, as parcelas restantes nos meses seguintes.
+
+    Tudo em um único INSERT de várias linhas. Com o mesmo serie_id, repetir
+    a chamada não duplica nada (índice único por série e mês). Sem serie_id,
+    cada chamada gera uma série nova: repetir cria outra conta. Não faz commit.
+    """
+    serie_id = conta.serie_id or uuid.uuid4().hex
+    parcela_atual = conta.parcela_atual or 1
+    parcela_total = max(conta.parcela_total or 1, parcela_atual)
+    linhas = []
+    for i, parcela in enumerate(range(parcela_atual, parcela_total + 1)):
+        mes, ano = somar_meses(conta.mes_referencia, conta.ano_referencia, i)
+        linhas.append({
+            "user_id": user_id,
+            "serie_id": serie_id,
+            "nome": conta.nome,
+            "valor": conta.valor,
+            "dia_vencimento": conta.dia_vencimento,
+            "categoria": conta.categoria,
+            "moeda": conta.moeda or "BRL",
+            "pago": False,
+            "mes_referencia": mes,
+            "ano_referencia": ano,
+            "parcela_atual": parcela,
+            "parcela_total": parcela_total,
+        })
+    db.execute(insert_ignore(db, ContaFixaDB).values(linhas).on_conflict_do_nothing())
+    mark_user_data_changed(db, user_id)
+    return serie_id
+
+
+def virar_mes(db: Session, user_id: int, mes: int, ano: int) -> int:
+    """Copia as contas recorrentes de mes/ano para o mês seguinte, em um INSERT ... SELECT.
+
+    Entram as contas mensais (sem parcelas) e as parcelas que ainda não
+    terminaram, com a parcela seguinte. As séries que já têm linha no mês
+    seguinte ficam de fora, então rodar de novo não duplica. Duas viradas ao
+    mesmo tempo (clique duplo, réplicas) caem no índice único por série e
+    mês, e a segunda só ignora as linhas repetidas. Não faz commit.
+    """
+    mes_novo, ano_novo = somar_meses(mes, ano, 1)
+    parcela_total = func.coalesce(ContaFixaDB.parcela_total, 1)
+    parcela_atual = func.coalesce(ContaFixaDB.parcela_atual, 1)
+    destino = aliased(ContaFixaDB)
+
+    origem = select(
+        ContaFixaDB.user_id, ContaFixaDB.serie_id, ContaFixaDB.nome, ContaFixaDB.valor,
+        ContaFixaDB.dia_vencimento, ContaFixaDB.categoria, ContaFixaDB.moeda,
+        literal(False), literal(mes_novo), literal(ano_novo),
+        case((parcela_total > 1, parcela_atual + 1), else_=parcela_atual),
+        ContaFixaDB.parcela_total,
+    ).where(
+        ContaFixaDB.user_id == user_id,
+        ContaFixaDB.mes_referencia == mes,
+        ContaFixaDB.ano_referencia == ano,
+        or_(parcela_total <= 1, parcela_atual < parcela_total),
+        ~exists().where(and_(
+            destino.user_id == user_id,
+            destino.serie_id == ContaFixaDB.serie_id,
+            destino.mes_referencia == mes_novo,
+            destino.ano_referencia == ano_novo,
+        )),
+    )
+    result = db.execute(insert_ignore(db, ContaFixaDB).from_select([
+        "user_id", "serie_id", "nome", "valor", "dia_vencimento", "categoria", "moeda",
+        "pago", "mes_referencia", "ano_referencia", "parcela_atual", "parcela_total",
+    ], origem).on_conflict_do_nothing())
+    if result.rowcount:
+        mark_user_data_changed(db, user_id)
+    return result.rowcount
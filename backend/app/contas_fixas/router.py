@@ -1,41 +1,67 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
+from sqlalchemy import case, false, func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
-from app.models.conta_fixa import ContaFixaCreate, ContaFixaUpdate, ContaFixa
+from app.models.conta_fixa import (
+    ContaFixaCreate, ContaFixaUpdate, ContaFixa, ContaFixaAno, ContaFixaMes, ContaFixaTotais, ContaFixaPagamentoLote
+)
 from app.models.conta_fixa_db import ContaFixaDB
 from app.models.user import User
 from app.config.database import get_db
 from app.auth.router import get_current_user
+from app.utils.streaming import stream_json_array
+from app.contas_fixas.parcelas import criar_parcelas, serie_id_for_key, virar_mes
+from app.contas_fixas.pagamentos import marcar_pagas
+from app.ai.retrieval import retrieval_index
 
 router = APIRouter(prefix="/contas-fixas", tags=["contas-fixas"])
 
 @router.post("/", response_model=ContaFixa)
 def create_conta_fixa(
     conta: ContaFixaCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_conta = ContaFixaDB(
-        user_id=current_user.id,
-        nome=conta.nome,
-        valor=conta.valor,
-        dia_vencimento=conta.dia_vencimento,
-        categoria=conta.categoria,
-        mes_referencia=conta.mes_referencia,
-        ano_referencia=conta.ano_referencia,
-        parcela_atual=conta.parcela_atual,
-        parcela_total=conta.parcela_total
-    )
-    db.add(db_conta)
+    """Cria a conta (e as parcelas). Repetir o POST só é seguro com serie_id no corpo
+    ou com o header Idempotency-Key; sem nenhum dos dois, cada envio cria uma conta."""
+    if conta.serie_id is None and idempotency_key:
+        conta = conta.model_copy(update={"serie_id": serie_id_for_key(current_user.id, idempotency_key)})
+    # Conta parcelada já nasce com todas as parcelas, uma por mês
+    serie_id = criar_parcelas(db, current_user.id, conta)
     db.commit()
-    db.refresh(db_conta)
+    db_conta = db.query(ContaFixaDB).filter(
+        ContaFixaDB.user_id == current_user.id,
+        ContaFixaDB.serie_id == serie_id,
+        ContaFixaDB.mes_referencia == conta.mes_referencia,
+        ContaFixaDB.ano_referencia == conta.ano_referencia
+    ).one_or_none()
+    if db_conta is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conta fixa não encontrada"
+        )
     return db_conta
 
+@router.post("/virar-mes")
+def virar_o_mes(
+    ano: int,
+    mes: int = Query(ge=1, le=12),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Leva as contas recorrentes de mes/ano para o mês seguinte (pode repetir sem duplicar)"""
+    criadas = virar_mes(db, current_user.id, mes, ano)
+    db.commit()
+    return {"criadas": criadas}
+
 @router.get("/", response_model=List[ContaFixa])
 def list_contas_fixas(
-    mes: int = None,
+    mes: int = Query(None, ge=1, le=12),
     ano: int = None,
+    stream: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -44,7 +70,58 @@ def list_contas_fixas(
         query = query.filter(ContaFixaDB.mes_referencia == mes)
     if ano:
         query = query.filter(ContaFixaDB.ano_referencia == ano)
-    return query.order_by(ContaFixaDB.dia_vencimento).all()
+    query = query.order_by(ContaFixaDB.dia_vencimento)
+    if stream:
+        return stream_json_array(query, ContaFixa)
+    return query.all()
+
+@router.get("/ano/{ano}", response_model=ContaFixaAno)
+def contas_fixas_do_ano(
+    ano: int,
+    mes: int = Query(None, ge=1, le=12),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Totais de cada mês do ano por moeda, em uma consulta; com ?mes= traz também as contas do mês"""
+    hoje = date.today()
+    nao_pago = func.coalesce(ContaFixaDB.pago, False).is_(False)
+    if ano < hoje.year:
+        vencida = nao_pago
+    elif ano == hoje.year:
+        vencida = nao_pago & (
+            (ContaFixaDB.mes_referencia < hoje.month)
+            | ((ContaFixaDB.mes_referencia == hoje.month) & (ContaFixaDB.dia_vencimento < hoje.day))
+        )
+    else:
+        vencida = false()
+    rows = db.query(
+        ContaFixaDB.mes_referencia,
+        ContaFixaDB.moeda,
+        func.count(ContaFixaDB.id),
+        func.sum(ContaFixaDB.valor),
+        func.sum(case((nao_pago, 0), else_=ContaFixaDB.valor)),
+        func.sum(case((vencida, ContaFixaDB.valor), else_=0)),
+    ).filter(
+        ContaFixaDB.user_id == current_user.id,
+        ContaFixaDB.ano_referencia == ano
+    ).group_by(ContaFixaDB.mes_referencia, ContaFixaDB.moeda).all()
+
+    meses = [ContaFixaMes(mes=m) for m in range(1, 13)]
+    for mes_ref, moeda, quantidade, total, pago, vencido in rows:
+        if 1 <= mes_ref <= 12:
+            meses[mes_ref - 1].totais[moeda] = ContaFixaTotais(
+                quantidade=quantidade, total=total, pago=pago,
+                pendente=total - pago, vencido=vencido
+            )
+
+    contas = None
+    if mes:
+        contas = db.query(ContaFixaDB).filter(
+            ContaFixaDB.user_id == current_user.id,
+            ContaFixaDB.ano_referencia == ano,
+            ContaFixaDB.mes_referencia == mes
+        ).order_by(ContaFixaDB.dia_vencimento).all()
+    return ContaFixaAno(ano=ano, meses=meses, contas=contas)
 
 @router.put("/{conta_id}", response_model=ContaFixa)
 def update_conta_fixa(
@@ -88,6 +165,25 @@ def toggle_pago(
     db.refresh(conta)
     return conta
 
+@router.post("/pagar")
+def pagar_em_lote(
+    lote: ContaFixaPagamentoLote,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Marca várias contas como pagas (ou não) de uma vez, por ids ou pelo mês inteiro"""
+    if lote.ids is None and not (lote.mes and lote.ano):
+        raise HTTPException(status_code=400, detail="Informe os ids ou o mês e o ano")
+    alteradas, transacoes = marcar_pagas(
+        db, current_user.id, lote.pago, lote.ids, lote.mes, lote.ano, lote.gerar_transacoes
+    )
+    db.commit()
+    if transacoes:
+        retrieval_index.invalidate(current_user.id)
+    if lote.pago:
+        return {"alteradas": alteradas, "transacoes_criadas": transacoes}
+    return {"alteradas": alteradas, "transacoes_removidas": transacoes}
+
 @router.delete("/{conta_id}")
 def delete_conta_fixa(
     conta_id: int,
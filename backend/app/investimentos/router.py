@@ -7,6 +7,7 @@ from app.models.investimento_db import InvestimentoDB
 from app.models.user import User
 from app.config.database import get_db
 from app.auth.router import get_current_user
+from app.utils.streaming import stream_json_array
 
 router = APIRouter(prefix="/investimentos", tags=["investimentos"])
 
@@ -32,10 +33,14 @@ def create_investimento(
 
 @router.get("/", response_model=List[Investimento])
 def list_investimentos(
+    stream: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(InvestimentoDB).filter(InvestimentoDB.user_id == current_user.id).all()
+    query = db.query(InvestimentoDB).filter(InvestimentoDB.user_id == current_user.id)
+    if stream:
+        return stream_json_array(query, Investimento)
+    return query.all()
 
 @router.get("/resumo")
 def get_resumo(
@@ -2,7 +2,8 @@ import warnings
 warnings.filterwarnings("ignore", message="Your application has authenticated using end user credentials")
 from dotenv import load_dotenv
 load_dotenv()
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth.router import router as auth_router
 from app.transactions.router import router as transactions_router
@@ -11,21 +12,52 @@ from app.contas_fixas.router import router as contas_fixas_router
 from app.metas.router import router as metas_router
 from app.investimentos.router import router as investimentos_router
 from app.config.database import engine, Base
+from app.auth.security import token_cache, shutdown_password_pool
+from app.auth.internal import require_internal_key
+from app.auth.principal import principal_cache
+from app.ai.context import context_cache
+from app.ai.response_cache import response_cache
 
 # Importar todos os models para criar as tabelas
 from app.models.user_db import UserDB
 from app.models.transaction_db import TransactionDB
 from app.models.conta_fixa_db import ContaFixaDB
 from app.models.meta_db import MetaDB
+from app.models.meta_contribuicao_db import MetaContribuicaoDB
 from app.models.investimento_db import InvestimentoDB
+from app.models.conversa_db import ConversaMensagemDB, ConversaResumoDB
+from app.models.sugestao_db import SugestaoDB
+from app.models.llm_uso_db import LLMUsoDB
+from app.ai.suggestions import refresh_all_suggestions
+from app.ai.usage import flush_usage
+from app.notifications.lembretes import send_bill_reminders
+from app.notifications.whatsapp import whatsapp_sender
+from app.scheduler import schedule_every, stop_jobs
+from app.config.settings import JOBS_ENABLED, AI_SUGGESTIONS_REFRESH_MINUTES, AI_USAGE_FLUSH_SECONDS
 
 # Cria as tabelas no banco
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if JOBS_ENABLED:
+        schedule_every("sugestoes", AI_SUGGESTIONS_REFRESH_MINUTES * 60, refresh_all_suggestions)
+        if whatsapp_sender.can_initiate:
+            schedule_every("lembretes", 3600, send_bill_reminders)
+        else:
+            print("Lembretes de vencimento desligados: configure WHATSAPP_REMINDER_TEMPLATE e as credenciais do WhatsApp")
+    # Medição de uso é por processo: todas as réplicas gravam o próprio lote
+    schedule_every("uso_llm", AI_USAGE_FLUSH_SECONDS, flush_usage)
+    yield
+    await stop_jobs()
+    flush_usage()
+    shutdown_password_pool()
+
 app = FastAPI(
     title="Nexfy API",
     description="API do sistema de gestão financeira",
-    version="0.2.0"
+    version="0.2.0",
+    lifespan=lifespan
 )
 
 # Permitir requests do frontend
@@ -52,3 +84,13 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+@app.get("/health/cache", dependencies=[Depends(require_internal_key)])
+def health_cache():
+    """Métricas de acerto/erro dos caches em memória (só com X-Internal-Key, como os endpoints internos)"""
+    return {
+        "token_cache": token_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "ai_context_cache": context_cache.stats(),
+        "ai_response_cache": response_cache.local.stats()
+    }
@@ -0,0 +1,32 @@
+from typing import Optional
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.meta_db import MetaDB
+from app.models.meta_contribuicao_db import MetaContribuicaoDB
+from app.utils.data_version import mark_user_data_changed
+
+
+def contribuir(db: Session, user_id: int, meta_id: int, valor: float, origem: str = "app") -> Optional[MetaDB]:
+    """Soma `valor` à meta e registra a contribuição no histórico. Não faz commit.
+
+    O total é atualizado no próprio banco (UPDATE ... SET valor_atual =
+    valor_atual + :valor RETURNING), sem ler antes: contribuições simultâneas
+    do app e do WhatsApp não se sobrescrevem. Retorna None se a meta não
+    existir ou for de outro usuário.
+    """
+    meta = db.execute(
+        update(MetaDB)
+        .where(MetaDB.id == meta_id, MetaDB.user_id == user_id)
+        .values(valor_atual=func.coalesce(MetaDB.valor_atual, 0) + valor)
+        .returning(MetaDB),
+        # populate_existing: se a meta já estava carregada na sessão, ela recebe o total novo
+        execution_options={"synchronize_session": False, "populate_existing": True}
+    ).scalar_one_or_none()
+    if meta is None:
+        return None
+    db.execute(insert(MetaContribuicaoDB).values(
+        meta_id=meta_id, user_id=user_id, valor=valor, origem=origem
+    ))
+    mark_user_data_changed(db, user_id)
+    return meta
@@ -0,0 +1,101 @@
+import math
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models.meta_db import MetaDB
+from app.models.meta_contribuicao_db import MetaContribuicaoDB
+from app.models.transaction_db import TransactionDB
+from app.utils.cache import TTLCache
+from app.utils.data_version import get_data_version
+from app.config.settings import (
+    METAS_PROJECAO_JANELA_MESES, METAS_PROJECAO_CACHE_MAXSIZE, METAS_PROJECAO_CACHE_TTL_SECONDS
+)
+
+DIAS_POR_MES = 30.44
+# Além disso a previsão não diz nada útil
+MAX_MESES_PREVISAO = 1200
+
+# (user_id, versão dos dados, dia) -> {meta_id: projeção}. O dia entra na
+# chave porque prazo e previsão mudam com a data, mesmo sem escrita. A versão
+# dos dados só vê as escritas deste processo; o TTL limita quanto tempo uma
+# escrita feita em outra réplica fica sem aparecer (como no contexto da IA).
+projection_cache = TTLCache(maxsize=METAS_PROJECAO_CACHE_MAXSIZE, ttl=METAS_PROJECAO_CACHE_TTL_SECONDS)
+
+
+def get_projecoes(db: Session, user_id: int, metas: List[MetaDB]) -> Dict[int, dict]:
+    hoje = date.today()
+    key = (user_id, get_data_version(user_id), hoje)
+    projecoes = projection_cache.get(key)
+    # Meta criada em outra réplica: o cache deste processo não a conhece
+    if projecoes is None or any(meta.id not in projecoes for meta in metas):
+        projecoes = build_projecoes(db, user_id, metas, hoje)
+        projection_cache.set(key, projecoes)
+    return projecoes
+
+
+def build_projecoes(db: Session, user_id: int, metas: List[MetaDB], hoje: date) -> Dict[int, dict]:
+    """Previsão de conclusão, aporte mensal necessário e situação de cada meta.
+
+    O ritmo de cada meta é a média mensal das contribuições nos últimos
+    METAS_PROJECAO_JANELA_MESES meses (ou desde a criação, se for mais nova).
+    Metas sem contribuições no período usam a poupança líquida do usuário
+    (receitas - despesas) na mesma moeda, dividida entre as metas em aberto.
+    """
+    desde = hoje - timedelta(days=round(METAS_PROJECAO_JANELA_MESES * DIAS_POR_MES))
+    aportes = dict(db.query(
+        MetaContribuicaoDB.meta_id, func.sum(MetaContribuicaoDB.valor)
+    ).filter(
+        MetaContribuicaoDB.user_id == user_id,
+        MetaContribuicaoDB.created_at >= datetime.combine(desde, time.min),
+        # O saldo herdado da migração não é ritmo de poupança
+        MetaContribuicaoDB.origem != "saldo_inicial"
+    ).group_by(MetaContribuicaoDB.meta_id).all())
+
+    poupanca = dict(db.query(
+        TransactionDB.moeda,
+        func.sum(case((TransactionDB.tipo == "receita", TransactionDB.valor), else_=-TransactionDB.valor))
+    ).filter(
+        TransactionDB.user_id == user_id,
+        TransactionDB.data >= desde
+    ).group_by(TransactionDB.moeda).all())
+
+    abertas_por_moeda: Dict[str, int] = {}
+    for meta in metas:
+        if (meta.valor_atual or 0) < meta.valor_alvo:
+            abertas_por_moeda[meta.moeda] = abertas_por_moeda.get(meta.moeda, 0) + 1
+
+    projecoes = {}
+    for meta in metas:
+        criada = meta.created_at.date() if meta.created_at else desde
+        meses_observados = max(1.0, min(METAS_PROJECAO_JANELA_MESES, (hoje - criada).days / DIAS_POR_MES))
+        ritmo = (aportes.get(meta.id) or 0) / meses_observados
+        if ritmo <= 0 and abertas_por_moeda.get(meta.moeda):
+            ritmo = max(0.0, (poupanca.get(meta.moeda) or 0) / METAS_PROJECAO_JANELA_MESES) / abertas_por_moeda[meta.moeda]
+        projecoes[meta.id] = projetar(meta.valor_alvo, meta.valor_atual or 0, meta.data_limite, ritmo, hoje)
+    return projecoes
+
+
+def projetar(valor_alvo: float, valor_atual: float, data_limite: Optional[date], ritmo: float, hoje: date) -> dict:
+    restante = max(0.0, valor_alvo - valor_atual)
+    if restante == 0:
+        return {"status_projecao": "concluida", "ritmo_mensal": round(ritmo, 2),
+                "data_prevista": None, "aporte_mensal_necessario": 0.0}
+
+    data_prevista = None
+    if ritmo > 0 and restante / ritmo <= MAX_MESES_PREVISAO:
+        data_prevista = hoje + timedelta(days=math.ceil(restante / ritmo * DIAS_POR_MES))
+
+    aporte_necessario = None
+    if data_limite is None:
+        status = "sem_prazo"
+    else:
+        # Com menos de um mês até o prazo, o aporte do mês é tudo o que falta
+        meses_ate_prazo = max(1.0, (data_limite - hoje).days / DIAS_POR_MES)
+        aporte_necessario = round(restante / meses_ate_prazo, 2)
+        no_prazo = data_limite >= hoje and data_prevista is not None and data_prevista <= data_limite
+        status = "no_prazo" if no_prazo else "atrasada"
+
+    return {"status_projecao": status, "ritmo_mensal": round(ritmo, 2),
+            "data_prevista": data_prevista, "aporte_mensal_necessario": aporte_necessario}
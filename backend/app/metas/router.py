@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.models.meta import MetaCreate, MetaUpdate, Meta
+from app.models.meta import MetaCreate, MetaUpdate, Meta, MetaComProjecao, MetaContribuicao, OrigemContribuicao
 from app.models.meta_db import MetaDB
+from app.models.meta_contribuicao_db import MetaContribuicaoDB
 from app.models.user import User
 from app.config.database import get_db
 from app.auth.router import get_current_user
+from app.utils.streaming import stream_json_array
+from app.metas.contribuicoes import contribuir
+from app.metas.projecoes import get_projecoes
 
 router = APIRouter(prefix="/metas", tags=["metas"])
 
@@ -29,12 +33,22 @@ def create_meta(
     db.refresh(db_meta)
     return db_meta
 
-@router.get("/", response_model=List[Meta])
+@router.get("/", response_model=List[MetaComProjecao])
 def list_metas(
+    stream: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(MetaDB).filter(MetaDB.user_id == current_user.id).all()
+    query = db.query(MetaDB).filter(MetaDB.user_id == current_user.id)
+    if stream:
+        # Em stream vão só os dados da meta, sem projeção
+        return stream_json_array(query, Meta)
+    metas = query.all()
+    projecoes = get_projecoes(db, current_user.id, metas)
+    return [
+        MetaComProjecao.model_validate(meta).model_copy(update=projecoes.get(meta.id, {}))
+        for meta in metas
+    ]
 
 @router.put("/{meta_id}", response_model=Meta)
 def update_meta(
@@ -52,8 +66,13 @@ def update_meta(
         raise HTTPException(status_code=404, detail="Meta não encontrada")
     
     update_data = meta_update.model_dump(exclude_unset=True)
+    novo_valor_atual = update_data.pop("valor_atual", None)
     for key, value in update_data.items():
         setattr(meta, key, value)
+    if novo_valor_atual is not None and novo_valor_atual != (meta.valor_atual or 0):
+        # Edição direta do total entra no histórico como ajuste
+        db.flush()
+        contribuir(db, current_user.id, meta_id, novo_valor_atual - (meta.valor_atual or 0), origem="ajuste")
     
     db.commit()
     db.refresh(meta)
@@ -62,22 +81,33 @@ def update_meta(
 @router.patch("/{meta_id}/adicionar", response_model=Meta)
 def adicionar_valor(
     meta_id: int,
-    valor: float,
+    valor: float = Query(gt=0),
+    origem: OrigemContribuicao = "app",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    meta = db.query(MetaDB).filter(
-        MetaDB.id == meta_id,
-        MetaDB.user_id == current_user.id
-    ).first()
-    
-    if not meta:
+    meta = contribuir(db, current_user.id, meta_id, valor, origem)
+    if meta is None:
         raise HTTPException(status_code=404, detail="Meta não encontrada")
-    
-    meta.valor_atual += valor
+    resposta = Meta.model_validate(meta)
     db.commit()
-    db.refresh(meta)
-    return meta
+    return resposta
+
+@router.get("/{meta_id}/contribuicoes", response_model=List[MetaContribuicao])
+def listar_contribuicoes(
+    meta_id: int,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Histórico de contribuições da meta, das mais recentes para as mais antigas"""
+    return db.query(MetaContribuicaoDB).filter(
+        MetaContribuicaoDB.user_id == current_user.id,
+        MetaContribuicaoDB.meta_id == meta_id
+    ).order_by(
+        MetaContribuicaoDB.created_at.desc(), MetaContribuicaoDB.id.desc()
+    ).offset(offset).limit(min(limit, 500)).all()
 
 @router.delete("/{meta_id}")
 def delete_meta(
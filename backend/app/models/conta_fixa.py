@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class ContaFixaBase(BaseModel):
@@ -12,8 +12,9 @@ class ContaFixaBase(BaseModel):
     moeda: Optional[str] = "BRL"
 
 class ContaFixaCreate(ContaFixaBase):
-    mes_referencia: int
+    mes_referencia: int = Field(ge=1, le=12)
     ano_referencia: int
+    serie_id: Optional[str] = None  # Gerado pelo cliente, torna o POST seguro para repetir
 
 class ContaFixaUpdate(BaseModel):
     nome: Optional[str] = None
@@ -31,7 +32,32 @@ class ContaFixa(ContaFixaBase):
     pago: bool
     mes_referencia: int
     ano_referencia: int
+    serie_id: Optional[str] = None
     created_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
+
+class ContaFixaTotais(BaseModel):
+    quantidade: int = 0
+    total: float = 0
+    pago: float = 0
+    pendente: float = 0
+    vencido: float = 0  # Parte do pendente com vencimento já passado
+
+class ContaFixaMes(BaseModel):
+    mes: int
+    totais: Dict[str, ContaFixaTotais] = {}  # Por moeda
+
+class ContaFixaAno(BaseModel):
+    ano: int
+    meses: List[ContaFixaMes]
+    contas: Optional[List[ContaFixa]] = None  # Só com ?mes=
+
+class ContaFixaPagamentoLote(BaseModel):
+    """Contas por id ou todas as de um mês (mes + ano)"""
+    ids: Optional[List[int]] = None
+    mes: Optional[int] = Field(None, ge=1, le=12)
+    ano: Optional[int] = None
+    pago: bool = True
+    gerar_transacoes: bool = False  # Cria uma despesa para cada conta que passou a paga
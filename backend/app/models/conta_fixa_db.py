@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+import uuid
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from app.config.database import Base
 
 class ContaFixaDB(Base):
     __tablename__ = "contas_fixas"
-    
+    __table_args__ = (
+        # Uma linha por série e mês: parcelas e "virar o mês" nunca duplicam
+        Index("ux_contas_fixas_serie_mes", "user_id", "serie_id", "ano_referencia", "mes_referencia", unique=True),
+        Index("ix_contas_fixas_user_id_ano_mes", "user_id", "ano_referencia", "mes_referencia"),
+        # Lembretes de vencimento: contas de todos os usuários em uma janela de dias
+        Index("ix_contas_fixas_vencimento", "ano_referencia", "mes_referencia", "dia_vencimento", "pago"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     nome = Column(String, nullable=False)
@@ -17,5 +25,8 @@ class ContaFixaDB(Base):
     parcela_atual = Column(Integer, default=1)
     parcela_total = Column(Integer, default=1)
     moeda = Column(String, default="BRL", nullable=False)
+    # Liga os meses da mesma conta (parcelas ou conta recorrente)
+    serie_id = Column(String, nullable=False, default=lambda: uuid.uuid4().hex)
+    lembrete_enviado_em = Column(Date, nullable=True)  # Último lembrete de vencimento pelo WhatsApp
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
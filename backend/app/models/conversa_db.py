@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class ConversaMensagemDB(Base):
+    __tablename__ = "conversa_mensagens"
+    __table_args__ = (
+        Index("ix_conversa_mensagens_user_id_id", "user_id", "id"),
+    )
+    # Histórico do chat não é dado financeiro: não invalida os caches da IA
+    __data_version__ = False
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    papel = Column(String, nullable=False)  # "user" ou "model"
+    conteudo = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ConversaResumoDB(Base):
+    __tablename__ = "conversa_resumos"
+    __data_version__ = False
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    resumo = Column(Text, nullable=False, default="")
+    ate_mensagem_id = Column(Integer, nullable=False, default=0)  # Última mensagem já resumida
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class LLMUsoDB(Base):
+    """Uso do LLM agregado em memória e gravado em lotes (ver app.ai.usage)"""
+    __tablename__ = "llm_uso"
+    __table_args__ = (
+        Index("ix_llm_uso_user_id_dia", "user_id", "dia"),
+    )
+    __data_version__ = False
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nulo em chamadas sem usuário
+    feature = Column(String, nullable=False)  # Ponto de chamada: "chat", "whatsapp_intencao"...
+    modelo = Column(String, nullable=False)
+    dia = Column(Date, nullable=False)
+    chamadas = Column(Integer, nullable=False, default=0)
+    tokens_prompt = Column(Integer, nullable=False, default=0)
+    tokens_resposta = Column(Integer, nullable=False, default=0)
+    latencia_total_ms = Column(Float, nullable=False, default=0)
+    latencia_max_ms = Column(Float, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,7 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime, date
 
+# Origens que o cliente pode informar ao adicionar valor. "saldo_inicial" e
+# "ajuste" são só do servidor: ficam fora do ritmo de aportes (app.metas.projecoes)
+OrigemContribuicao = Literal["app", "whatsapp"]
+
 class MetaBase(BaseModel):
     nome: str
     valor_alvo: float
@@ -30,3 +34,20 @@ class Meta(MetaBase):
     
     class Config:
         from_attributes = True
+
+class MetaComProjecao(Meta):
+    # Calculados a partir do histórico de contribuições (ver app.metas.projecoes)
+    status_projecao: Optional[str] = None  # "concluida", "no_prazo", "atrasada" ou "sem_prazo"
+    ritmo_mensal: Optional[float] = None
+    data_prevista: Optional[date] = None
+    aporte_mensal_necessario: Optional[float] = None  # Para chegar ao alvo até data_limite
+
+class MetaContribuicao(BaseModel):
+    id: int
+    meta_id: int
+    valor: float
+    origem: str
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class MetaContribuicaoDB(Base):
+    """Histórico de valores adicionados às metas (só inserção; o total fica em metas.valor_atual)"""
+    __tablename__ = "meta_contribuicoes"
+    __table_args__ = (
+        Index("ix_meta_contribuicoes_user_id_meta_id", "user_id", "meta_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    meta_id = Column(Integer, ForeignKey("metas.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    valor = Column(Float, nullable=False)  # Negativo em retiradas e ajustes para baixo
+    origem = Column(String, nullable=False, default="app")  # "app", "whatsapp", "ajuste"...
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class SugestaoDB(Base):
+    __tablename__ = "ai_sugestoes"
+    # Derivado dos dados financeiros pelo job em lote; não invalida caches
+    __data_version__ = False
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sugestoes = Column(Text, nullable=False)  # Lista JSON de strings
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from app.config.database import Base
 
 class TransactionDB(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_user_id_data", "user_id", "data"),
+        # No máximo uma despesa gerada por conta fixa (conta do mês)
+        Index("ux_transactions_conta_fixa_id", "conta_fixa_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -13,5 +18,7 @@ class TransactionDB(Base):
     descricao = Column(String, nullable=True)
     data = Column(Date, nullable=False)
     moeda = Column(String, default="BRL", nullable=False)
+    # Conta fixa que gerou a despesa ao ser paga (POST /contas-fixas/pagar)
+    conta_fixa_id = Column(Integer, ForeignKey("contas_fixas.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
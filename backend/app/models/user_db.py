@@ -12,5 +12,6 @@ class UserDB(Base):
     provider = Column(String, default="local")
     google_id = Column(String, unique=True, nullable=True)  # ID do Google
     telefone = Column(String, nullable=True)
+    telefone_e164 = Column(String, unique=True, index=True, nullable=True)  # Formato canônico, usado nas buscas
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
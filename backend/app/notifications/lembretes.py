@@ -0,0 +1,177 @@
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import List, Set, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.models.conta_fixa_db import ContaFixaDB
+from app.models.user_db import UserDB
+from app.notifications.whatsapp import WhatsAppSender, whatsapp_sender
+from app.config.settings import BILL_REMINDER_DAYS, BILL_REMINDER_HOUR, BILL_REMINDER_BATCH, BILL_REMINDER_TIMEZONE
+
+FUSO_LEMBRETES = ZoneInfo(BILL_REMINDER_TIMEZONE)
+
+
+@dataclass
+class Lembrete:
+    telefone: str
+    nome: str
+    contas: list = field(default_factory=list)  # Linhas de load_reminders
+
+    @property
+    def conta_ids(self) -> List[int]:
+        return [c.id for c in self.contas]
+
+    def texto(self, hoje: date) -> str:
+        return texto_lembrete(self.nome, self.contas, hoje)
+
+
+def janela_vencimentos(hoje: date, dias: int) -> List[Tuple[int, int, int, int]]:
+    """(ano, mês, primeiro dia, último dia) de cada mês tocado pela janela hoje..hoje+dias.
+
+    No último dia do mês entram também os vencimentos que não existem nele
+    (ex.: dia 31 em abril vence no dia 30).
+    """
+    fim = hoje + timedelta(days=dias)
+    faixas = []
+    inicio = hoje
+    while inicio <= fim:
+        ultimo_do_mes = calendar.monthrange(inicio.year, inicio.month)[1]
+        ate = min(fim, inicio.replace(day=ultimo_do_mes))
+        faixas.append((inicio.year, inicio.month, inicio.day, 31 if ate.day == ultimo_do_mes else ate.day))
+        inicio = ate + timedelta(days=1)
+    return faixas
+
+
+def vencimento(ano: int, mes: int, dia: int) -> date:
+    return date(ano, mes, min(dia, calendar.monthrange(ano, mes)[1]))
+
+
+def formatar_valor(valor: float, moeda: str) -> str:
+    simbolo = "R$" if moeda == "BRL" else moeda
+    return f"{simbolo} {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def texto_lembrete(nome: str, contas: list, hoje: date) -> str:
+    linhas = []
+    for conta in contas:
+        data = vencimento(conta.ano_referencia, conta.mes_referencia, conta.dia_vencimento)
+        quando = "hoje" if data == hoje else "amanhã" if data == hoje + timedelta(days=1) else data.strftime("%d/%m")
+        linhas.append(f"• {conta.nome}: {formatar_valor(conta.valor, conta.moeda)} (vence {quando})")
+    primeiro_nome = (nome or "").split(" ")[0]
+    return (
+        f"Oi{', ' + primeiro_nome if primeiro_nome else ''}! 👋 Passando pra lembrar das contas que vencem nos próximos dias:\n\n"
+        + "\n".join(linhas)
+        + "\n\nQuando pagar, é só marcar no app 💚"
+    )
+
+
+def load_reminders(db: Session, hoje: date, dias: int = BILL_REMINDER_DAYS) -> List[Lembrete]:
+    """Contas não pagas que vencem na janela, de todos os usuários, em uma consulta.
+
+    Usa o índice (ano, mês, dia, pago) e vem ordenada por usuário, então o
+    agrupamento é feito em memória, sem consulta por usuário. Contas já
+    lembradas hoje ficam de fora.
+    """
+    faixas = janela_vencimentos(hoje, dias)
+    rows = db.query(
+        ContaFixaDB.id, ContaFixaDB.user_id, ContaFixaDB.nome, ContaFixaDB.valor, ContaFixaDB.moeda,
+        ContaFixaDB.dia_vencimento, ContaFixaDB.mes_referencia, ContaFixaDB.ano_referencia,
+        UserDB.name, UserDB.telefone_e164
+    ).join(UserDB, UserDB.id == ContaFixaDB.user_id).filter(
+        or_(*[
+            and_(
+                ContaFixaDB.ano_referencia == ano,
+                ContaFixaDB.mes_referencia == mes,
+                ContaFixaDB.dia_vencimento.between(de, ate)
+            )
+            for ano, mes, de, ate in faixas
+        ]),
+        ContaFixaDB.pago == False,  # noqa: E712 (comparação simples, para usar o índice)
+        or_(ContaFixaDB.lembrete_enviado_em.is_(None), ContaFixaDB.lembrete_enviado_em < hoje),
+        UserDB.telefone_e164.isnot(None)
+    ).order_by(
+        ContaFixaDB.user_id, ContaFixaDB.ano_referencia, ContaFixaDB.mes_referencia, ContaFixaDB.dia_vencimento
+    ).all()
+
+    lembretes = []
+    for _, grupo in groupby(rows, key=lambda r: r.user_id):
+        contas = list(grupo)
+        lembretes.append(Lembrete(telefone=contas[0].telefone_e164, nome=contas[0].name, contas=contas))
+    return lembretes
+
+
+def claim_reminders(db: Session, conta_ids: List[int], hoje: date) -> Set[int]:
+    """Marca as contas como lembradas hoje antes do envio; devolve as que esta execução levou.
+
+    UPDATE condicional com RETURNING: com o job rodando em várias réplicas,
+    cada conta é reivindicada por uma só, então ninguém manda a mesma
+    mensagem duas vezes.
+    """
+    # Não é dado financeiro do usuário: não muda a versão dos dados (caches da IA)
+    result = db.execute(
+        update(ContaFixaDB).where(
+            ContaFixaDB.id.in_(conta_ids),
+            or_(ContaFixaDB.lembrete_enviado_em.is_(None), ContaFixaDB.lembrete_enviado_em < hoje)
+        ).values(lembrete_enviado_em=hoje).returning(ContaFixaDB.id),
+        execution_options={"synchronize_session": False}
+    )
+    ids = {row.id for row in result}
+    db.commit()
+    return ids
+
+
+def release_reminders(db: Session, conta_ids: List[int], hoje: date) -> None:
+    """Desfaz a reivindicação das contas cujo envio falhou, para a próxima execução tentar de novo"""
+    db.execute(
+        update(ContaFixaDB).where(
+            ContaFixaDB.id.in_(conta_ids),
+            ContaFixaDB.lembrete_enviado_em == hoje
+        ).values(lembrete_enviado_em=None),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+
+
+def send_bill_reminders(sender: WhatsAppSender = whatsapp_sender, agora: datetime = None) -> int:
+    """Job de hora em hora (ver app.main): a partir de BILL_REMINDER_HOUR, envia os lembretes do dia.
+
+    Hora e "hoje" são os de BILL_REMINDER_TIMEZONE, não os do servidor. Só
+    roda com template configurado: texto simples fora da janela de 24h é
+    aceito pela Meta mas nunca entregue, e a conta ficaria marcada à toa.
+    Manda em lotes de BILL_REMINDER_BATCH usuários, no ritmo do sender;
+    as contas de cada lote são reivindicadas antes do envio e liberadas de
+    novo se a mensagem falhar. Se o processo cair entre as duas etapas, o
+    lembrete daquele lote é perdido no dia, nunca duplicado.
+    """
+    if not sender.can_initiate:
+        return 0
+    agora = agora.astimezone(FUSO_LEMBRETES) if agora else datetime.now(FUSO_LEMBRETES)
+    if agora.hour < BILL_REMINDER_HOUR:
+        return 0
+    hoje = agora.date()
+    db = SessionLocal()
+    try:
+        lembretes = load_reminders(db, hoje)
+        enviados = 0
+        for i in range(0, len(lembretes), BILL_REMINDER_BATCH):
+            lote = lembretes[i:i + BILL_REMINDER_BATCH]
+            reivindicadas = claim_reminders(db, [cid for l in lote for cid in l.conta_ids], hoje)
+            for lembrete in lote:
+                # Outra réplica pode ter levado parte das contas do usuário entre a leitura e o UPDATE
+                lembrete.contas = [c for c in lembrete.contas if c.id in reivindicadas]
+            lote = [l for l in lote if l.contas]
+            resultados = sender.send_many([(l.telefone, l.texto(hoje)) for l in lote])
+            falhas = [cid for l, ok in zip(lote, resultados) if not ok for cid in l.conta_ids]
+            if falhas:
+                release_reminders(db, falhas, hoje)
+            enviados += sum(resultados)
+        if lembretes:
+            print(f"Lembretes de vencimento: {enviados} de {len(lembretes)} usuários")
+        return enviados
+    finally:
+        db.close()
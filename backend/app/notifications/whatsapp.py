@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import requests
+
+from app.config.settings import (
+    WHATSAPP_ACCESS_TOKEN, WHATSAPP_PHONE_NUMBER_ID, WHATSAPP_DRY_RUN, WHATSAPP_REMINDER_TEMPLATE,
+    WHATSAPP_SEND_PER_SECOND, WHATSAPP_SEND_CONCURRENCY
+)
+
+WHATSAPP_API_URL = "https://graph.facebook.com/v21.0"
+
+
+class RateLimiter:
+    """Espaça as chamadas para no máximo `per_second` por segundo, entre todas as threads"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._next - agora
+            self._next = max(self._next, agora) + self.interval
+        if espera > 0:
+            time.sleep(espera)
+
+
+class WhatsAppSender:
+    """Envio de mensagens pelo WhatsApp Cloud API, com limite de taxa e envio paralelo em lotes.
+
+    Mesma API usada pelo webhook (whatsapp/webhook/main.py), mas para
+    mensagens iniciadas pelo backend. Com WHATSAPP_REMINDER_TEMPLATE, envia
+    o template aprovado com o texto como único parâmetro; sem ele, texto
+    simples, que a Meta aceita mas só entrega dentro da janela de 24h
+    desde a última mensagem do usuário.
+    """
+
+    def __init__(self, access_token: str = WHATSAPP_ACCESS_TOKEN, phone_number_id: str = WHATSAPP_PHONE_NUMBER_ID,
+                 template: str = WHATSAPP_REMINDER_TEMPLATE, per_second: float = WHATSAPP_SEND_PER_SECOND,
+                 concurrency: int = WHATSAPP_SEND_CONCURRENCY, dry_run: bool = WHATSAPP_DRY_RUN):
+        self.access_token = access_token
+        self.phone_number_id = phone_number_id
+        self.template = template
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        self.limiter = RateLimiter(per_second)
+        # Sessão com keep-alive: as conexões com a Meta são reaproveitadas entre envios
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    @property
+    def enabled(self) -> bool:
+        return self.dry_run or bool(self.access_token and self.phone_number_id)
+
+    @property
+    def can_initiate(self) -> bool:
+        """Se mensagens iniciadas pelo backend chegam a qualquer usuário (template ou dry-run)"""
+        return self.enabled and (self.dry_run or bool(self.template))
+
+    def payload(self, to: str, text: str) -> dict:
+        payload = {"messaging_product": "whatsapp", "recipient_type": "individual", "to": to.lstrip("+")}
+        if self.template:
+            # Parâmetros de template não aceitam quebras de linha
+            payload.update(type="template", template={
+                "name": self.template,
+                "language": {"code": "pt_BR"},
+                "components": [{"type": "body", "parameters": [{"type": "text", "text": " ".join(text.split())}]}],
+            })
+        else:
+            payload.update(type="text", text={"body": text})
+        return payload
+
+    def send(self, to: str, text: str) -> bool:
+        self.limiter.acquire()
+        if self.dry_run:
+            print(f"[dry-run] Mensagem para {to}: {text}")
+            return True
+        try:
+            response = self.session.post(
+                f"{WHATSAPP_API_URL}/{self.phone_number_id}/messages",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                json=self.payload(to, text),
+                timeout=10
+            )
+            if response.status_code != 200:
+                print(f"WhatsApp recusou mensagem para {to}: {response.status_code} {response.text[:200]}")
+            return response.status_code == 200
+        except requests.RequestException as e:
+            print(f"Erro ao enviar mensagem para {to}: {e}")
+            return False
+
+    def send_many(self, mensagens: List[Tuple[str, str]]) -> List[bool]:
+        """Envia um lote de (telefone, texto) e devolve quais foram aceitos, na mesma ordem"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(lambda m: self.send(*m), mensagens))
+
+
+whatsapp_sender = WhatsAppSender()
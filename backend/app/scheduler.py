@@ -0,0 +1,26 @@
+import asyncio
+from typing import Callable, List
+from fastapi.concurrency import run_in_threadpool
+
+_tasks: List[asyncio.Task] = []
+
+
+async def _run_periodically(name: str, interval_seconds: float, fn: Callable[[], None]):
+    while True:
+        try:
+            await run_in_threadpool(fn)
+        except Exception as e:
+            print(f"Erro no job {name}: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+def schedule_every(name: str, interval_seconds: float, fn: Callable[[], None]) -> None:
+    """Roda `fn` (síncrona, no threadpool) agora e depois a cada intervalo"""
+    _tasks.append(asyncio.create_task(_run_periodically(name, interval_seconds, fn), name=name))
+
+
+async def stop_jobs() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -8,6 +8,8 @@ from app.models.transaction_db import TransactionDB
 from app.models.user import User
 from app.config.database import get_db
 from app.auth.router import get_current_user
+from app.utils.streaming import stream_json_array
+from app.ai.retrieval import retrieval_index
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
@@ -29,17 +31,21 @@ def create_transaction(
     db.add(db_transaction)
     db.commit()
     db.refresh(db_transaction)
+    retrieval_index.upsert(db_transaction)
     return db_transaction
 
 @router.get("/", response_model=List[Transaction])
 def list_transactions(
+    stream: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    transactions = db.query(TransactionDB).filter(
+    query = db.query(TransactionDB).filter(
         TransactionDB.user_id == current_user.id
-    ).order_by(TransactionDB.data.desc()).all()
-    return transactions
+    ).order_by(TransactionDB.data.desc())
+    if stream:
+        return stream_json_array(query, Transaction)
+    return query.all()
 
 @router.get("/summary")
 def get_summary(
@@ -102,6 +108,7 @@ def update_transaction(
     
     db.commit()
     db.refresh(transaction)
+    retrieval_index.upsert(transaction)
     return transaction
 
 @router.delete("/{transaction_id}")
@@ -123,6 +130,7 @@ def delete_transaction(
     
     db.delete(transaction)
     db.commit()
+    retrieval_index.remove(current_user.id, transaction_id)
     return {"message": "Transação excluída com sucesso"}
 
 @router.post("/seed")
@@ -185,6 +193,7 @@ def seed_transactions(
             transacoes_criadas.append(t)
     
     db.commit()
+    retrieval_index.invalidate(current_user.id)
     return {"message": f"{len(transacoes_criadas)} transações criadas com sucesso!"}
 
 @router.post("/seed-multi")
@@ -201,5 +210,6 @@ def seed_multi_currency(
     
     # Cria novas transações
     count = seed_transactions(db, current_user.id)
+    retrieval_index.invalidate(current_user.id)
     
     return {"message": f"{count} transações criadas com sucesso! (BRL, USD, EUR)"}
@@ -0,0 +1,10 @@
+from sqlalchemy.orm import Session
+
+
+def insert_ignore(db: Session, model):
+    """INSERT ... ON CONFLICT DO NOTHING no dialeto do banco da sessão (PostgreSQL ou SQLite)"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
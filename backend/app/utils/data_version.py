@@ -0,0 +1,50 @@
+import threading
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config.database import SessionLocal
+
+# user_id -> versão dos dados financeiros. Caches derivados (contexto da IA,
+# respostas, sugestões...) usam a versão na chave, então qualquer escrita
+# do usuário os invalida automaticamente.
+_versions = {}
+_lock = threading.Lock()
+# Os contadores são por processo; o prefixo evita que duas réplicas gerem a
+# mesma versão para estados diferentes em um cache compartilhado
+_epoch = uuid.uuid4().hex[:8]
+
+
+def get_data_version(user_id: int) -> str:
+    return f"{_epoch}.{_versions.get(user_id, 0)}"
+
+
+def bump_data_version(user_id: int) -> None:
+    with _lock:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+
+
+def mark_user_data_changed(db: Session, user_id: int) -> None:
+    """Para escritas em lote (UPDATE/INSERT direto) que não passam pelo flush do ORM"""
+    db.info.setdefault("changed_user_ids", set()).add(user_id)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_changed_users(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        # Models com __data_version__ = False (ex.: histórico do chat) não contam
+        if not getattr(type(obj), "__data_version__", True):
+            continue
+        user_id = getattr(obj, "user_id", None)
+        if user_id is not None:
+            mark_user_data_changed(session, user_id)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        bump_data_version(user_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
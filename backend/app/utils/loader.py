@@ -0,0 +1,7 @@
+import importlib
+
+
+def load_object(path: str):
+    """Importa um objeto a partir de "modulo:Nome" (usado pelos backends plugáveis)"""
+    module_name, name = path.split(":")
+    return getattr(importlib.import_module(module_name), name)
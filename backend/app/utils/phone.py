@@ -0,0 +1,25 @@
+import re
+from typing import Optional
+
+DEFAULT_COUNTRY_CODE = "55"
+
+
+def normalize_phone(raw: str, default_country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """Normaliza um telefone para E.164 (ex.: "+5511999998888").
+
+    Aceita os formatos que chegam do app ("(11) 99999-8888") e do WhatsApp
+    ("5511999998888", às vezes sem o 9º dígito do celular). Retorna None
+    se o número não for válido. A migração add_telefone_e164.sql aplica a
+    mesma regra aos registros existentes.
+    """
+    if not raw:
+        return None
+    digits = re.sub(r"\D", "", raw).lstrip("0")
+    if not raw.strip().startswith("+") and len(digits) in (10, 11):
+        digits = default_country_code + digits
+    # Celular brasileiro sem o 9º dígito (formato antigo usado pelo WhatsApp)
+    if len(digits) == 12 and digits.startswith("55") and digits[4] in "6789":
+        digits = digits[:4] + "9" + digits[4:]
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
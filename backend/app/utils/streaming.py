@@ -0,0 +1,35 @@
+from typing import Iterator, Type
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+# Quantidade de linhas buscadas do cursor (e serializadas) por vez
+STREAM_CHUNK_SIZE = 500
+
+
+def iter_json_array(query: Query, schema: Type[BaseModel], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Serializa o resultado da query como um array JSON, bloco a bloco.
+
+    Usa cursor no servidor (yield_per), então só `chunk_size` objetos ficam
+    em memória por vez, independente do tamanho do histórico.
+    """
+    yield b"["
+    first = True
+    buffer = []
+    for row in query.yield_per(chunk_size):
+        buffer.append(schema.model_validate(row).model_dump_json().encode("utf-8"))
+        if len(buffer) >= chunk_size:
+            yield (b"" if first else b",") + b",".join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield (b"" if first else b",") + b",".join(buffer)
+    yield b"]"
+
+
+def stream_json_array(query: Query, schema: Type[BaseModel], chunk_size: int = STREAM_CHUNK_SIZE) -> StreamingResponse:
+    """Resposta JSON em streaming para rotas de listagem (modo ?stream=true)"""
+    return StreamingResponse(
+        iter_json_array(query, schema, chunk_size),
+        media_type="application/json"
+    )
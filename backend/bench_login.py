@@ -0,0 +1,121 @@
+"""Benchmark de vazão do login (POST /auth/login).
+
+Sobe o app no próprio processo (httpx + ASGITransport, sem rede) sobre um
+SQLite temporário, cadastra os usuários e dispara logins concorrentes.
+Mede logins por segundo, latência p50/p95, respostas 503 (fila do pool de
+senhas cheia) e o maior atraso do event loop: um relógio de 10 ms roda
+junto com os logins, e qualquer chamada síncrona no event loop (consulta
+ao banco, bcrypt) aparece como atraso.
+
+Precisa das dependências de desenvolvimento (pip install -r requirements-dev.txt).
+
+    python bench_login.py
+    python bench_login.py --usuarios 50 --logins 1000 --concorrencia 32 --bcrypt-rounds 10
+"""
+import argparse
+import asyncio
+import math
+import os
+import tempfile
+import time
+from typing import List
+
+SENHA = "Benchmark-de-login1!"
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo posto mais próximo"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+async def medir_event_loop(atrasos: List[float], parar: asyncio.Event, intervalo: float = 0.01) -> None:
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atrasos.append(time.perf_counter() - inicio - intervalo)
+
+
+async def run_bench(args) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        emails = [f"bench{i}@example.com" for i in range(args.usuarios)]
+        for email in emails:
+            response = await client.post("/auth/register", json={"email": email, "name": "Bench", "password": SENHA})
+            response.raise_for_status()
+        # Aquecimento: sobe os processos do pool de senhas fora da medição
+        await client.post("/auth/login", json={"email": emails[0], "password": SENHA})
+
+        latencias, status = [], {}
+        fila = asyncio.Queue()
+        for i in range(args.logins):
+            fila.put_nowait(emails[i % len(emails)])
+
+        async def worker():
+            while not fila.empty():
+                email = fila.get_nowait()
+                inicio = time.perf_counter()
+                response = await client.post("/auth/login", json={"email": email, "password": SENHA})
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                status[response.status_code] = status.get(response.status_code, 0) + 1
+
+        atrasos, parar = [], asyncio.Event()
+        relogio = asyncio.create_task(medir_event_loop(atrasos, parar))
+        inicio = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concorrencia)))
+        duracao = time.perf_counter() - inicio
+        parar.set()
+        await relogio
+
+    return {
+        "logins": args.logins,
+        "concorrencia": args.concorrencia,
+        "bcrypt_rounds": int(os.environ["BCRYPT_ROUNDS"]),
+        "logins_por_segundo": round(status.get(200, 0) / duracao, 1),
+        "latencia_p50_ms": round(percentil(latencias, 50), 1),
+        "latencia_p95_ms": round(percentil(latencias, 95), 1),
+        "status": status,
+        "atraso_event_loop_p95_ms": round(percentil(atrasos, 95) * 1000, 1),
+        "atraso_event_loop_max_ms": round(max(atrasos, default=0) * 1000, 1),
+    }
+
+
+def print_report(r: dict) -> None:
+    print(f"\n{r['logins']} logins, concorrência {r['concorrencia']}, bcrypt {r['bcrypt_rounds']} rounds")
+    print(f"  vazão              {r['logins_por_segundo']} logins/s")
+    print(f"  latência p50/p95   {r['latencia_p50_ms']} / {r['latencia_p95_ms']} ms")
+    print(f"  status             {r['status']}")
+    print(f"  atraso do loop     p95 {r['atraso_event_loop_p95_ms']} ms, máx {r['atraso_event_loop_max_ms']} ms")
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as pasta:
+        # Configuração antes de importar o app: banco descartável e limitador de login fora do caminho
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(pasta, 'bench.db')}"
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+        os.environ.setdefault("LLM_PROVIDER", "fake")
+        for nome in ("LOGIN_RATE_IP_BURST", "LOGIN_RATE_EMAIL_BURST"):
+            os.environ[nome] = str(args.logins * 2)
+        for nome in ("LOGIN_RATE_IP_PER_MINUTE", "LOGIN_RATE_EMAIL_PER_MINUTE"):
+            os.environ[nome] = "1000000"
+
+        from app.auth.security import shutdown_password_pool
+        try:
+            print_report(asyncio.run(run_bench(args)))
+        finally:
+            shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    # O pool de senhas usa "spawn": sem este guard os processos filhos rodariam o benchmark de novo
+    parser = argparse.ArgumentParser(description="Benchmark de vazão do login")
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    main(parser.parse_args())
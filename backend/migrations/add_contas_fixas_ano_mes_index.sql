@@ -0,0 +1,4 @@
+-- Migração: índice para consultas de contas fixas por usuário, ano e mês
+-- Execute este script no banco de dados SQLite/PostgreSQL
+
+CREATE INDEX ix_contas_fixas_user_id_ano_mes ON contas_fixas (user_id, ano_referencia, mes_referencia);
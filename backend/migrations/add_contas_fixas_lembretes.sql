@@ -0,0 +1,6 @@
+-- Migração: lembretes de vencimento das contas fixas pelo WhatsApp
+-- Execute este script no banco de dados SQLite/PostgreSQL
+
+ALTER TABLE contas_fixas ADD COLUMN lembrete_enviado_em DATE;
+
+CREATE INDEX ix_contas_fixas_vencimento ON contas_fixas (ano_referencia, mes_referencia, dia_vencimento, pago);
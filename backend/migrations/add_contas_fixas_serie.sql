@@ -0,0 +1,10 @@
+-- Migração: série das contas fixas (parcelas e "virar o mês" sem duplicar)
+-- Execute este script no banco de dados SQLite/PostgreSQL
+-- No PostgreSQL, rode em seguida add_contas_fixas_serie_postgres.sql
+
+ALTER TABLE contas_fixas ADD COLUMN serie_id VARCHAR;
+
+-- Contas existentes viram uma série cada (as parcelas antigas não eram ligadas entre si)
+UPDATE contas_fixas SET serie_id = 'legado-' || id WHERE serie_id IS NULL;
+
+CREATE UNIQUE INDEX ux_contas_fixas_serie_mes ON contas_fixas (user_id, serie_id, ano_referencia, mes_referencia);
@@ -0,0 +1,6 @@
+-- Migração: serie_id obrigatório (complemento de add_contas_fixas_serie.sql)
+-- Execute este script no banco de dados PostgreSQL
+-- O SQLite não altera restrições de coluna existente; lá a coluna fica
+-- anulável, e o app sempre preenche serie_id (app/contas_fixas/parcelas.py)
+
+ALTER TABLE contas_fixas ALTER COLUMN serie_id SET NOT NULL;
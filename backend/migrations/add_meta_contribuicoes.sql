@@ -0,0 +1,20 @@
+-- Migração: histórico de contribuições das metas
+-- Execute este script no banco de dados PostgreSQL
+-- No SQLite, use add_meta_contribuicoes_sqlite.sql
+
+CREATE TABLE meta_contribuicoes (
+    id SERIAL PRIMARY KEY,
+    meta_id INTEGER NOT NULL REFERENCES metas (id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    valor FLOAT NOT NULL,
+    origem VARCHAR NOT NULL DEFAULT 'app',
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX ix_meta_contribuicoes_user_id_meta_id ON meta_contribuicoes (user_id, meta_id, created_at);
+
+-- O valor já guardado nas metas existentes vira a primeira contribuição
+INSERT INTO meta_contribuicoes (meta_id, user_id, valor, origem, created_at)
+SELECT id, user_id, valor_atual, 'saldo_inicial', coalesce(created_at, now())
+FROM metas
+WHERE valor_atual <> 0;
@@ -0,0 +1,30 @@
+-- Migração: telefone canônico (E.164) com índice único
+-- Execute este script no banco de dados PostgreSQL
+-- Mesma regra de app/utils/phone.py: só dígitos, sem zeros à esquerda,
+-- DDI 55 quando ausente e 9º dígito em celulares brasileiros antigos
+
+ALTER TABLE users ADD COLUMN telefone_e164 VARCHAR;
+
+WITH digitos AS (
+    SELECT id,
+           telefone LIKE '+%' AS tem_ddi,
+           ltrim(regexp_replace(telefone, '\D', '', 'g'), '0') AS d
+    FROM users
+    WHERE telefone IS NOT NULL
+), com_ddi AS (
+    SELECT id,
+           CASE WHEN NOT tem_ddi AND length(d) IN (10, 11) THEN '55' || d ELSE d END AS d
+    FROM digitos
+)
+UPDATE users u
+SET telefone_e164 = '+' || CASE
+        WHEN length(c.d) = 12 AND c.d LIKE '55%' AND substr(c.d, 5, 1) IN ('6', '7', '8', '9')
+        THEN substr(c.d, 1, 4) || '9' || substr(c.d, 5)
+        ELSE c.d
+    END
+FROM com_ddi c
+WHERE u.id = c.id AND length(c.d) BETWEEN 8 AND 15;
+
+-- Se o índice falhar por duplicidade, verifique quais contas compartilham o número:
+-- SELECT telefone_e164, array_agg(id) FROM users WHERE telefone_e164 IS NOT NULL GROUP BY 1 HAVING count(*) > 1;
+CREATE UNIQUE INDEX ix_users_telefone_e164 ON users (telefone_e164);
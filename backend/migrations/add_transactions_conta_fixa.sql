@@ -0,0 +1,6 @@
+-- Migração: despesas geradas pelo pagamento de contas fixas ligadas à conta
+-- Execute este script no banco de dados SQLite/PostgreSQL
+
+ALTER TABLE transactions ADD COLUMN conta_fixa_id INTEGER REFERENCES contas_fixas (id) ON DELETE SET NULL;
+
+CREATE UNIQUE INDEX ux_transactions_conta_fixa_id ON transactions (conta_fixa_id);
@@ -0,0 +1,4 @@
+-- Migração: índice para consultas de transações por usuário e período
+-- Execute este script no banco de dados SQLite/PostgreSQL
+
+CREATE INDEX ix_transactions_user_id_data ON transactions (user_id, data);
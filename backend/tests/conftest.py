@@ -0,0 +1,42 @@
+import os
+import sys
+from datetime import date
+
+# Banco em memória e LLM fake antes de importar o app
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.models.user_db import UserDB
+from app.models.transaction_db import TransactionDB
+from app.ai.retrieval import retrieval_index
+
+TRANSACOES = [
+    ("despesa", 120.0, "Moradia", "Net", date(2026, 3, 5)),
+    ("despesa", 45.0, "Lazer", "Cinema", date(2026, 3, 12)),
+    ("receita", 5000.0, "Salário", "Salário", date(2026, 3, 1)),
+    ("despesa", 310.0, "Alimentação", "Mercado", date(2026, 2, 20)),
+    ("despesa", 28.5, "Transporte", "Uber centro", date(2026, 2, 22)),
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[UserDB.__table__, TransactionDB.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add(UserDB(id=1, email="a@b.com", name="Ana"))
+    for tipo, valor, categoria, descricao, data in TRANSACOES:
+        session.add(TransactionDB(user_id=1, tipo=tipo, valor=valor, categoria=categoria,
+                                  descricao=descricao, data=data, moeda="BRL"))
+    session.commit()
+    retrieval_index.invalidate(1)
+    yield session
+    session.close()
+    retrieval_index.invalidate(1)
@@ -0,0 +1,81 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.config.database import Base
+from app.contas_fixas import router
+from app.models.conta_fixa import ContaFixaCreate
+from app.models.conta_fixa_db import ContaFixaDB
+
+
+@pytest.mark.parametrize("mes", [0, 13])
+def test_mes_de_referencia_fora_do_intervalo(mes):
+    with pytest.raises(ValidationError):
+        ContaFixaCreate(nome="Aluguel", valor=1500, dia_vencimento=5, mes_referencia=mes, ano_referencia=2026)
+
+
+def test_mes_de_referencia_valido():
+    conta = ContaFixaCreate(nome="Aluguel", valor=1500, dia_vencimento=5, mes_referencia=12, ano_referencia=2026)
+    assert conta.mes_referencia == 12
+
+
+def conta(nome, valor, dia, mes, ano=2026, pago=False, moeda="BRL", user_id=1):
+    return ContaFixaDB(user_id=user_id, nome=nome, valor=valor, dia_vencimento=dia, mes_referencia=mes,
+                       ano_referencia=ano, pago=pago, moeda=moeda)
+
+
+@pytest.fixture
+def ano(db, monkeypatch):
+    """Hoje é 10/03/2026; a função é chamada direto, como a rota faria"""
+    monkeypatch.setattr(router, "date", type("Hoje", (date,), {"today": classmethod(lambda cls: date(2026, 3, 10))}))
+    Base.metadata.create_all(db.get_bind(), tables=[ContaFixaDB.__table__])
+    db.add_all([
+        conta("Aluguel", 1500, 5, 1),
+        conta("Luz", 200, 10, 1, pago=True),
+        conta("Internet", 100, 5, 3),
+        conta("Água", 80, 20, 3),
+        conta("Gás", 60, 10, 3),  # Vence hoje: ainda não está vencida
+        conta("Streaming", 15, 1, 3, moeda="USD"),
+        conta("Seguro", 300, 5, 4),
+        conta("Academia", 90, 5, 12, ano=2025),
+        conta("IPVA", 500, 5, 1, ano=2027),
+        conta("Outro usuário", 999, 5, 3, user_id=2),
+    ])
+    db.commit()
+    return lambda ano, mes=None: router.contas_fixas_do_ano(ano, mes, db, SimpleNamespace(id=1))
+
+
+def test_totais_por_mes_e_moeda(ano):
+    resultado = ano(2026)
+    assert [m.mes for m in resultado.meses] == list(range(1, 13))
+    assert resultado.contas is None
+
+    janeiro = resultado.meses[0].totais["BRL"]
+    assert (janeiro.quantidade, janeiro.total, janeiro.pago, janeiro.pendente) == (2, 1700, 200, 1500)
+
+    marco = resultado.meses[2].totais
+    assert set(marco) == {"BRL", "USD"}
+    assert (marco["BRL"].quantidade, marco["BRL"].total, marco["BRL"].pendente) == (3, 240, 240)
+    assert marco["USD"].total == 15
+    assert resultado.meses[1].totais == {}
+
+
+def test_vencido_so_o_que_passou_do_dia(ano):
+    meses = ano(2026).meses
+    assert meses[0].totais["BRL"].vencido == 1500  # Luz paga não conta
+    assert meses[2].totais["BRL"].vencido == 100  # Internet (dia 5); Água e Gás ainda não venceram
+    assert meses[2].totais["USD"].vencido == 15
+    assert meses[3].totais["BRL"].vencido == 0
+
+
+def test_vencido_em_outros_anos(ano):
+    assert ano(2025).meses[11].totais["BRL"].vencido == 90
+    janeiro_2027 = ano(2027).meses[0].totais["BRL"]
+    assert (janeiro_2027.pendente, janeiro_2027.vencido) == (500, 0)
+
+
+def test_contas_do_mes_por_vencimento(ano):
+    contas = ano(2026, 3).contas
+    assert [c.nome for c in contas] == ["Streaming", "Internet", "Gás", "Água"]
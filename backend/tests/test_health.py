@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+
+from app.auth import internal
+from app.main import app
+
+
+def test_metricas_de_cache_exigem_chave_interna(monkeypatch):
+    monkeypatch.setattr(internal, "INTERNAL_API_KEY", "segredo")
+    client = TestClient(app)
+    assert client.get("/health/cache").status_code == 403
+    assert client.get("/health/cache", headers={"X-Internal-Key": "errada"}).status_code == 403
+
+    response = client.get("/health/cache", headers={"X-Internal-Key": "segredo"})
+    assert response.status_code == 200
+    assert "token_cache" in response.json()
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.models.conta_fixa_db import ContaFixaDB
+from app.notifications import lembretes
+from app.notifications.whatsapp import WhatsAppSender
+
+# 12:00 UTC = 09:00 em São Paulo
+AGORA = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+HOJE = date(2026, 10, 19)
+
+
+class SenderFake:
+    can_initiate = True
+
+    def __init__(self, aceita: bool = True):
+        self.aceita = aceita
+        self.enviadas = []
+
+    def send_many(self, mensagens):
+        self.enviadas += mensagens
+        return [self.aceita] * len(mensagens)
+
+
+@pytest.fixture
+def contas(db, monkeypatch):
+    Base.metadata.create_all(db.get_bind(), tables=[ContaFixaDB.__table__])
+    db.get(lembretes.UserDB, 1).telefone_e164 = "+5511987654321"
+    db.add_all([
+        ContaFixaDB(user_id=1, nome="Luz", valor=180, dia_vencimento=20, mes_referencia=10, ano_referencia=2026),
+        ContaFixaDB(user_id=1, nome="Internet", valor=99.9, dia_vencimento=21, mes_referencia=10, ano_referencia=2026),
+    ])
+    db.commit()
+    monkeypatch.setattr(lembretes, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    return db
+
+
+def lembradas(db):
+    db.expire_all()
+    return {c.nome: c.lembrete_enviado_em for c in db.query(ContaFixaDB)}
+
+
+def test_envia_uma_vez_por_dia(contas):
+    sender = SenderFake()
+    assert lembretes.send_bill_reminders(sender, AGORA) == 1
+    assert "Luz" in sender.enviadas[0][1] and "Internet" in sender.enviadas[0][1]
+    assert lembradas(contas) == {"Luz": HOJE, "Internet": HOJE}
+    # Outra execução (ou outra réplica) no mesmo dia não repete
+    assert lembretes.send_bill_reminders(sender, AGORA) == 0
+    assert len(sender.enviadas) == 1
+
+
+def test_contas_reivindicadas_uma_vez(contas):
+    ids = [c.id for c in contas.query(ContaFixaDB)]
+    assert lembretes.claim_reminders(contas, ids, HOJE) == set(ids)
+    assert lembretes.claim_reminders(contas, ids, HOJE) == set()
+
+
+def test_so_envia_as_contas_reivindicadas(contas, monkeypatch):
+    luz = contas.query(ContaFixaDB).filter(ContaFixaDB.nome == "Luz").one()
+    leitura = lembretes.load_reminders
+
+    def outra_replica_leva_a_luz(db, hoje):
+        resultado = leitura(db, hoje)
+        lembretes.claim_reminders(contas, [luz.id], hoje)
+        return resultado
+
+    monkeypatch.setattr(lembretes, "load_reminders", outra_replica_leva_a_luz)
+    sender = SenderFake()
+    assert lembretes.send_bill_reminders(sender, AGORA) == 1
+    assert "Internet" in sender.enviadas[0][1] and "Luz" not in sender.enviadas[0][1]
+
+
+def test_falha_no_envio_libera_as_contas(contas):
+    assert lembretes.send_bill_reminders(SenderFake(aceita=False), AGORA) == 0
+    assert lembradas(contas) == {"Luz": None, "Internet": None}
+    assert lembretes.send_bill_reminders(SenderFake(), AGORA) == 1
+
+
+def test_hora_no_fuso_configurado(contas):
+    # 11:00 UTC ainda são 08:00 em São Paulo
+    sender = SenderFake()
+    assert lembretes.send_bill_reminders(sender, datetime(2026, 10, 19, 11, 0, tzinfo=timezone.utc)) == 0
+    assert sender.enviadas == []
+
+
+def test_sem_template_nao_envia_nem_marca(contas):
+    sender = WhatsAppSender(access_token="token", phone_number_id="123", template="", dry_run=False)
+    assert not sender.can_initiate
+    assert lembretes.send_bill_reminders(sender, AGORA) == 0
+    assert lembradas(contas) == {"Luz": None, "Internet": None}
+    assert WhatsAppSender(access_token="token", phone_number_id="123", template="lembrete_contas").can_initiate
@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.models.user_db import UserDB
+from app.models.conversa_db import ConversaMensagemDB, ConversaResumoDB
+from app.ai import memory
+
+
+class LLMLento:
+    def __init__(self):
+        self.chamadas = 0
+
+    async def generate(self, contents, **kwargs):
+        self.chamadas += 1
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(text=f"resumo {self.chamadas}")
+
+
+@pytest.fixture
+def sessoes(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[
+        UserDB.__table__, ConversaMensagemDB.__table__, ConversaResumoDB.__table__
+    ])
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(UserDB(id=1, email="a@b.com", name="Ana"))
+    for i in range(10):
+        db.add(ConversaMensagemDB(user_id=1, papel="user" if i % 2 == 0 else "model", conteudo=f"m{i}", tokens=1))
+    db.commit()
+    db.close()
+    monkeypatch.setattr(memory, "SessionLocal", Session)
+    monkeypatch.setattr(memory, "AI_MEMORY_KEEP_RECENT", 4)
+    return Session
+
+
+def test_resumos_simultaneos_do_mesmo_usuario(sessoes, monkeypatch):
+    llm = LLMLento()
+    monkeypatch.setattr(memory, "llm", llm)
+
+    async def dois_turnos():
+        await asyncio.gather(memory.summarize_old_turns(1), memory.summarize_old_turns(1))
+
+    asyncio.run(dois_turnos())
+    assert llm.chamadas == 1
+    resumo = sessoes().get(ConversaResumoDB, 1)
+    assert (resumo.resumo, resumo.ate_mensagem_id) == ("resumo 1", 6)
+
+
+def test_janela_ja_resumida_nao_e_gravada_de_novo(sessoes):
+    janela = memory.load_summary_window(1)
+    assert (janela.ate_id, janela.novo_ate_id) == (0, 6)
+    assert memory.save_summary(1, janela, "primeiro")
+    # Outra réplica leu a mesma janela antes da gravação acima
+    assert not memory.save_summary(1, janela, "segundo")
+
+    proxima = memory.load_summary_window(1)
+    assert proxima is None or proxima.ate_id == 6
+    assert sessoes().get(ConversaResumoDB, 1).resumo == "primeiro"
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.router import get_current_user
+from app.config.database import Base, get_db
+from app.main import app
+from app.models.meta_db import MetaDB
+from app.models.meta_contribuicao_db import MetaContribuicaoDB
+
+
+@pytest.fixture
+def client(db):
+    Base.metadata.create_all(db.get_bind(), tables=[MetaDB.__table__, MetaContribuicaoDB.__table__])
+    meta = MetaDB(user_id=1, nome="Viagem", valor_alvo=1000, valor_atual=0)
+    db.add(meta)
+    db.commit()
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    yield TestClient(app), meta.id
+    app.dependency_overrides.clear()
+
+
+def test_adicionar_valor_registra_contribuicao(client, db):
+    client, meta_id = client
+    response = client.patch(f"/metas/{meta_id}/adicionar", params={"valor": 150, "origem": "whatsapp"})
+    assert response.status_code == 200
+    assert response.json()["valor_atual"] == 150
+    assert [c.origem for c in db.query(MetaContribuicaoDB).all()] == ["whatsapp"]
+
+
+@pytest.mark.parametrize("origem", ["saldo_inicial", "ajuste", "qualquer"])
+def test_adicionar_valor_recusa_origem_do_servidor(client, origem):
+    client, meta_id = client
+    response = client.patch(f"/metas/{meta_id}/adicionar", params={"valor": 150, "origem": origem})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("valor", [0, -50])
+def test_adicionar_valor_recusa_valor_nao_positivo(client, valor):
+    client, meta_id = client
+    assert client.patch(f"/metas/{meta_id}/adicionar", params={"valor": valor}).status_code == 422
@@ -0,0 +1,55 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config.database import Base
+from app.contas_fixas.pagamentos import marcar_pagas
+from app.models.conta_fixa import ContaFixaPagamentoLote
+from app.models.conta_fixa_db import ContaFixaDB
+from app.models.transaction_db import TransactionDB
+
+
+@pytest.fixture
+def contas(db):
+    Base.metadata.create_all(db.get_bind(), tables=[ContaFixaDB.__table__])
+    db.add_all([
+        ContaFixaDB(user_id=1, nome="Luz", valor=180, dia_vencimento=10, mes_referencia=10, ano_referencia=2026),
+        ContaFixaDB(user_id=1, nome="Água", valor=90, dia_vencimento=15, mes_referencia=10, ano_referencia=2026),
+        ContaFixaDB(user_id=1, nome="Aluguel", valor=1500, dia_vencimento=5, mes_referencia=11, ano_referencia=2026),
+    ])
+    db.commit()
+    return db
+
+
+def despesas_geradas(db):
+    return sorted(t.descricao for t in db.query(TransactionDB).filter(TransactionDB.conta_fixa_id.isnot(None)))
+
+
+def test_paga_o_mes_inteiro_e_gera_despesas(contas):
+    ids, criadas = marcar_pagas(contas, 1, True, mes=10, ano=2026, gerar_transacoes=True)
+    contas.commit()
+    assert len(ids) == 2 and criadas == 2
+    assert despesas_geradas(contas) == ["Luz", "Água"]
+    # Repetir não muda nada
+    assert marcar_pagas(contas, 1, True, mes=10, ano=2026, gerar_transacoes=True) == ([], 0)
+
+
+def test_pagar_desmarcar_e_pagar_de_novo_gera_uma_despesa(contas):
+    luz = contas.query(ContaFixaDB).filter_by(nome="Luz").one()
+    marcar_pagas(contas, 1, True, ids=[luz.id], gerar_transacoes=True)
+    contas.commit()
+    assert marcar_pagas(contas, 1, False, ids=[luz.id]) == ([luz.id], 1)
+    contas.commit()
+    assert despesas_geradas(contas) == []
+    marcar_pagas(contas, 1, True, ids=[luz.id], gerar_transacoes=True)
+    contas.commit()
+    assert despesas_geradas(contas) == ["Luz"]
+
+
+def test_nao_paga_contas_de_outro_usuario(contas):
+    luz = contas.query(ContaFixaDB).filter_by(nome="Luz").one()
+    assert marcar_pagas(contas, 2, True, ids=[luz.id], gerar_transacoes=True) == ([], 0)
+
+
+def test_lote_valida_o_mes():
+    with pytest.raises(ValidationError):
+        ContaFixaPagamentoLote(mes=13, ano=2026)
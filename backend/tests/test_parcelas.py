@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import false, literal, select
+
+from app.config.database import Base
+from app.contas_fixas import parcelas
+from app.contas_fixas.parcelas import criar_parcelas, serie_id_for_key, somar_meses, virar_mes
+from app.contas_fixas.router import create_conta_fixa
+from app.models.conta_fixa import ContaFixaCreate
+from app.models.conta_fixa_db import ContaFixaDB
+
+
+@pytest.fixture
+def contas(db):
+    Base.metadata.create_all(db.get_bind(), tables=[ContaFixaDB.__table__])
+    return db
+
+
+def conta(**campos) -> ContaFixaCreate:
+    dados = dict(nome="Notebook", valor=500, dia_vencimento=10, mes_referencia=11, ano_referencia=2026)
+    dados.update(campos)
+    return ContaFixaCreate(**dados)
+
+
+def linhas(db, **filtro):
+    return [
+        (c.nome, c.mes_referencia, c.ano_referencia, c.parcela_atual, c.parcela_total)
+        for c in db.query(ContaFixaDB).filter_by(user_id=1, **filtro).order_by(
+            ContaFixaDB.nome, ContaFixaDB.ano_referencia, ContaFixaDB.mes_referencia
+        )
+    ]
+
+
+def test_somar_meses_vira_o_ano():
+    assert somar_meses(11, 2026, 2) == (1, 2027)
+    assert somar_meses(1, 2026, -1) == (12, 2025)
+
+
+def test_parcelas_restantes_nos_meses_seguintes(contas):
+    criar_parcelas(contas, 1, conta(parcela_atual=2, parcela_total=4))
+    contas.commit()
+    assert linhas(contas) == [
+        ("Notebook", 11, 2026, 2, 4),
+        ("Notebook", 12, 2026, 3, 4),
+        ("Notebook", 1, 2027, 4, 4),
+    ]
+
+
+def test_mesmo_serie_id_nao_duplica(contas):
+    serie_id = serie_id_for_key(1, "chave-do-cliente")
+    assert serie_id == serie_id_for_key(1, "chave-do-cliente") != serie_id_for_key(2, "chave-do-cliente")
+    for _ in range(2):
+        criar_parcelas(contas, 1, conta(parcela_total=3, serie_id=serie_id))
+        contas.commit()
+    assert len(linhas(contas)) == 3
+    # Sem serie_id, cada chamada é uma conta nova
+    criar_parcelas(contas, 1, conta(nome="Academia"))
+    criar_parcelas(contas, 1, conta(nome="Academia"))
+    contas.commit()
+    assert len(linhas(contas, nome="Academia")) == 2
+
+
+def test_virar_mes_leva_recorrentes_e_parcelas_em_aberto(contas):
+    criar_parcelas(contas, 1, conta(nome="Aluguel", mes_referencia=12))
+    criar_parcelas(contas, 1, conta(nome="Celular", mes_referencia=12, parcela_atual=2, parcela_total=3))
+    criar_parcelas(contas, 1, conta(nome="Curso", mes_referencia=12, parcela_atual=3, parcela_total=3))
+    contas.commit()
+
+    assert virar_mes(contas, 1, 12, 2026) == 1  # O Celular já tinha a parcela 3 em janeiro
+    contas.commit()
+    assert linhas(contas, mes_referencia=1, ano_referencia=2027) == [
+        ("Aluguel", 1, 2027, 1, 1),
+        ("Celular", 1, 2027, 3, 3),
+    ]
+    # Repetir não duplica
+    assert virar_mes(contas, 1, 12, 2026) == 0
+
+
+def test_virada_simultanea_nao_falha(contas, monkeypatch):
+    criar_parcelas(contas, 1, conta(nome="Aluguel", mes_referencia=12))
+    contas.commit()
+    assert virar_mes(contas, 1, 12, 2026) == 1
+    contas.commit()
+
+    # A segunda virada leu o mês seguinte antes da primeira gravar: o NOT EXISTS
+    # não vê a linha, e é o índice único que impede a duplicata, sem IntegrityError
+    class NaoVe:
+        def where(self, *_):
+            return select(literal(1)).where(false()).exists()
+
+    monkeypatch.setattr(parcelas, "exists", NaoVe)
+    assert virar_mes(contas, 1, 12, 2026) == 0
+    contas.commit()
+    assert len(linhas(contas, nome="Aluguel")) == 2
+
+
+def test_post_repetido_com_idempotency_key(contas):
+    usuario = SimpleNamespace(id=1)
+    primeira = create_conta_fixa(conta(parcela_total=2), "envio-1", contas, usuario)
+    repetida = create_conta_fixa(conta(parcela_total=2), "envio-1", contas, usuario)
+    assert primeira.id == repetida.id
+    assert len(linhas(contas)) == 2
@@ -0,0 +1,35 @@
+from app.auth.principal import cache_principal, get_cached_principal, principal_cache
+from app.config.database import SessionLocal
+from app.models.user_db import UserDB
+
+
+def test_editar_usuario_invalida_o_principal_no_commit(db):
+    session = SessionLocal(bind=db.get_bind())
+    try:
+        user = session.get(UserDB, 1)
+        cache_principal(user)
+        assert get_cached_principal(1).name == user.name
+
+        user.name = "Outro nome"
+        session.flush()
+        # Antes do commit o cache continua com a versão que ainda vale no banco
+        assert get_cached_principal(1) is not None
+        session.commit()
+        assert get_cached_principal(1) is None
+    finally:
+        session.close()
+        principal_cache.delete(1)
+
+
+def test_rollback_mantem_o_principal(db):
+    session = SessionLocal(bind=db.get_bind())
+    try:
+        user = session.get(UserDB, 1)
+        principal = cache_principal(user)
+        user.name = "Descartado"
+        session.flush()
+        session.rollback()
+        assert get_cached_principal(1) is principal
+    finally:
+        session.close()
+        principal_cache.delete(1)
@@ -0,0 +1,98 @@
+from datetime import date, datetime
+
+from app.config.database import Base
+from app.models.meta_db import MetaDB
+from app.models.meta_contribuicao_db import MetaContribuicaoDB
+from app.metas import projecoes
+from app.metas.projecoes import build_projecoes, get_projecoes, projection_cache, projetar
+
+
+def test_meta_criada_em_outra_replica_recebe_projecao(db):
+    Base.metadata.create_all(db.get_bind(), tables=[MetaDB.__table__, MetaContribuicaoDB.__table__])
+    viagem = MetaDB(user_id=1, nome="Viagem", valor_alvo=1000, valor_atual=100, data_limite=date(2027, 6, 1))
+    db.add(viagem)
+    db.commit()
+    projection_cache.delete((1, projecoes.get_data_version(1), date.today()))
+
+    assert set(get_projecoes(db, 1, [viagem])) == {viagem.id}
+
+    # A sessão dos testes não passa pelos eventos do SessionLocal: a versão
+    # dos dados deste processo não muda, como numa escrita feita em outra réplica
+    carro = MetaDB(user_id=1, nome="Carro", valor_alvo=30000, valor_atual=0)
+    db.add(carro)
+    db.commit()
+
+    resultado = get_projecoes(db, 1, [viagem, carro])
+    assert set(resultado) == {viagem.id, carro.id}
+    assert resultado[carro.id]["status_projecao"] == "sem_prazo"
+
+
+HOJE = date(2026, 1, 1)
+
+
+def test_projetar_no_prazo():
+    resultado = projetar(1000, 400, date(2027, 1, 1), 100, HOJE)
+    assert resultado == {
+        "status_projecao": "no_prazo", "ritmo_mensal": 100,
+        # 6 meses de 30,44 dias
+        "data_prevista": date(2026, 7, 3),
+        # 600 em ~11,99 meses até o prazo
+        "aporte_mensal_necessario": 50.04,
+    }
+
+
+def test_projetar_atrasada_quando_o_ritmo_nao_chega_ao_prazo():
+    resultado = projetar(1000, 400, date(2026, 6, 1), 50, HOJE)
+    assert resultado["status_projecao"] == "atrasada"
+    assert resultado["data_prevista"] == date(2027, 1, 2)
+    assert resultado["aporte_mensal_necessario"] == 120.95
+
+
+def test_projetar_sem_ritmo_nao_tem_previsao():
+    resultado = projetar(1000, 400, date(2027, 1, 1), 0, HOJE)
+    assert resultado["status_projecao"] == "atrasada"
+    assert resultado["data_prevista"] is None
+
+
+def test_projetar_prazo_vencido_pede_tudo_no_mes():
+    resultado = projetar(1000, 400, date(2025, 12, 1), 1000, HOJE)
+    assert resultado["status_projecao"] == "atrasada"
+    assert resultado["aporte_mensal_necessario"] == 600
+
+
+def test_projetar_sem_prazo_e_concluida():
+    assert projetar(1000, 400, None, 100, HOJE)["status_projecao"] == "sem_prazo"
+    assert projetar(1000, 400, None, 100, HOJE)["aporte_mensal_necessario"] is None
+    concluida = projetar(1000, 1200, date(2027, 1, 1), 100, HOJE)
+    assert concluida["status_projecao"] == "concluida"
+    assert concluida["aporte_mensal_necessario"] == 0.0
+
+
+def test_sem_contribuicoes_usa_a_poupanca_liquida(db):
+    Base.metadata.create_all(db.get_bind(), tables=[MetaDB.__table__, MetaContribuicaoDB.__table__])
+    criada = datetime(2026, 1, 30)
+    sem_aporte = MetaDB(user_id=1, nome="Reserva", valor_alvo=10000, valor_atual=0, created_at=criada)
+    com_aporte = MetaDB(user_id=1, nome="Viagem", valor_alvo=5000, valor_atual=300, created_at=criada)
+    concluida = MetaDB(user_id=1, nome="Celular", valor_alvo=1000, valor_atual=1000, created_at=criada)
+    em_dolar = MetaDB(user_id=1, nome="Viagem fora", valor_alvo=2000, valor_atual=0, moeda="USD", created_at=criada)
+    db.add_all([sem_aporte, com_aporte, concluida, em_dolar])
+    db.flush()
+    db.add_all([
+        MetaContribuicaoDB(meta_id=com_aporte.id, user_id=1, valor=300, origem="app", created_at=criada),
+        # Saldo herdado não é ritmo
+        MetaContribuicaoDB(meta_id=sem_aporte.id, user_id=1, valor=500, origem="saldo_inicial", created_at=criada),
+    ])
+    db.commit()
+
+    hoje = date(2026, 3, 31)
+    resultado = build_projecoes(db, 1, [sem_aporte, com_aporte, concluida, em_dolar], hoje)
+
+    # 60 dias desde a criação: 300 em ~1,97 mês
+    assert resultado[com_aporte.id]["ritmo_mensal"] == round(300 / (60 / projecoes.DIAS_POR_MES), 2)
+    # Receitas - despesas em BRL na janela (4496,50) por mês, dividida entre as 2 metas em aberto em BRL
+    poupanca_mensal = (5000 - 120 - 45 - 310 - 28.5) / projecoes.METAS_PROJECAO_JANELA_MESES
+    assert resultado[sem_aporte.id]["ritmo_mensal"] == round(poupanca_mensal / 2, 2)
+    assert resultado[concluida.id]["status_projecao"] == "concluida"
+    # Nenhuma transação em USD: sem ritmo, sem previsão
+    assert resultado[em_dolar.id]["ritmo_mensal"] == 0
+    assert resultado[em_dolar.id]["data_prevista"] is None
@@ -0,0 +1,57 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app.ai import prompt_engine as backend_engine
+
+WEBHOOK_ENGINE = Path(__file__).resolve().parents[2] / "whatsapp" / "webhook" / "prompt_engine.py"
+
+
+def _load_webhook_engine():
+    spec = importlib.util.spec_from_file_location("webhook_prompt_engine", WEBHOOK_ENGINE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+ENGINES = [backend_engine, _load_webhook_engine()]
+
+
+def test_backend_e_webhook_usam_o_mesmo_arquivo():
+    assert WEBHOOK_ENGINE.read_text() == Path(backend_engine.__file__).read_text()
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=["backend", "webhook"])
+def test_corta_em_linhas_inteiras(engine):
+    texto = "a" * 30 + "\n" + "b" * 30
+    assert engine.trim_to_tokens(texto, 8) == "a" * 30
+    assert engine.trim_to_tokens(texto, 100) == texto
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=["backend", "webhook"])
+def test_linha_que_nao_cabe_entra_cortada(engine):
+    cortado = engine.trim_to_tokens("x" * 400, 10)
+    assert 0 < len(cortado) < 400
+    assert engine.count_tokens(cortado + "\n") <= 10
+    assert engine.trim_to_tokens("x" * 400, 1) == ""
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=["backend", "webhook"])
+def test_render_por_prioridade_na_ordem_original(engine):
+    template = engine.PromptTemplate("teste", "instrução", 20)
+    texto = template.render([
+        engine.Section("Extra", "e" * 200, 2),
+        engine.Section("Dados", "d" * 20, 1),
+        engine.Section("Vazia", "  ", 0),
+    ])
+    assert texto.startswith("## Extra:\n")
+    assert texto.endswith("## Dados:\n" + "d" * 20)
+    assert engine.count_tokens(texto) <= 20 + 1
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=["backend", "webhook"])
+def test_mensagem_longa_nao_some(engine):
+    # Uma única linha maior que o orçamento (ex.: mensagem do WhatsApp) é cortada, não descartada
+    texto = engine.PromptTemplate("teste", "instrução", 50).render([engine.Section("Mensagem do usuário", "m" * 1000, 0)])
+    assert texto.startswith("## Mensagem do usuário:\nmmm")
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.models.conversa_db import ConversaMensagemDB, ConversaResumoDB
+from app.ai import memory, response_cache as rc, router
+
+
+class Amanha(date):
+    @classmethod
+    def today(cls):
+        return date.fromordinal(date.today().toordinal() + 1)
+
+
+def test_perguntas_que_dependem_da_conversa_ficam_fora_do_cache():
+    cache = rc.ResponseCache()
+    for mensagem in ["sim", "pode ser", "E em março?", "explica isso melhor pra mim", "não, obrigado"]:
+        assert cache.key(1, mensagem, "v1") is None
+    assert cache.get(None) is None
+
+
+def test_chave_normaliza_a_pergunta_e_muda_com_o_dia(monkeypatch):
+    cache = rc.ResponseCache()
+    chave = cache.key(1, "Quanto gastei com Uber?", "v1")
+    assert chave == cache.key(1, "quanto gastei com uber", "v1")
+    assert chave != cache.key(2, "Quanto gastei com Uber?", "v1")
+    monkeypatch.setattr(rc, "date", Amanha)
+    assert cache.key(1, "Quanto gastei com Uber?", "v1") != chave
+
+
+@pytest.fixture
+def chat(db, monkeypatch):
+    """Chama a rota /ai/chat direto, rodando as tarefas pós-resposta (remember_turn) a cada turno"""
+    Base.metadata.create_all(db.get_bind(), tables=[ConversaMensagemDB.__table__, ConversaResumoDB.__table__])
+    monkeypatch.setattr(memory, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(router, "response_cache", rc.ResponseCache())
+    chamadas = []
+
+    async def modelo(db, user_id, contents, system_instruction, feature):
+        chamadas.append(contents)
+        return f"resposta {len(chamadas)}"
+
+    monkeypatch.setattr(router, "AI_CHAT_MODE", "tools")
+    monkeypatch.setattr(router, "chat_with_tools", modelo)
+
+    def enviar(mensagem: str) -> str:
+        async def turno():
+            tarefas = BackgroundTasks()
+            resposta = await router.chat(router.ChatMessage(message=mensagem), tarefas, db, SimpleNamespace(id=1))
+            await tarefas()
+            return resposta.response
+
+        return asyncio.run(turno())
+
+    enviar.chamadas = chamadas
+    return enviar
+
+
+def test_pergunta_repetida_vem_do_cache_mesmo_com_historico(chat, db):
+    assert chat("Quanto gastei com Uber em fevereiro?") == "resposta 1"
+    assert chat("sim") == "resposta 2"
+    # O histórico mudou nos dois turnos (remember_turn), e mesmo assim a pergunta repetida não chama o modelo
+    assert chat("quanto gastei com uber em fevereiro") == "resposta 1"
+    assert len(chat.chamadas) == 2
+    assert db.query(ConversaMensagemDB).count() == 6
+    assert chat("sim") == "resposta 3"
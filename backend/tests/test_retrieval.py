@@ -0,0 +1,57 @@
+from datetime import date
+
+from app.ai import retrieval
+from app.ai.retrieval import relevant_transactions_context, retrieval_index, stem, tokenize
+
+
+def test_termo_sem_transacoes_nao_volta_para_o_periodo(db):
+    # "Uber em março": só há Uber em fevereiro, então nada de março pode aparecer
+    docs = retrieval_index.search(db, 1, tokenize("quanto gastei com Uber em março"), (date(2026, 3, 1), date(2026, 4, 1)))
+    assert docs == []
+
+
+def test_pergunta_so_com_periodo_usa_o_periodo(db):
+    docs = retrieval_index.search(db, 1, tokenize("quanto gastei em março"), (date(2026, 3, 1), date(2026, 4, 1)))
+    assert {d.descricao for d in docs} == {"Net", "Cinema", "Salário"}
+
+
+def test_termo_que_casa(db):
+    docs = retrieval_index.search(db, 1, tokenize("uber"), None)
+    assert [d.descricao for d in docs] == ["Uber centro"]
+
+
+def test_plural_e_prefixo_casam(db):
+    assert [d.descricao for d in retrieval_index.search(db, 1, tokenize("cinemas"), None)] == ["Cinema"]
+    assert [d.descricao for d in retrieval_index.search(db, 1, tokenize("aliment"), None)] == ["Mercado"]
+
+
+def test_stem_tira_plurais():
+    assert stem("restaurantes") == "restaurante"
+    assert stem("cartoes") == "cartao"
+    assert stem("viagens") == "viagem"
+    assert stem("hospitais") == "hospital"
+    assert stem("uber") == "uber"
+
+
+def _hoje(monkeypatch):
+    monkeypatch.setattr(retrieval, "date", type("Hoje", (date,), {"today": classmethod(lambda cls: date(2026, 10, 19))}))
+
+
+def test_contexto_sem_casamento_usa_totais_do_periodo(db, monkeypatch):
+    _hoje(monkeypatch)
+    context = relevant_transactions_context(db, 1, "quanto gastei com Uber em março")
+    assert "Nenhuma transação" not in context
+    assert "Totais do período (de 2026-03-01 até 2026-03-31)" in context
+    assert "Moradia (despesa)" in context and "Lazer (despesa)" in context
+    # Só totais: nenhuma transação de março aparece como se fosse a pedida
+    assert "Net" not in context and "Transporte" not in context
+
+
+def test_palavra_de_conversa_nao_vira_negativa(db, monkeypatch):
+    _hoje(monkeypatch)
+    context = relevant_transactions_context(db, 1, "me dá um resumo de fevereiro")
+    assert "Alimentação (despesa)" in context and "Transporte (despesa)" in context
+
+
+def test_contexto_sem_casamento_e_sem_periodo_fica_vazio(db):
+    assert relevant_transactions_context(db, 1, "quanto gastei com academia") == ""
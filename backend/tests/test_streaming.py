@@ -0,0 +1,37 @@
+import gc
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from app.models.transaction import Transaction
+from app.models.transaction_db import TransactionDB
+from app.utils.streaming import iter_json_array
+
+# Histórico grande: o JSON completo tem ~4,7 MB e a lista carregada com .all()
+# passa de 50 MB; em streaming só um bloco de STREAM_CHUNK_SIZE fica em memória
+LINHAS = 30000
+LIMITE_PICO_BYTES = 3_000_000
+
+
+def test_listagem_em_streaming_tem_pico_de_memoria_limitado(db):
+    db.execute(insert(TransactionDB), [
+        {"user_id": 1, "tipo": "despesa", "valor": i / 100, "categoria": "Lazer",
+         "descricao": f"Compra número {i} no cartão", "data": date(2020, 1, 1) + timedelta(days=i % 2000), "moeda": "BRL"}
+        for i in range(LINHAS)
+    ])
+    db.commit()
+    db.expunge_all()
+    query = db.query(TransactionDB).filter(TransactionDB.user_id == 1).order_by(TransactionDB.data.desc())
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tamanho = sum(len(bloco) for bloco in iter_json_array(query, Transaction))
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # O resultado inteiro não caberia no limite: o teste falha se algo o acumular
+    assert tamanho > LIMITE_PICO_BYTES
+    assert pico < LIMITE_PICO_BYTES, f"pico de {pico / 1e6:.1f} MB ao listar {LINHAS} transações"
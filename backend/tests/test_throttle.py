@@ -0,0 +1,55 @@
+import pytest
+
+from app.auth.throttle import LoginThrottle, MemoryThrottleBackend, ThrottleBackend
+from app.config.settings import LOGIN_BACKOFF_AFTER_FAILURES, LOGIN_RATE_EMAIL_BURST, LOGIN_RATE_IP_BURST
+
+
+def test_email_bloqueado_nao_gasta_fichas_do_ip():
+    throttle = LoginThrottle(MemoryThrottleBackend())
+    for _ in range(LOGIN_BACKOFF_AFTER_FAILURES):
+        throttle.register_failure("vitima@example.com", "10.0.0.1")
+
+    for _ in range(LOGIN_RATE_IP_BURST * 2):
+        assert throttle.check("10.0.0.1", "vitima@example.com") > 0
+    # Quem divide o IP continua podendo entrar
+    assert throttle.check("10.0.0.1", "outra@example.com") == 0
+
+
+def test_ip_esgotado_nao_gasta_fichas_do_email():
+    throttle = LoginThrottle(MemoryThrottleBackend())
+    for i in range(LOGIN_RATE_IP_BURST):
+        assert throttle.check("10.0.0.1", f"u{i}@example.com") == 0
+    for _ in range(LOGIN_RATE_EMAIL_BURST * 2):
+        assert throttle.check("10.0.0.1", "ana@example.com") > 0
+    assert throttle.check("10.0.0.2", "ana@example.com") == 0
+
+
+def test_consome_dos_dois_buckets():
+    throttle = LoginThrottle(MemoryThrottleBackend())
+    for _ in range(LOGIN_RATE_EMAIL_BURST):
+        assert throttle.check("10.0.0.1", "ana@example.com") == 0
+    assert throttle.check("10.0.0.2", "ana@example.com") > 0
+
+
+def test_falhas_de_outro_ip_nao_bloqueiam_o_dono():
+    throttle = LoginThrottle(MemoryThrottleBackend())
+    for _ in range(LOGIN_BACKOFF_AFTER_FAILURES * 3):
+        throttle.register_failure("vitima@example.com", "203.0.113.9")
+    assert throttle.check("203.0.113.9", "vitima@example.com") > 0
+    assert throttle.check("10.0.0.1", "vitima@example.com") == 0
+
+
+def test_sucesso_limpa_o_backoff_do_par():
+    throttle = LoginThrottle(MemoryThrottleBackend())
+    for _ in range(LOGIN_BACKOFF_AFTER_FAILURES):
+        throttle.register_failure("ana@example.com", "10.0.0.1")
+    throttle.register_success("ana@example.com", "10.0.0.1")
+    assert throttle.check("10.0.0.1", "ana@example.com") == 0
+
+
+def test_backend_precisa_implementar_update():
+    class SemUpdate(ThrottleBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        SemUpdate()
@@ -0,0 +1,30 @@
+from app.ai.tools import listar_transacoes
+
+
+def test_texto_sem_transacoes_retorna_vazio(db):
+    assert listar_transacoes(db, 1, texto="academia") == []
+
+
+def test_texto_sem_transacoes_no_periodo_retorna_vazio(db):
+    assert listar_transacoes(db, 1, inicio="2026-03-01", fim="2026-03-31", texto="uber") == []
+
+
+def test_texto_que_casa(db):
+    rows = listar_transacoes(db, 1, texto="uber")
+    assert [r["descricao"] for r in rows] == ["Uber centro"]
+
+
+def test_texto_so_com_palavras_vazias_filtra_pelo_periodo(db):
+    rows = listar_transacoes(db, 1, inicio="2026-02-01", fim="2026-02-28", texto="gastos")
+    assert {r["descricao"] for r in rows} == {"Mercado", "Uber centro"}
+
+
+def test_plural_e_prefixo_casam(db):
+    assert [r["descricao"] for r in listar_transacoes(db, 1, texto="ubers")] == ["Uber centro"]
+    assert [r["descricao"] for r in listar_transacoes(db, 1, texto="mercados")] == ["Mercado"]
+    assert [r["descricao"] for r in listar_transacoes(db, 1, texto="transp")] == ["Uber centro"]
+
+
+def test_palavra_extra_nao_esvazia_o_resultado(db):
+    rows = listar_transacoes(db, 1, texto="corridas de uber")
+    assert [r["descricao"] for r in rows] == ["Uber centro"]
@@ -0,0 +1,163 @@
+"""Avaliação offline da extração de intenção do webhook.
+
+Reproduz um corpus de mensagens (eval_corpus.jsonl) pelo mesmo caminho do
+webhook (process_with_gemini) e mede acerto de tipo, valor e categoria,
+latência p50/p95 e tokens, por versão do prompt. Serve para comparar
+edições do INTENT_PROMPT antes de ir para produção.
+
+    python eval_intents.py --provider fake
+    python eval_intents.py --provider gemini --prompt-file novo_prompt.txt --historico eval_historico.jsonl
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+CORPUS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_corpus.jsonl")
+
+
+class MeteredProvider:
+    """Repassa as chamadas ao provider real e guarda o último LLMResult"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.ultimo = None
+
+    async def upload(self, path: str, mime_type: str):
+        return await self.provider.upload(path, mime_type)
+
+    async def generate(self, parts: list, **kwargs):
+        self.ultimo = await self.provider.generate(parts, **kwargs)
+        return self.ultimo
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo posto mais próximo"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def mesmo_valor(esperado: Optional[float], obtido) -> bool:
+    if esperado is None:
+        return obtido is None
+    try:
+        return obtido is not None and abs(float(obtido) - esperado) < 0.01
+    except (TypeError, ValueError):
+        return False
+
+
+def load_corpus(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+async def run_eval(corpus: List[dict], main, llm: MeteredProvider, repeticoes: int = 1, verbose: bool = False) -> dict:
+    acertos = {"tipo": 0, "valor": 0, "categoria": 0}
+    avaliados = {"tipo": 0, "valor": 0, "categoria": 0}
+    latencias, tokens_prompt, tokens_resposta, falhas = [], [], [], 0
+
+    for _ in range(repeticoes):
+        for caso in corpus:
+            inicio = time.perf_counter()
+            result = await main.process_with_gemini(caso["mensagem"])
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if llm.ultimo is not None:
+                tokens_prompt.append(llm.ultimo.tokens_prompt)
+                tokens_resposta.append(llm.ultimo.tokens_resposta)
+                llm.ultimo = None
+            if result.get("tipo") == "nao_entendi":
+                falhas += 1
+
+            erros = []
+            for campo in ("tipo", "valor", "categoria"):
+                # valor e categoria só contam nos casos que os definem
+                if campo not in caso:
+                    continue
+                avaliados[campo] += 1
+                if campo == "valor":
+                    ok = mesmo_valor(caso["valor"], result.get("valor"))
+                else:
+                    ok = result.get(campo) == caso[campo]
+                acertos[campo] += ok
+                if not ok:
+                    erros.append(f"{campo}: esperado {caso[campo]!r}, veio {result.get(campo)!r}")
+            if verbose and erros:
+                print(f"- {caso['mensagem']!r}: " + "; ".join(erros))
+
+    chamadas = len(latencias)
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "prompt": main.INTENT_PROMPT.nome,
+        "versao": main.INTENT_PROMPT.version,
+        "modelo": llm.model_name,
+        "casos": chamadas,
+        "acerto": {c: round(acertos[c] / avaliados[c], 3) if avaliados[c] else None for c in acertos},
+        "falhas_parse": falhas,
+        "latencia_p50_ms": round(percentil(latencias, 50), 1),
+        "latencia_p95_ms": round(percentil(latencias, 95), 1),
+        "tokens_prompt_medio": round(sum(tokens_prompt) / len(tokens_prompt), 1) if tokens_prompt else 0,
+        "tokens_resposta_medio": round(sum(tokens_resposta) / len(tokens_resposta), 1) if tokens_resposta else 0,
+    }
+
+
+def print_report(relatorio: dict, historico: List[dict]) -> None:
+    print(f"\nPrompt {relatorio['prompt']} v{relatorio['versao']} ({relatorio['modelo']}), {relatorio['casos']} casos")
+    for campo, taxa in relatorio["acerto"].items():
+        print(f"  acerto {campo:<10} {'-' if taxa is None else f'{taxa:.1%}'}")
+    print(f"  falhas de parse    {relatorio['falhas_parse']}")
+    print(f"  latência p50/p95   {relatorio['latencia_p50_ms']} / {relatorio['latencia_p95_ms']} ms")
+    print(f"  tokens (prompt/resposta, média)  {relatorio['tokens_prompt_medio']} / {relatorio['tokens_resposta_medio']}")
+
+    if historico:
+        print("\nVersão        modelo   tipo   valor  categ.  p50 ms  p95 ms  tokens")
+        for r in historico + [relatorio]:
+            acerto = [f"{r['acerto'][c]:.0%}" if r["acerto"][c] is not None else "-" for c in ("tipo", "valor", "categoria")]
+            tokens = r["tokens_prompt_medio"] + r["tokens_resposta_medio"]
+            print(f"{r['versao']:<13} {r['modelo']:<8} {acerto[0]:>5}  {acerto[1]:>5}  {acerto[2]:>5}"
+                  f"  {r['latencia_p50_ms']:>6}  {r['latencia_p95_ms']:>6}  {tokens:>6.0f}")
+
+
+async def main_async(args) -> None:
+    # Nada de relatório de uso para o backend durante a avaliação
+    os.environ["INTERNAL_API_KEY"] = ""
+    os.environ.setdefault("LLM_PROVIDER", args.provider)
+    import main
+    from providers import load_provider
+    from prompt_engine import PromptTemplate
+
+    llm = MeteredProvider(load_provider(args.provider))
+    main.llm = llm
+    if args.prompt_file:
+        # Avalia um texto candidato sem editar prompts.py
+        with open(args.prompt_file, encoding="utf-8") as f:
+            atual = main.INTENT_PROMPT
+            main.INTENT_PROMPT = PromptTemplate(atual.nome, f.read().strip(), atual.orcamento_tokens)
+
+    relatorio = await run_eval(load_corpus(args.corpus), main, llm, args.repeticoes, args.verbose)
+
+    historico = []
+    if args.historico and os.path.exists(args.historico):
+        historico = load_corpus(args.historico)
+    print_report(relatorio, historico)
+    if args.historico:
+        with open(args.historico, "a", encoding="utf-8") as f:
+            f.write(json.dumps(relatorio, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação offline da extração de intenção")
+    parser.add_argument("--corpus", default=CORPUS_PADRAO)
+    parser.add_argument("--provider", default=os.getenv("LLM_PROVIDER", "fake"),
+                        help='"gemini", "fake" ou outro registrado em providers.PROVIDERS')
+    parser.add_argument("--prompt-file", help="system instruction candidata (texto puro)")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--historico", help="JSONL onde cada execução é anotada, para comparar versões")
+    parser.add_argument("--verbose", action="store_true", help="lista os casos com erro")
+    asyncio.run(main_async(parser.parse_args()))
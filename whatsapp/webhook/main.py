@@ -1,16 +1,34 @@
 import os
 import json
 import httpx
-import google.generativeai as genai
 from fastapi import FastAPI, Request, Query, HTTPException
 from datetime import datetime
 import base64
 import tempfile
+import time
+import asyncio
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Nexfy WhatsApp Webhook")
+from providers import load_provider
+from metering import usage_reporter
+from prompt_engine import PromptTemplate, Section
+from prompts import INTENT_PROMPT, RECEIPT_PROMPT, TRANSCRIBE_PROMPT
+from schemas import (
+    Intencao, Recibo, INTENCAO_SCHEMA, RECIBO_SCHEMA, INTENT_MAX_OUTPUT_TOKENS, RECEIPT_MAX_OUTPUT_TOKENS,
+    generation_config, parse_output
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    flush_task = asyncio.create_task(usage_reporter.run_periodically())
+    yield
+    flush_task.cancel()
+    await usage_reporter.flush()
+
+
+app = FastAPI(title="Nexfy WhatsApp Webhook", lifespan=lifespan)
 
 # Configurações
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 NEXFY_API_URL = os.getenv("NEXFY_API_URL", "http://host.docker.internal:8000")
 
 # WhatsApp Cloud API (Meta)
@@ -18,73 +36,32 @@ WHATSAPP_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
 WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
 WHATSAPP_VERIFY_TOKEN = os.getenv("WHATSAPP_VERIFY_TOKEN", "nexfy_webhook_verify_2024")
 WHATSAPP_API_URL = f"https://graph.facebook.com/v21.0/{WHATSAPP_PHONE_NUMBER_ID}"
+# Não envia nada para a Meta, só registra no log (testes de carga offline)
+WHATSAPP_DRY_RUN = os.getenv("WHATSAPP_DRY_RUN", "false").lower() == "true"
 
-# Configurar Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
-
-# Token do usuário (simplificado - em produção usar banco de dados)
-USER_TOKENS = {}
-
-SYSTEM_PROMPT = """
-Você é a Nex, a assistente virtual do Nexfy - mas você é muito mais que uma IA, você é como uma amiga que entende de finanças e está sempre por perto pra ajudar.
-
-## Sua personalidade:
-- Você é acolhedora, empática e genuinamente interessada no bem-estar do usuário
-- Fala de forma casual e natural, como uma amiga próxima (mas sem gírias excessivas)
-- Usa emojis com moderação para transmitir calor humano
-- Comemora as conquistas do usuário, mesmo as pequenas
-- É encorajadora quando o usuário está passando por dificuldades financeiras
-- Tem senso de humor leve e sabe quando uma piada pode ajudar
-- Nunca julga os gastos do usuário - todo mundo tem suas prioridades
-
-## Como você responde:
-- Se a pessoa só quer conversar (bom dia, tudo bem, etc): responda de forma calorosa e natural
-- Se é sobre finanças: ajude com carinho e praticidade
-- Se é sobre outros assuntos: converse normalmente! Você pode falar sobre qualquer coisa
-- Se a pessoa parece estressada ou preocupada: mostre empatia primeiro, depois ajude
-
-## Para mensagens financeiras, extraia as informações e retorne JSON:
-{
-    "tipo": "despesa" | "receita" | "conta_fixa" | "consulta" | "saldo" | "conversa",
-    "valor": número ou null,
-    "categoria": "Alimentação" | "Transporte" | "Moradia" | "Lazer" | "Saúde" | "Educação" | "Compras" | "Salário" | "Freelance" | "Investimentos" | "Geral",
-    "descricao": "descrição curta",
-    "resposta": "sua mensagem calorosa e humanizada"
-}
-
-## Exemplos de como responder:
-
-Usuário: "bom dia"
-→ tipo: conversa, resposta: "Bom dia! ☀️ Como você tá? Espero que seu dia esteja começando bem! Precisa de algo ou só passou pra dar um oi mesmo?"
-
-Usuário: "gastei 30 no almoço"
-→ tipo: despesa, valor: 30, categoria: Alimentação, descricao: almoço, resposta: "Anotado! 🍽️ R$ 30 no almoço. Espero que tenha sido gostoso! Quer que eu te mostre como tá seu saldo?"
-
-Usuário: "to preocupado com minhas contas"
-→ tipo: conversa, resposta: "Ei, eu entendo... essa preocupação com dinheiro pesa mesmo. 💙 Mas fica tranquilo que tô aqui pra te ajudar a organizar tudo, tá? Me conta o que tá te preocupando mais, vamos resolver juntos!"
-
-Usuário: "qual meu saldo?"
-→ tipo: saldo, resposta: ""
-
-Usuário: "recebi meu salário hoje, 3500"
-→ tipo: receita, valor: 3500, categoria: Salário, descricao: salário, resposta: "Oba, dia de pagamento! 🎉 Anotei aqui os R$ 3.500. Lembra de separar uma parte pra você antes de pagar as contas, tá? Você merece!"
+# Gemini em produção; LLM_PROVIDER=fake para rodar sem a API
+llm = load_provider()
 
-Usuário: "paguei 200 de internet"
-→ tipo: conta_fixa, valor: 200, categoria: Moradia, descricao: internet, resposta: "Registrado! 📶 R$ 200 da internet. Conta fixa é assim mesmo, pelo menos tá em dia!"
 
-Usuário: "tô triste hoje"
-→ tipo: conversa, resposta: "Ah, sinto muito que você tá assim... 💙 Quer desabafar? Tô aqui pra ouvir. Às vezes só ter alguém pra conversar já ajuda um pouquinho."
+async def generate(prompt: PromptTemplate, parts: list, phone: str = None, config: dict = None) -> str:
+    """Chama o modelo com a instrução fixa do prompt e registra tokens e latência"""
+    inicio = time.perf_counter()
+    result = await llm.generate(parts, system_instruction=prompt.system_instruction, generation_config=config)
+    usage_reporter.record(
+        prompt.nome, phone, llm.model_name, result.tokens_prompt, result.tokens_resposta,
+        (time.perf_counter() - inicio) * 1000
+    )
+    return result.text
 
-Usuário: "me indica um filme"
-→ tipo: conversa, resposta: "Opa, adoro uma recomendação! 🎬 Que tipo de filme você tá afim? Ação, comédia, romance, suspense? Me conta que eu te ajudo a escolher!"
-
-Retorne APENAS o JSON, sem markdown ou texto adicional.
-"""
 
+# Token do usuário (simplificado - em produção usar banco de dados)
+USER_TOKENS = {}
 
 async def send_whatsapp_message(phone: str, message: str):
     """Envia mensagem pelo WhatsApp Cloud API (Meta)"""
+    if WHATSAPP_DRY_RUN:
+        print(f"[dry-run] Mensagem para {phone}: {message}")
+        return {"dry_run": True}
     async with httpx.AsyncClient() as client:
         try:
             response = await client.post(
@@ -135,7 +112,7 @@ async def download_whatsapp_media(media_id: str) -> bytes:
             return None
 
 
-async def transcribe_audio(audio_bytes: bytes) -> str:
+async def transcribe_audio(audio_bytes: bytes, phone: str = None) -> str:
     """Transcreve áudio usando Gemini"""
     try:
         # Salvar temporariamente
@@ -143,25 +120,21 @@ async def transcribe_audio(audio_bytes: bytes) -> str:
             f.write(audio_bytes)
             temp_path = f.name
 
-        # Upload para Gemini usando a nova API
-        from google.generativeai import upload_file
-        audio_file = upload_file(temp_path, mime_type="audio/ogg")
+        # Upload para o modelo
+        audio_file = await llm.upload(temp_path, mime_type="audio/ogg")
 
-        response = model.generate_content([
-            "Transcreva este áudio em português. Retorne apenas o texto transcrito, sem explicações.",
-            audio_file
-        ])
+        response = await generate(TRANSCRIBE_PROMPT, [audio_file], phone)
 
         # Limpar arquivo temporário
         os.unlink(temp_path)
 
-        return response.text.strip()
+        return response.strip()
     except Exception as e:
         print(f"Erro na transcrição: {e}")
         return None
 
 
-async def process_image(image_bytes: bytes, mime_type: str) -> dict:
+async def process_image(image_bytes: bytes, mime_type: str, phone: str = None) -> dict:
     """Processa imagem de nota fiscal/recibo usando Gemini"""
     try:
         # Salvar temporariamente
@@ -170,63 +143,30 @@ async def process_image(image_bytes: bytes, mime_type: str) -> dict:
             f.write(image_bytes)
             temp_path = f.name
 
-        # Upload para Gemini
-        from google.generativeai import upload_file
-        image_file = upload_file(temp_path, mime_type=mime_type)
-
-        prompt = """Analise esta imagem de nota fiscal, recibo ou comprovante.
+        # Upload para o modelo
+        image_file = await llm.upload(temp_path, mime_type=mime_type)
 
-Extraia as informações e retorne APENAS um JSON válido com esta estrutura:
-{
-    "tipo": "despesa" | "receita",
-    "valor": número total (apenas o número, sem R$),
-    "categoria": "Alimentação" | "Transporte" | "Moradia" | "Lazer" | "Saúde" | "Educação" | "Compras" | "Geral",
-    "descricao": "descrição curta do que foi comprado/pago",
-    "estabelecimento": "nome do estabelecimento se visível",
-    "sucesso": true
-}
-
-Se não conseguir identificar como nota fiscal ou não encontrar valor, retorne:
-{
-    "sucesso": false,
-    "resposta": "Hmm, não consegui identificar isso como uma nota fiscal... 🤔 Se for uma nota/recibo, tenta tirar uma foto mais nítida, de preferência com boa luz!"
-}
-
-Retorne APENAS o JSON, sem markdown ou texto adicional."""
-
-        response = model.generate_content([prompt, image_file])
-        result = response.text.strip()
+        response = await generate(
+            RECEIPT_PROMPT, [image_file], phone, generation_config(RECIBO_SCHEMA, RECEIPT_MAX_OUTPUT_TOKENS)
+        )
 
         # Limpar arquivo temporário
         os.unlink(temp_path)
 
-        # Limpar possíveis marcadores de código
-        if result.startswith("```"):
-            result = result.split("```")[1]
-            if result.startswith("json"):
-                result = result[4:]
-        result = result.strip()
-
-        return json.loads(result)
+        return parse_output(response, Recibo).model_dump(exclude_none=True)
     except Exception as e:
         print(f"Erro ao processar imagem: {e}")
         return {"sucesso": False, "resposta": "Erro ao processar a imagem. Tente novamente."}
 
 
-async def process_with_gemini(text: str) -> dict:
+async def process_with_gemini(text: str, phone: str = None) -> dict:
     """Processa texto com Gemini para extrair intenção"""
     try:
-        response = model.generate_content(f"{SYSTEM_PROMPT}\n\nMensagem do usuário: {text}")
-        result = response.text.strip()
-
-        # Limpar possíveis marcadores de código
-        if result.startswith("```"):
-            result = result.split("```")[1]
-            if result.startswith("json"):
-                result = result[4:]
-        result = result.strip()
-
-        return json.loads(result)
+        mensagem = INTENT_PROMPT.render([Section("Mensagem do usuário", text, 0)])
+        response = await generate(
+            INTENT_PROMPT, [mensagem], phone, generation_config(INTENCAO_SCHEMA, INTENT_MAX_OUTPUT_TOKENS)
+        )
+        return parse_output(response, Intencao).model_dump(exclude_none=True)
     except Exception as e:
         print(f"Erro no Gemini: {e}")
         return {"tipo": "nao_entendi", "resposta": "Desculpe, não consegui entender. Tente novamente!"}
@@ -251,14 +191,10 @@ async def auto_login_by_phone(phone: str) -> str:
     """Autentica usuário automaticamente pelo número de telefone"""
     async with httpx.AsyncClient() as client:
         try:
-            # Formatar telefone (remover código do país se presente)
-            clean_phone = phone
-            if phone.startswith("55"):
-                clean_phone = phone[2:]  # Remove código do Brasil
-
+            # O backend normaliza o número (E.164), então enviamos como veio do WhatsApp
             response = await client.post(
                 f"{NEXFY_API_URL}/auth/login-by-phone",
-                json={"telefone": clean_phone}
+                json={"telefone": phone}
             )
             if response.status_code == 200:
                 data = response.json()
@@ -379,6 +315,14 @@ async def webhook(request: Request):
 
         print(f"Mensagem de {phone}, tipo: {message_type}")
 
+        # Acima da cota diária de uso da IA (informada pelo backend)
+        if usage_reporter.is_blocked(phone):
+            await send_whatsapp_message(
+                phone,
+                "Ufa, hoje a gente conversou bastante! 😅 Você atingiu o limite diário da assistente. Amanhã eu volto com tudo! 💚"
+            )
+            return {"status": "ok"}
+
         # Extrair texto
         text = None
 
@@ -390,7 +334,7 @@ async def webhook(request: Request):
             if audio_id:
                 audio_bytes = await download_whatsapp_media(audio_id)
                 if audio_bytes:
-                    text = await transcribe_audio(audio_bytes)
+                    text = await transcribe_audio(audio_bytes, phone)
                     if text:
                         print(f"Áudio transcrito: {text}")
 
@@ -414,7 +358,7 @@ async def webhook(request: Request):
                 image_bytes = await download_whatsapp_media(image_id)
                 if image_bytes:
                     print(f"Processando imagem...")
-                    result = await process_image(image_bytes, mime_type)
+                    result = await process_image(image_bytes, mime_type, phone)
                     print(f"Resultado da imagem: {result}")
 
                     if result.get("sucesso"):
@@ -476,7 +420,7 @@ async def webhook(request: Request):
             return {"status": "ok"}
 
         # Processar mensagem com Gemini
-        result = await process_with_gemini(text)
+        result = await process_with_gemini(text, phone)
         print(f"Resultado Gemini: {result}")
 
         tipo = result.get("tipo")
@@ -0,0 +1,75 @@
+import asyncio
+import os
+from datetime import date
+from typing import Dict, List, Optional
+import httpx
+
+NEXFY_API_URL = os.getenv("NEXFY_API_URL", "http://host.docker.internal:8000")
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY", "")
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "15"))
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "50"))
+# Máximo de medições guardadas enquanto o backend não responde; acima disso as mais antigas são descartadas
+USAGE_MAX_PENDING = int(os.getenv("USAGE_MAX_PENDING", "5000"))
+
+
+class UsageReporter:
+    """Junta as medições de uso do LLM e envia em lotes para o backend (/ai/usage/report).
+
+    O backend responde com os telefones acima da cota diária; eles ficam
+    bloqueados até o fim do dia, sem novas chamadas ao modelo. Um lote que
+    falha volta para a fila (até USAGE_MAX_PENDING) e vai no próximo envio.
+    """
+
+    def __init__(self):
+        self._events: List[dict] = []
+        self._bloqueados: Dict[str, date] = {}
+        # Referência ao envio disparado por record: sem ela a task pode ser coletada no meio
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, feature: str, phone: Optional[str], modelo: str,
+               tokens_prompt: int, tokens_resposta: int, latencia_ms: float) -> None:
+        self._events.append({
+            "telefone": phone, "feature": feature, "modelo": modelo,
+            "tokens_prompt": tokens_prompt, "tokens_resposta": tokens_resposta,
+            "latencia_ms": round(latencia_ms, 1)
+        })
+        if len(self._events) >= USAGE_BATCH_SIZE and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def is_blocked(self, phone: str) -> bool:
+        return self._bloqueados.get(phone) == date.today()
+
+    async def flush(self) -> None:
+        if not self._events or not INTERNAL_API_KEY:
+            self._events.clear()
+            return
+        events, self._events = self._events, []
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{NEXFY_API_URL}/ai/usage/report",
+                    headers={"X-Internal-Key": INTERNAL_API_KEY},
+                    json=events
+                )
+            if response.status_code == 200:
+                hoje = date.today()
+                for phone in response.json().get("bloqueados", []):
+                    self._bloqueados[phone] = hoje
+            else:
+                print(f"Envio de uso falhou: {response.status_code}")
+                self._requeue(events)
+        except Exception as e:
+            print(f"Erro ao enviar uso do LLM: {e}")
+            self._requeue(events)
+
+    def _requeue(self, events: List[dict]) -> None:
+        """Devolve o lote para a próxima tentativa, sem passar de USAGE_MAX_PENDING"""
+        self._events = (events + self._events)[-USAGE_MAX_PENDING:]
+
+    async def run_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(USAGE_FLUSH_SECONDS)
+            await self.flush()
+
+
+usage_reporter = UsageReporter()
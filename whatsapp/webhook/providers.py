@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import random
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from prompt_engine import count_tokens
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "800"))
+LLM_FAKE_JITTER_MS = float(os.getenv("LLM_FAKE_JITTER_MS", "200"))
+
+
+@dataclass
+class LLMResult:
+    text: str
+    tokens_prompt: int
+    tokens_resposta: int
+
+
+class LLMProvider(ABC):
+    """Modelo usado pelo webhook: gera texto a partir de partes (texto e arquivos enviados)"""
+    model_name = "desconhecido"
+
+    @abstractmethod
+    async def upload(self, path: str, mime_type: str):
+        """Envia um arquivo e devolve a referência usada nas partes"""
+
+    @abstractmethod
+    async def generate(self, parts: list, system_instruction: str = None,
+                       generation_config: dict = None) -> LLMResult:
+        """Gera a resposta a partir das partes"""
+
+
+class GeminiProvider(LLMProvider):
+    def __init__(self, model_name: str = LLM_MODEL):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.genai = genai
+        self.model_name = model_name
+        # Um GenerativeModel por system instruction (uma por PromptTemplate)
+        self._models = {None: genai.GenerativeModel(model_name)}
+
+    def _model_for(self, system_instruction: str = None):
+        model = self._models.get(system_instruction)
+        if model is None:
+            model = self._models[system_instruction] = self.genai.GenerativeModel(
+                self.model_name, system_instruction=system_instruction
+            )
+        return model
+
+    async def upload(self, path: str, mime_type: str):
+        # upload_file é síncrono: roda fora do event loop
+        return await asyncio.to_thread(self.genai.upload_file, path, mime_type=mime_type)
+
+    async def generate(self, parts: list, system_instruction: str = None,
+                       generation_config: dict = None) -> LLMResult:
+        response = await self._model_for(system_instruction).generate_content_async(
+            parts, generation_config=generation_config
+        )
+        usage = response.usage_metadata
+        return LLMResult(response.text, usage.prompt_token_count, usage.candidates_token_count)
+
+
+class FakeFile:
+    def __init__(self, path: str, mime_type: str):
+        self.path = path
+        self.mime_type = mime_type
+
+
+# Regras do provider fake para extrair a intenção sem chamar a API
+CATEGORIAS_FAKE = {
+    "Alimentação": ("almoço", "almoco", "jantar", "mercado", "ifood", "lanche", "café", "cafe"),
+    "Transporte": ("uber", "gasolina", "ônibus", "onibus", "99", "estacionamento"),
+    "Moradia": ("aluguel", "luz", "água", "agua", "internet", "condomínio", "condominio"),
+    "Salário": ("salário", "salario",),
+}
+
+
+def fake_intent(text: str) -> dict:
+    texto = text.lower()
+    valor_match = re.search(r"(\d+(?:[.,]\d{1,2})?)", texto)
+    valor = float(valor_match.group(1).replace(",", ".")) if valor_match else None
+    categoria = next(
+        (nome for nome, palavras in CATEGORIAS_FAKE.items() if any(p in texto for p in palavras)),
+        "Geral"
+    )
+
+    if "saldo" in texto:
+        return {"tipo": "saldo", "valor": None, "categoria": "Geral", "descricao": "", "resposta": ""}
+    if valor is not None and re.search(r"\b(recebi|ganhei|caiu)\b", texto):
+        tipo = "receita"
+    elif valor is not None and re.search(r"\b(gastei|paguei|comprei)\b", texto):
+        tipo = "despesa"
+    else:
+        return {"tipo": "conversa", "valor": None, "categoria": "Geral", "descricao": "",
+                "resposta": f"Resposta simulada para: {text[:200]}"}
+    return {"tipo": tipo, "valor": valor, "categoria": categoria, "descricao": text[:60],
+            "resposta": f"Anotado! R$ {valor:.2f} ({categoria})."}
+
+
+class FakeProvider(LLMProvider):
+    """Modelo local e determinístico para testes de carga sem a API do Gemini.
+
+    Espera LLM_FAKE_LATENCY_MS (+ jitter) e responde por regras: áudio vira
+    uma frase fixa, imagem vira um recibo fixo e texto vira a intenção
+    extraída por palavras-chave, no mesmo JSON que o Gemini devolveria.
+    """
+    model_name = "fake"
+
+    def __init__(self, latency_ms: float = LLM_FAKE_LATENCY_MS, jitter_ms: float = LLM_FAKE_JITTER_MS):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    async def upload(self, path: str, mime_type: str):
+        return FakeFile(path, mime_type)
+
+    async def generate(self, parts: list, system_instruction: str = None,
+                       generation_config: dict = None) -> LLMResult:
+        await asyncio.sleep(max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        text = self.reply(parts)
+        # Arquivos contam como ~258 tokens, o custo fixo de uma imagem no Gemini
+        tokens_prompt = count_tokens(system_instruction or "") + sum(
+            count_tokens(p) if isinstance(p, str) else 258 for p in parts
+        )
+        return LLMResult(text, tokens_prompt, count_tokens(text))
+
+    def reply(self, parts: list) -> str:
+        arquivo = next((p for p in parts if isinstance(p, FakeFile)), None)
+        if arquivo and arquivo.mime_type.startswith("audio"):
+            return "gastei 30 reais no almoço"
+        if arquivo:
+            return json.dumps({
+                "tipo": "despesa", "valor": 42.5, "categoria": "Alimentação",
+                "descricao": "compra no mercado", "estabelecimento": "Mercado Teste", "sucesso": True
+            }, ensure_ascii=False)
+        texto = " ".join(p for p in parts if isinstance(p, str))
+        return json.dumps(fake_intent(texto.rsplit("Mensagem do usuário:", 1)[-1].strip()), ensure_ascii=False)
+
+
+PROVIDERS = {"gemini": GeminiProvider, "fake": FakeProvider}
+
+
+def load_provider(name: str = LLM_PROVIDER) -> LLMProvider:
+    return PROVIDERS[name]()
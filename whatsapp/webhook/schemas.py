@@ -0,0 +1,108 @@
+import os
+from typing import Literal, Optional, Type, TypeVar
+from pydantic import BaseModel, field_validator, model_validator
+
+# Com o schema, o Gemini só gera JSON válido para o modelo (sem markdown nem texto solto)
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+INTENT_MAX_OUTPUT_TOKENS = int(os.getenv("INTENT_MAX_OUTPUT_TOKENS", "400"))
+RECEIPT_MAX_OUTPUT_TOKENS = int(os.getenv("RECEIPT_MAX_OUTPUT_TOKENS", "300"))
+
+TIPOS_INTENCAO = ["despesa", "receita", "conta_fixa", "consulta", "saldo", "conversa"]
+CATEGORIAS = [
+    "Alimentação", "Transporte", "Moradia", "Lazer", "Saúde", "Educação",
+    "Compras", "Salário", "Freelance", "Investimentos", "Geral"
+]
+
+
+class Intencao(BaseModel):
+    """Intenção extraída de uma mensagem de texto"""
+    tipo: Literal["despesa", "receita", "conta_fixa", "consulta", "saldo", "conversa"]
+    valor: Optional[float] = None
+    categoria: str = "Geral"
+    descricao: str = ""
+    resposta: str = ""
+
+    @field_validator("categoria")
+    @classmethod
+    def categoria_conhecida(cls, v: str) -> str:
+        return v if v in CATEGORIAS else "Geral"
+
+
+class Recibo(BaseModel):
+    """Dados lidos de uma foto de nota fiscal ou recibo"""
+    sucesso: bool
+    tipo: Literal["despesa", "receita"] = "despesa"
+    valor: Optional[float] = None
+    categoria: str = "Geral"
+    descricao: str = ""
+    estabelecimento: Optional[str] = None
+    resposta: Optional[str] = None
+
+    @field_validator("categoria")
+    @classmethod
+    def categoria_conhecida(cls, v: str) -> str:
+        return v if v in CATEGORIAS else "Geral"
+
+    @model_validator(mode="after")
+    def valor_obrigatorio(self) -> "Recibo":
+        if self.sucesso and not self.valor:
+            raise ValueError("recibo lido sem valor")
+        return self
+
+
+def _enum(valores: list) -> dict:
+    return {"type": "string", "format": "enum", "enum": valores}
+
+
+# Schemas no formato do Gemini (subconjunto do OpenAPI), espelhando os modelos acima
+INTENCAO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tipo": _enum(TIPOS_INTENCAO),
+        "valor": {"type": "number", "nullable": True},
+        "categoria": _enum(CATEGORIAS),
+        "descricao": {"type": "string"},
+        "resposta": {"type": "string"},
+    },
+    "required": ["tipo", "categoria", "descricao", "resposta"],
+}
+
+RECIBO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sucesso": {"type": "boolean"},
+        "tipo": _enum(["despesa", "receita"]),
+        "valor": {"type": "number", "nullable": True},
+        "categoria": _enum(CATEGORIAS),
+        "descricao": {"type": "string"},
+        "estabelecimento": {"type": "string", "nullable": True},
+        "resposta": {"type": "string", "nullable": True},
+    },
+    "required": ["sucesso"],
+}
+
+
+def generation_config(schema: dict, max_output_tokens: int) -> dict:
+    """Configuração de geração: saída limitada e, se ligado, presa ao schema"""
+    config = {"max_output_tokens": max_output_tokens}
+    if LLM_STRUCTURED_OUTPUT:
+        config.update(response_mime_type="application/json", response_schema=schema)
+    return config
+
+
+def strip_code_fence(text: str) -> str:
+    """Remove ```json ... ``` (só acontece sem o schema)"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text.strip()
+
+
+Modelo = TypeVar("Modelo", bound=BaseModel)
+
+
+def parse_output(text: str, modelo: Type[Modelo]) -> Modelo:
+    """Valida a resposta do modelo; levanta ValidationError se não servir"""
+    return modelo.model_validate_json(strip_code_fence(text))